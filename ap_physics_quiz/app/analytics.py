@@ -0,0 +1,303 @@
+import asyncio
+import itertools
+import json
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.database import Attempt, read_engine
+from app.question_pool import QuestionPool, question_pool
+
+logger = logging.getLogger(__name__)
+
+# Option counts are kept for this many options per question
+MAX_OPTIONS = 8
+# Upper bounds of the response time histogram buckets, in milliseconds; the
+# last bucket holds everything slower
+RESPONSE_BUCKETS_MS = np.array([
+    250, 500, 1000, 2000, 3000, 5000, 7500, 10000, 15000,
+    20000, 30000, 45000, 60000, 120000, 300000, 600000
+], dtype=np.float64)
+
+# NULLs are read as -1 so that every chunk is a single float array
+_ATTEMPT_COLUMNS = (
+    Attempt.id,
+    Attempt.question_id,
+    Attempt.correct,
+    func.coalesce(Attempt.option_index, -1),
+    func.coalesce(Attempt.response_ms, -1.0),
+    func.coalesce(Attempt.learner_score, -1.0),
+)
+
+class QuestionStats:
+    """Rollup counters of every question, as arrays with one row per answered question.
+
+    Rows are assigned densely in the order questions are first answered,
+    with the position of every id kept for lookups, so memory follows the
+    number of answered questions rather than the largest question id.
+    Only sums and counts are stored, so batches of attempts can be added in
+    any order and the derived statistics computed at any time:
+
+    - p-value from attempts and correct answers
+    - distractor frequencies from per-option counts
+    - discrimination as the point-biserial correlation between correctness
+      and the learner's score on earlier answers, from the five sums below
+    - median response time interpolated from a histogram
+    """
+
+    COUNTERS = (
+        "attempts", "correct", "option_counts", "response_counts",
+        "scored", "score_sum", "score_sq_sum", "score_correct_sum", "scored_correct"
+    )
+
+    def __init__(self, capacity: int = 0):
+        self.size = 0
+        self.question_ids = np.zeros(capacity, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self.attempts = np.zeros(capacity, dtype=np.int64)
+        self.correct = np.zeros(capacity, dtype=np.int64)
+        self.option_counts = np.zeros((capacity, MAX_OPTIONS), dtype=np.int64)
+        self.response_counts = np.zeros((capacity, len(RESPONSE_BUCKETS_MS) + 1), dtype=np.int64)
+        # Attempts with a learner score: count, sum of scores, sum of squared
+        # scores, sum of scores of correct answers, correct answers
+        self.scored = np.zeros(capacity, dtype=np.int64)
+        self.score_sum = np.zeros(capacity, dtype=np.float64)
+        self.score_sq_sum = np.zeros(capacity, dtype=np.float64)
+        self.score_correct_sum = np.zeros(capacity, dtype=np.float64)
+        self.scored_correct = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def position(self, question_id: int) -> Optional[int]:
+        """Row of a question, or None if it has no attempts"""
+        return self._positions.get(question_id)
+
+    def subset(self, positions: np.ndarray) -> "QuestionStats":
+        """Counters of the given rows only, in that order"""
+        stats = QuestionStats()
+        stats.size = len(positions)
+        stats.question_ids = self.question_ids[positions]
+        stats._positions = {question_id: i for i, question_id in enumerate(stats.question_ids.tolist())}
+        for name in self.COUNTERS:
+            setattr(stats, name, getattr(self, name)[positions])
+        return stats
+
+    def _grow(self, capacity: int):
+        for name in ("question_ids",) + self.COUNTERS:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+    def _rows(self, question_ids: np.ndarray) -> np.ndarray:
+        """Rows of the given question ids, adding rows for questions not seen before"""
+        unique_ids, inverse = np.unique(question_ids, return_inverse=True)
+        positions = self._positions
+        new_ids = [question_id for question_id in unique_ids.tolist() if question_id not in positions]
+        if new_ids:
+            if self.size + len(new_ids) > len(self.question_ids):
+                self._grow(max(self.size + len(new_ids), 2 * len(self.question_ids)))
+            self.question_ids[self.size:self.size + len(new_ids)] = new_ids
+            for question_id in new_ids:
+                positions[question_id] = self.size
+                self.size += 1
+        rows = np.fromiter((positions[question_id] for question_id in unique_ids.tolist()),
+                           dtype=np.int64, count=len(unique_ids))
+        return rows[inverse]
+
+    def add(self, rows: np.ndarray):
+        """Add attempts given as rows of (id, question id, correct, option, response ms, learner score)"""
+        if not len(rows):
+            return
+        positions = self._rows(rows[:, 1].astype(np.int64))
+        correct = rows[:, 2].astype(np.int64)
+        options = rows[:, 3].astype(np.int64)
+        response_ms = rows[:, 4]
+        scores = rows[:, 5]
+
+        np.add.at(self.attempts, positions, 1)
+        np.add.at(self.correct, positions, correct)
+
+        chosen = (options >= 0) & (options < MAX_OPTIONS)
+        np.add.at(self.option_counts, (positions[chosen], options[chosen]), 1)
+
+        timed = response_ms >= 0
+        buckets = np.searchsorted(RESPONSE_BUCKETS_MS, response_ms[timed])
+        np.add.at(self.response_counts, (positions[timed], buckets), 1)
+
+        scored = scores >= 0
+        scored_positions = positions[scored]
+        scored_scores = scores[scored]
+        scored_correct = correct[scored]
+        np.add.at(self.scored, scored_positions, 1)
+        np.add.at(self.score_sum, scored_positions, scored_scores)
+        np.add.at(self.score_sq_sum, scored_positions, scored_scores * scored_scores)
+        np.add.at(self.score_correct_sum, scored_positions, scored_scores * scored_correct)
+        np.add.at(self.scored_correct, scored_positions, scored_correct)
+
+    def p_values(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.correct / self.attempts
+
+    def discrimination(self) -> np.ndarray:
+        """Point-biserial correlation of correctness with learner score, NaN when undefined"""
+        n = self.scored.astype(np.float64)
+        sx, sxx, sxy, sy = self.score_sum, self.score_sq_sum, self.score_correct_sum, self.scored_correct
+        # sum(y^2) == sum(y) for 0/1 correctness
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * sy - sy * sy))
+        return np.where(np.isfinite(r), r, np.nan)
+
+    def median_response_ms(self) -> np.ndarray:
+        """Median response time interpolated within its histogram bucket, NaN without timings"""
+        counts = self.response_counts
+        totals = counts.sum(axis=1)
+        cumulative = counts.cumsum(axis=1)
+        half = totals / 2
+        bucket = np.argmax(cumulative >= half[:, None], axis=1)
+        rows = np.arange(len(counts))
+        before = cumulative[rows, bucket] - counts[rows, bucket]
+        lower = np.concatenate(([0.0], RESPONSE_BUCKETS_MS))[bucket]
+        # The open last bucket is reported at its lower bound
+        upper = np.concatenate((RESPONSE_BUCKETS_MS, [RESPONSE_BUCKETS_MS[-1]]))[bucket]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            median = lower + (upper - lower) * (half - before) / counts[rows, bucket]
+        return np.where(totals > 0, median, np.nan)
+
+def _number(value: float, digits: int) -> Optional[float]:
+    return None if value != value else round(value, digits)
+
+class AnalyticsEngine:
+    """Per-question statistics kept up to date from the attempts table.
+
+    A background task first rebuilds every rollup from the attempts table
+    in large vectorized chunks, then polls for attempts with an id above
+    the last one seen and adds just those, so every worker converges on the
+    same numbers without re-reading history. The JSON served by
+    ``/api/stats/questions`` is built once per change and reused.
+    """
+
+    def __init__(self, pool: QuestionPool = question_pool, poll_interval: float = 2.0, chunk_size: int = 100000):
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.stats = QuestionStats()
+        self.last_attempt_id = 0
+        self._payload: Optional[bytes] = None
+        self._payload_version: Optional[int] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def _read(self, stats: QuestionStats, after_id: int) -> int:
+        """Add every attempt with an id above ``after_id``; returns the last id added"""
+        async with read_engine.connect() as conn:
+            while True:
+                result = await conn.execute(
+                    select(*_ATTEMPT_COLUMNS)
+                    .where(Attempt.id > after_id)
+                    .order_by(Attempt.id)
+                    .limit(self.chunk_size)
+                )
+                rows = result.all()
+                if not rows:
+                    return after_id
+                # Much faster than np.array() over Row objects
+                chunk = np.fromiter(
+                    itertools.chain.from_iterable(rows), dtype=np.float64, count=len(rows) * len(_ATTEMPT_COLUMNS)
+                ).reshape(len(rows), len(_ATTEMPT_COLUMNS))
+                stats.add(chunk)
+                after_id = int(chunk[-1, 0])
+                if len(rows) < self.chunk_size:
+                    return after_id
+
+    async def rebuild(self):
+        """Recompute every rollup from the full attempts table"""
+        stats = QuestionStats(len(self.pool))
+        last_attempt_id = await self._read(stats, 0)
+        self.stats, self.last_attempt_id = stats, last_attempt_id
+        logger.info("Rebuilt question statistics up to attempt %d", last_attempt_id)
+
+    async def refresh(self) -> bool:
+        """Add attempts written since the last rebuild or refresh"""
+        last_attempt_id = await self._read(self.stats, self.last_attempt_id)
+        changed = last_attempt_id != self.last_attempt_id
+        self.last_attempt_id = last_attempt_id
+        return changed
+
+    def question(self, question_id: int) -> Optional[dict]:
+        """Statistics of one question, or None if it has no attempts"""
+        position = self.stats.position(question_id)
+        if position is None:
+            return None
+        return self._summaries(np.array([position]))[0]
+
+    def payload(self) -> bytes:
+        """JSON statistics of every answered question"""
+        if self._payload_version != self.last_attempt_id:
+            # Rows are in first-answered order; the payload lists questions by id
+            stats = self.stats
+            positions = np.argsort(stats.question_ids[:len(stats)], kind="stable")
+            self._payload = json.dumps({
+                "attempts": int(stats.attempts[:len(stats)].sum()),
+                "questions": self._summaries(positions)
+            }).encode()
+            self._payload_version = self.last_attempt_id
+        return self._payload
+
+    def _summaries(self, positions: np.ndarray) -> List[dict]:
+        stats = self.stats.subset(positions)
+        p_values = stats.p_values().tolist()
+        discrimination = stats.discrimination().tolist()
+        medians = stats.median_response_ms().tolist()
+        attempts = stats.attempts.tolist()
+        option_counts = stats.option_counts.tolist()
+        summaries = []
+        for i, question_id in enumerate(stats.question_ids.tolist()):
+            question = self.pool.get(question_id)
+            option_frequency = None
+            if question is not None and question.options:
+                counts = option_counts[i][:len(question.options)]
+                total = sum(counts)
+                if total:
+                    option_frequency = [round(count / total, 4) for count in counts]
+            summaries.append({
+                "question_id": question_id,
+                "attempts": attempts[i],
+                "p_value": _number(p_values[i], 4),
+                "option_frequency": option_frequency,
+                "discrimination": _number(discrimination[i], 4),
+                "median_response_ms": _number(medians[i], 1)
+            })
+        return summaries
+
+    async def _watch(self):
+        try:
+            await self.rebuild()
+        except Exception:
+            logger.exception("Failed to rebuild question statistics")
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh question statistics")
+
+    def start_watcher(self):
+        """Rebuild the statistics in the background and keep them up to date"""
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop_watcher(self):
+        """Stop the background task"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+analytics = AnalyticsEngine()
@@ -0,0 +1,83 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.grading import CompiledAnswer, compile_answer
+from app.question_pool import QuestionRecord
+
+class AnswerKeyEntry(NamedTuple):
+    """Everything needed to grade one question"""
+    correct_index: Optional[int]
+    # correct_answer normalized once for free-text comparisons
+    answer_key: str
+    correct_answer: str
+    explanation: str
+    options: Optional[Tuple[str, ...]]
+    # correct_answer parsed once as a number with units or an expression;
+    # None when it can only be compared as text
+    compiled: Optional[CompiledAnswer] = None
+    # The other options, parsed likewise, so answers closer to one of them
+    # than to the correct answer are not accepted within the tolerance
+    distractors: Tuple[CompiledAnswer, ...] = ()
+
+    @classmethod
+    def from_record(cls, record: QuestionRecord) -> "AnswerKeyEntry":
+        answer_key = record.correct_answer.strip().lower()
+        compiled = compile_answer(record.correct_answer)
+        distractors = ()
+        if compiled is not None and record.options:
+            distractors = tuple(filter(None, (
+                compile_answer(option) for option in record.options if option.strip().lower() != answer_key
+            )))
+        return cls(
+            correct_index=record.correct_index,
+            answer_key=answer_key,
+            correct_answer=record.correct_answer,
+            explanation=record.explanation,
+            options=record.options,
+            compiled=compiled,
+            distractors=distractors
+        )
+
+    def is_correct(self, answer: Optional[str] = None, option_index: Optional[int] = None) -> bool:
+        """Check a selected option index, or a free-text answer.
+
+        Free-text answers match the correct answer as text, or as a number
+        (converting units) or expression within the grading tolerance and
+        closer to it than to any other option.
+        """
+        if option_index is not None:
+            return self.correct_index is not None and option_index == self.correct_index
+        if answer is None:
+            return False
+        if answer.strip().lower() == self.answer_key:
+            return True
+        return self.compiled is not None and self.compiled.matches(answer, self.distractors)
+
+class AnswerKey:
+    """In-memory index of question id -> answer key entry.
+
+    Registered as a question pool listener: rebuilt when the pool loads and
+    updated entry by entry when individual questions change, so grading is a
+    dictionary lookup with no database round trip.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, AnswerKeyEntry] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, question_id: int) -> Optional[AnswerKeyEntry]:
+        """Get the answer key of a question"""
+        return self._entries.get(question_id)
+
+    def questions_loaded(self, records: Iterable[QuestionRecord]):
+        self._entries = {record.id: AnswerKeyEntry.from_record(record) for record in records}
+
+    def questions_changed(self, changed: Iterable[QuestionRecord], removed_ids: List[int]):
+        entries = self._entries
+        for record in changed:
+            entries[record.id] = AnswerKeyEntry.from_record(record)
+        for question_id in removed_ids:
+            entries.pop(question_id, None)
+
+answer_key = AnswerKey()
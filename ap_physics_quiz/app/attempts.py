@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from app.database import Attempt, engine
+from app.metrics import ATTEMPT_QUEUE_DEPTH, ATTEMPTS_WRITTEN
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of an attempt to make the writer finish
+_STOP = object()
+
+class AttemptLog:
+    """Write-behind log of submitted answers.
+
+    Request handlers put attempts on a bounded queue and return; a single
+    background task takes them off and inserts them in batches of up to
+    ``batch_size`` rows, one transaction per batch, at least every
+    ``flush_interval`` seconds while attempts are waiting. When the queue
+    holds ``max_queue`` attempts, ``log`` waits for room, which slows
+    submitters down to the rate the database can absorb instead of
+    growing memory without bound. ``stop`` writes everything still queued.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_queue: int = 10000
+    ):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    async def log(
+        self,
+        session_id: str,
+        question_id: int,
+        correct: bool,
+        option_index: Optional[int] = None,
+        answer: Optional[str] = None,
+        response_ms: Optional[float] = None,
+        learner_score: Optional[float] = None
+    ):
+        """Queue an attempt to be written"""
+        if not self.enabled or self._queue is None:
+            return
+        await self._queue.put({
+            "session_id": session_id,
+            "question_id": question_id,
+            "correct": int(correct),
+            "option_index": option_index,
+            "answer": answer,
+            "response_ms": response_ms,
+            "learner_score": learner_score,
+            "created_at": time.time()
+        })
+        ATTEMPT_QUEUE_DEPTH.inc()
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    async def _write(self, batch: List[dict]):
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(insert(Attempt), batch)
+            ATTEMPTS_WRITTEN.inc("ok", amount=len(batch))
+        except Exception:
+            ATTEMPTS_WRITTEN.inc("error", amount=len(batch))
+            logger.exception("Failed to write %d attempts", len(batch))
+        ATTEMPT_QUEUE_DEPTH.dec(amount=len(batch))
+
+    def _take(self, batch: List[dict]) -> bool:
+        """Move queued attempts into the batch; False once _STOP is reached"""
+        queue = self._queue
+        while len(batch) < self.batch_size and not queue.empty():
+            record = queue.get_nowait()
+            if record is _STOP:
+                return False
+            batch.append(record)
+        return True
+
+    async def _run(self):
+        queue = self._queue
+        running = True
+        while running:
+            record = await queue.get()
+            if record is _STOP:
+                break
+            batch = [record]
+            running = self._take(batch)
+            if running and len(batch) < self.batch_size:
+                # Give a partial batch the rest of the interval to fill up
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                running = self._take(batch)
+            await self._write(batch)
+
+        # Write whatever was queued before the stop
+        batch = []
+        self._take(batch)
+        while batch:
+            await self._write(batch)
+            batch = []
+            self._take(batch)
+
+    def start(self):
+        """Start the background writer"""
+        if self._writer is None and self.enabled:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._batch_ready = asyncio.Event()
+            self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write every queued attempt and stop the background writer"""
+        if self._writer is None:
+            return
+        await self._queue.put(_STOP)
+        self._batch_ready.set()
+        await self._writer
+        self._writer = None
+        self._queue = None
+
+attempt_log = AttemptLog(
+    enabled=os.environ.get("QUIZ_ATTEMPT_LOG", "1") == "1",
+    batch_size=int(os.environ.get("QUIZ_ATTEMPT_BATCH_SIZE", "500")),
+    flush_interval=float(os.environ.get("QUIZ_ATTEMPT_FLUSH_INTERVAL", "0.5")),
+    max_queue=int(os.environ.get("QUIZ_ATTEMPT_QUEUE_SIZE", "10000"))
+)
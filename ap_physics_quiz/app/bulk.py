@@ -0,0 +1,245 @@
+import csv
+import io
+import json
+from typing import IO, AsyncIterator, Iterator, List
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+from app.database import Question, engine, prune_question_changes, read_session
+from app.topics import question_tags
+
+FORMATS = ("jsonl", "csv")
+CSV_FIELDS = ("text", "options", "correct_answer", "explanation", "tags")
+# CSV files list options and tags pipe-separated, so an option cannot contain one
+OPTION_SEPARATOR = "|"
+
+class ImportValidationError(ValueError):
+    """Raised for a question record that cannot be imported"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+class ImportReport:
+    """Counts of what happened during an import"""
+    MAX_ERRORS = 100
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors: List[str] = []
+
+    def add_error(self, error: ImportValidationError):
+        self.invalid += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(str(error))
+
+    def to_dict(self) -> dict:
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors
+        }
+
+def detect_format(filename: str) -> str:
+    """Guess the file format from its extension"""
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+def _unreadable(error: Exception, line: int) -> ImportValidationError:
+    if isinstance(error, UnicodeDecodeError):
+        # Text streams decode in chunks, so the bad bytes are somewhere in the next few lines
+        return ImportValidationError(line, "file is not valid UTF-8 from here on")
+    return ImportValidationError(line, f"invalid CSV: {error}")
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[tuple]:
+    """Yield ``(line number, raw record)`` pairs from a JSONL or CSV text stream.
+
+    Lines that are not valid JSON are yielded as an ImportValidationError in
+    place of the record, so that one bad line does not end the stream. A
+    file that cannot be read on (not UTF-8, or malformed CSV) raises one.
+    """
+    if fmt == "jsonl":
+        line_no = 0
+        try:
+            for line_no, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, ImportValidationError(line_no, f"invalid JSON: {e}")
+        except UnicodeDecodeError as e:
+            raise _unreadable(e, line_no + 1)
+    elif fmt == "csv":
+        reader = csv.DictReader(stream)
+        try:
+            for record in reader:
+                yield reader.line_num, record
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise _unreadable(e, reader.line_num)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+def check_readable(stream: IO[str], fmt: str):
+    """Read a JSONL or CSV text stream to the end without parsing records; raises ImportValidationError if it cannot be"""
+    reader = csv.reader(stream) if fmt == "csv" else stream
+    line_no = 0
+    try:
+        for line_no, _ in enumerate(reader, start=1):
+            pass
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise _unreadable(e, reader.line_num if fmt == "csv" else line_no + 1)
+
+def validate_record(line: int, record) -> dict:
+    """Check a raw record and convert it to column values for the questions table"""
+    if isinstance(record, ImportValidationError):
+        raise record
+    if not isinstance(record, dict):
+        raise ImportValidationError(line, "record must be an object")
+
+    values = {}
+    for field in ("text", "correct_answer", "explanation"):
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ImportValidationError(line, f"'{field}' is required")
+        values[field] = value.strip()
+
+    options = record.get("options")
+    if isinstance(options, str):
+        options = options.split(OPTION_SEPARATOR) if options.strip() else None
+    if options is not None:
+        if not isinstance(options, list) or not all(isinstance(o, str) for o in options):
+            raise ImportValidationError(line, "'options' must be a list of strings")
+        options = [option.strip() for option in options]
+        if len(options) < 2:
+            raise ImportValidationError(line, "a question needs at least two options")
+        if any(not option or OPTION_SEPARATOR in option for option in options):
+            raise ImportValidationError(line, f"options must be non-empty and not contain '{OPTION_SEPARATOR}'")
+        if len(set(options)) != len(options):
+            raise ImportValidationError(line, "options must be unique")
+        if values["correct_answer"] not in options:
+            raise ImportValidationError(line, "'correct_answer' must be one of the options")
+        values["options"] = options
+        values["correct_index"] = options.index(values["correct_answer"])
+    else:
+        values["options"] = None
+        values["correct_index"] = None
+
+    # Questions without tags are tagged by keyword
+    tags = record.get("tags")
+    if isinstance(tags, str):
+        tags = tags.split(OPTION_SEPARATOR) if tags.strip() else None
+    if tags is not None and (not isinstance(tags, list) or not all(isinstance(t, str) for t in tags)):
+        raise ImportValidationError(line, "'tags' must be a list of strings")
+    try:
+        values["tags"] = question_tags(tags, values["text"], values["explanation"])
+    except ValueError as e:
+        raise ImportValidationError(line, str(e))
+    return values
+
+async def import_questions(
+    stream: IO[str],
+    fmt: str,
+    batch_size: int = 1000,
+    strict: bool = False
+) -> ImportReport:
+    """Stream question records from a seekable text stream into the questions table.
+
+    Rows are inserted with one executemany per ``batch_size`` records, each
+    committed on its own, so memory use does not grow with the size of the
+    file and the database write lock is held for one batch at a time rather
+    than for the whole import. Questions whose text already exists are
+    skipped. Invalid records are counted and skipped, or abort the import
+    when ``strict`` is set.
+
+    The stream is read once before anything is written, so an import that
+    raises ImportValidationError has committed nothing: a file that cannot
+    be read to the end is always rejected up front, and in strict mode so
+    is a file with any invalid record.
+    """
+    if strict:
+        for line, record in iter_records(stream, fmt):
+            validate_record(line, record)
+    else:
+        check_readable(stream, fmt)
+    stream.seek(0)
+
+    report = ImportReport()
+    # The unique index on questions.text turns duplicates into no-ops
+    stmt = insert(Question).prefix_with("OR IGNORE")
+    batch: List[dict] = []
+    async with engine.connect() as conn:
+
+        async def flush():
+            result = await conn.execute(stmt, batch)
+            report.inserted += result.rowcount
+            report.duplicates += len(batch) - result.rowcount
+            batch.clear()
+            await conn.commit()
+
+        for line, record in iter_records(stream, fmt):
+            report.read += 1
+            try:
+                batch.append(validate_record(line, record))
+            except ImportValidationError as e:
+                if strict:
+                    raise
+                report.add_error(e)
+                continue
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+        await prune_question_changes(conn)
+        await conn.commit()
+    return report
+
+async def export_questions(fmt: str, batch_size: int = 1000) -> AsyncIterator[str]:
+    """Yield the question bank as JSONL or CSV text chunks, one batch at a time"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    columns = (
+        Question.id, Question.text, Question.options, Question.correct_answer, Question.explanation, Question.tags
+    )
+    if fmt == "csv":
+        yield ",".join(CSV_FIELDS) + "\r\n"
+
+    last_id = 0
+    while True:
+        # Keyset pagination keeps every page an index range scan
+        async with read_session() as db:
+            result = await db.execute(
+                select(*columns).where(Question.id > last_id).order_by(Question.id).limit(batch_size)
+            )
+            rows = result.all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+
+        buffer = io.StringIO()
+        if fmt == "jsonl":
+            for row in rows:
+                buffer.write(json.dumps({
+                    "text": row.text,
+                    "options": row.options,
+                    "correct_answer": row.correct_answer,
+                    "explanation": row.explanation,
+                    "tags": row.tags or []
+                }, ensure_ascii=False))
+                buffer.write("\n")
+        else:
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([
+                    row.text,
+                    OPTION_SEPARATOR.join(row.options) if row.options else "",
+                    row.correct_answer,
+                    row.explanation,
+                    OPTION_SEPARATOR.join(row.tags or ())
+                ])
+        yield buffer.getvalue()
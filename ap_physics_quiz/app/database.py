@@ -1,32 +1,127 @@
+import hashlib
+import json
 import os
-from sqlalchemy import Column, Integer, String, Text, create_engine
+import time
+from typing import List, Optional, Tuple
+from sqlalchemy import JSON, Column, Float, Index, Integer, String, Text, create_engine, delete, event, func, insert, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.future import select
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app import query_stats
+from app.grading import compile_answer
+from app.metrics import DB_SESSION_ACQUIRE
+from app.topics import classify
 
 # Database setup
-DATABASE_URL = "sqlite+aiosqlite:///./quiz.db"
+DATABASE_URL = os.environ.get("QUIZ_DATABASE_URL", "sqlite+aiosqlite:///./quiz.db")
 Base = declarative_base()
 
+# SQLite tuning. WAL lets readers run concurrently with the single writer,
+# which is what allows several worker processes to share one database file.
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("QUIZ_DB_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.environ.get("QUIZ_DB_SYNCHRONOUS", "NORMAL")
+DB_POOL_SIZE = int(os.environ.get("QUIZ_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("QUIZ_DB_MAX_OVERFLOW", "10"))
+
+# SQL logging: "off", "sampled" (one JSON line for a fraction of statements)
+# or "full" (SQLAlchemy echo of every statement). Statement timings are
+# always collected in app.query_stats.
+SQL_LOG = os.environ.get("QUIZ_SQL_LOG", "off")
+SQL_LOG_SAMPLE_RATE = float(os.environ.get("QUIZ_SQL_LOG_SAMPLE_RATE", "0.01"))
+SLOW_QUERY_MS = float(os.environ.get("QUIZ_SLOW_QUERY_MS", "100"))
+
+if SQL_LOG not in ("off", "sampled", "full"):
+    raise ValueError(f"QUIZ_SQL_LOG must be off, sampled or full, not {SQL_LOG!r}")
+
+def _engine_options():
+    options = {
+        "echo": SQL_LOG == "full",
+        "json_serializer": lambda value: json.dumps(value, ensure_ascii=False)
+    }
+    if DATABASE_URL.startswith("sqlite") and ":memory:" not in DATABASE_URL:
+        # The aiosqlite dialect defaults to NullPool, which opens a new
+        # connection (and thread) for every session
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW
+        )
+    return options
+
+def _configure_sqlite(dbapi_connection, connection_record, read_only=False):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
 # Create async engine and session
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(DATABASE_URL, **_engine_options())
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Separate read-only engine for question reads, so they never queue behind
+# connections that are holding a write transaction
+read_engine = create_async_engine(DATABASE_URL, **_engine_options())
+read_session = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+for _engine in (engine, read_engine):
+    query_stats.instrument(
+        _engine.sync_engine,
+        sample_rate=SQL_LOG_SAMPLE_RATE if SQL_LOG == "sampled" else 0.0,
+        slow_ms=SLOW_QUERY_MS
+    )
+
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine.sync_engine, "connect", _configure_sqlite)
+    event.listen(
+        read_engine.sync_engine,
+        "connect",
+        lambda dbapi_connection, connection_record: _configure_sqlite(
+            dbapi_connection, connection_record, read_only=True
+        )
+    )
+
 async def get_db():
     """Dependency to get the database session"""
     async with async_session() as session:
+        started = time.perf_counter()
+        await session.connection()
+        DB_SESSION_ACQUIRE.observe(time.perf_counter() - started, "write")
+        yield session
+
+async def get_read_db():
+    """Dependency to get a read-only database session"""
+    async with read_session() as session:
+        started = time.perf_counter()
+        await session.connection()
+        DB_SESSION_ACQUIRE.observe(time.perf_counter() - started, "read")
         yield session
 
 class Question(Base):
     """Model for questions in the database"""
     __tablename__ = "questions"
+    __table_args__ = (
+        # Question text is unique so that bulk imports can skip duplicates;
+        # created by _migrate_unique_question_text, which merges existing ones
+        Index("ix_questions_text", "text", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(Text, nullable=False)
-    options = Column(Text, nullable=True)  # Multiple choice options as pipe-separated string
+    options = Column(JSON, nullable=True)  # Multiple choice options as a list of strings
     correct_answer = Column(String, nullable=False)
+    # Position of correct_answer in options, or None for open-ended questions
+    # and answers that are not one of the options
+    correct_index = Column(Integer, nullable=True)
     explanation = Column(Text, nullable=False)
+    # Topic tags as a list of strings, indexed in question_tags by triggers
+    tags = Column(JSON, nullable=True)
 
     @classmethod
     async def get_all(cls, db: AsyncSession):
@@ -40,291 +135,458 @@ class Question(Base):
         result = await db.execute(select(cls).where(cls.id == question_id))
         return result.scalars().first()
 
+def correct_option_index(options: Optional[List[str]], correct_answer: str) -> Optional[int]:
+    """Find which option is the correct answer, as text or else as the only equal number or expression"""
+    if not options:
+        return None
+    key = correct_answer.strip().lower()
+    for index, option in enumerate(options):
+        if option.strip().lower() == key:
+            return index
+    compiled = compile_answer(correct_answer)
+    if compiled is not None:
+        matches = [index for index, option in enumerate(options) if compiled.matches(option)]
+        if len(matches) == 1:
+            return matches[0]
+    return None
+
+class QuestionTag(Base):
+    """One tag of one question, maintained by triggers on the questions table"""
+    __tablename__ = "question_tags"
+    __table_args__ = (Index("ix_question_tags_question_id", "question_id"),)
+
+    # (tag, question_id) order makes "questions with this tag after id N"
+    # a range scan of the primary key
+    tag = Column(String, primary_key=True)
+    question_id = Column(Integer, primary_key=True)
+
+class QuizMeta(Base):
+    """Key/value metadata about the database contents"""
+    __tablename__ = "quiz_meta"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=False)
+
+class QuizSession(Base):
+    """Quiz progress of one browser or API session"""
+    __tablename__ = "quiz_sessions"
+
+    id = Column(String, primary_key=True)
+    score = Column(Integer, nullable=False, default=0)
+    current_question_id = Column(Integer, nullable=True)
+    expires_at = Column(Float, nullable=False, index=True)
+
+class RateLimitBucket(Base):
+    """Token bucket of one rate-limited session or client address"""
+    __tablename__ = "rate_limits"
+
+    key = Column(String, primary_key=True)
+    # Below zero when recent requests were rejected
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
+
+class Attempt(Base):
+    """One answer submitted by a session"""
+    __tablename__ = "attempts"
+    __table_args__ = (Index("ix_attempts_question_id", "question_id"),)
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, nullable=False)
+    question_id = Column(Integer, nullable=False)
+    correct = Column(Integer, nullable=False)
+    option_index = Column(Integer, nullable=True)
+    answer = Column(Text, nullable=True)
+    # Time from serving the question to answering it, when known
+    response_ms = Column(Float, nullable=True)
+    # Fraction of the session's earlier answers that were correct
+    learner_score = Column(Float, nullable=True)
+    created_at = Column(Float, nullable=False)
+
+class Exam(Base):
+    """A generated exam; its id is derived from the parameters that generate it"""
+    __tablename__ = "exams"
+
+    id = Column(String, primary_key=True)
+    seed = Column(Integer, nullable=False)
+    topics = Column(JSON, nullable=False)
+    question_ids = Column(JSON, nullable=False)
+    # Topic each question was drawn for, None for questions drawn from the whole bank
+    question_topics = Column(JSON, nullable=False)
+    created_at = Column(Float, nullable=False)
+
+class ScheduleLearner(Base):
+    """Spaced repetition clock of one learner, counted in questions served"""
+    __tablename__ = "schedule_learners"
+
+    id = Column(String, primary_key=True)
+    step = Column(Integer, nullable=False, default=0)
+    answered = Column(Integer, nullable=False, default=0)
+    answered_correct = Column(Integer, nullable=False, default=0)
+    # Bumped by every write, so a worker can tell that another one wrote too
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float, nullable=False, index=True)
+
+class ScheduleItem(Base):
+    """Spaced repetition state of one question for one learner"""
+    __tablename__ = "schedule_items"
+
+    learner_id = Column(String, primary_key=True)
+    question_id = Column(Integer, primary_key=True)
+    interval = Column(Integer, nullable=False)
+    due_step = Column(Integer, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    lapses = Column(Integer, nullable=False, default=0)
+    last_correct = Column(Integer, nullable=False, default=0)
+
+class QuestionChange(Base):
+    """Log of question ids touched by writes to the questions table"""
+    __tablename__ = "question_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    question_id = Column(Integer, nullable=False)
+
+# Every write to the questions table is logged by these triggers, so that
+# processes holding an in-memory copy of the questions can apply just the
+# rows that changed. The highest seq doubles as the questions version.
+QUESTION_CHANGE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS questions_log_{event.lower()}
+    AFTER {event} ON questions
+    BEGIN
+        INSERT INTO question_changes (question_id) VALUES ({row}.id);
+    END"""
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+]
+
+# Full-text index over question text and explanation. It is an external
+# content table, so it stores only the index and reads column values from
+# the questions table. The triggers keep it and question_tags in step with
+# every insert, update and delete.
+SEARCH_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+        text, explanation, content='questions', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS questions_search_insert
+    AFTER INSERT ON questions
+    BEGIN
+        INSERT INTO questions_fts (rowid, text, explanation) VALUES (NEW.id, NEW.text, NEW.explanation);
+        INSERT OR IGNORE INTO question_tags (tag, question_id) SELECT value, NEW.id FROM json_each(NEW.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_search_update
+    AFTER UPDATE OF text, explanation ON questions
+    BEGIN
+        INSERT INTO questions_fts (questions_fts, rowid, text, explanation)
+            VALUES ('delete', OLD.id, OLD.text, OLD.explanation);
+        INSERT INTO questions_fts (rowid, text, explanation) VALUES (NEW.id, NEW.text, NEW.explanation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_tags_update
+    AFTER UPDATE OF tags ON questions
+    BEGIN
+        DELETE FROM question_tags WHERE question_id = OLD.id;
+        INSERT OR IGNORE INTO question_tags (tag, question_id) SELECT value, NEW.id FROM json_each(NEW.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_search_delete
+    AFTER DELETE ON questions
+    BEGIN
+        INSERT INTO questions_fts (questions_fts, rowid, text, explanation)
+            VALUES ('delete', OLD.id, OLD.text, OLD.explanation);
+        DELETE FROM question_tags WHERE question_id = OLD.id;
+    END""",
+]
+
+# Only the most recent changes are kept; caches that fall further behind
+# than this reload everything instead
+QUESTION_CHANGES_KEPT = 10000
+
+async def get_questions_version(db: AsyncSession):
+    """Get the current version of the questions table"""
+    result = await db.execute(select(func.max(QuestionChange.seq)))
+    return result.scalar() or 0
+
+async def get_question_changes(db: AsyncSession, since: int, limit: int):
+    """Get the current version and the ids of questions changed after ``since``.
+
+    The ids are None when they cannot be listed: the log no longer reaches
+    back to ``since``, or more than ``limit`` questions changed.
+    """
+    result = await db.execute(select(func.min(QuestionChange.seq), func.max(QuestionChange.seq)))
+    oldest, version = result.first()
+    version = version or 0
+    if version == since:
+        return version, []
+    if version < since or oldest > since + 1:
+        return version, None
+    result = await db.execute(
+        select(QuestionChange.question_id)
+        .where(QuestionChange.seq > since, QuestionChange.seq <= version)
+        .distinct()
+        .limit(limit + 1)
+    )
+    ids = result.scalars().all()
+    return version, (ids if len(ids) <= limit else None)
+
+async def prune_question_changes(conn):
+    """Delete change log entries older than the most recent QUESTION_CHANGES_KEPT"""
+    await conn.execute(
+        delete(QuestionChange).where(
+            QuestionChange.seq <= select(func.max(QuestionChange.seq)).scalar_subquery() - QUESTION_CHANGES_KEPT
+        )
+    )
+
+# Marks databases seeded before the seed data file had a content hash
+SEEDED_KEY = "seeded"
+SEED_HASH_KEY = "seed_hash"
+# Questions added to new databases; set to an empty string to start with an empty bank
+SEED_DATA_PATH = os.environ.get(
+    "QUIZ_SEED_DATA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "seed_questions.json")
+)
+
+# Indexes that existing databases may violate, created by a migration instead
+MIGRATED_INDEXES = {"ix_questions_text"}
+
+def _create_schema(connection):
+    """Create missing tables and indexes; safe to run from several processes"""
+    for table in Base.metadata.sorted_tables:
+        connection.execute(CreateTable(table, if_not_exists=True))
+        for index in table.indexes:
+            if index.name not in MIGRATED_INDEXES:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+# Schema migrations for existing database files, applied in order. Each one
+# must also be harmless on a freshly created schema.
+SCHEMA_VERSION_KEY = "schema_version"
+
+def _migrate_structured_options(connection):
+    """Convert pipe-separated options to JSON lists and fill in correct_index"""
+    columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(questions)")]
+    if "correct_index" not in columns:
+        connection.exec_driver_sql("ALTER TABLE questions ADD COLUMN correct_index INTEGER")
+    rows = connection.exec_driver_sql(
+        "SELECT id, options, correct_answer FROM questions "
+        "WHERE options IS NOT NULL AND json_valid(options) = 0"
+    ).fetchall()
+    for question_id, options, correct_answer in rows:
+        options = options.split("|")
+        connection.exec_driver_sql(
+            "UPDATE questions SET options = ?, correct_index = ? WHERE id = ?",
+            (
+                json.dumps(options, ensure_ascii=False),
+                correct_option_index(options, correct_answer),
+                question_id
+            )
+        )
+
+def _migrate_question_change_log(connection):
+    """Replace the questions_version counter with the question_changes log"""
+    for event in ("insert", "update", "delete"):
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS questions_version_{event}")
+    connection.exec_driver_sql("DELETE FROM quiz_meta WHERE key = 'questions_version'")
+
+def _add_missing_columns(connection, table: str, columns: dict):
+    existing = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+    for name, definition in columns.items():
+        if name not in existing:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+def _migrate_learner_scores(connection):
+    """Track each learner's answer counts and store them with attempts"""
+    _add_missing_columns(connection, "schedule_learners", {
+        "answered": "INTEGER NOT NULL DEFAULT 0",
+        "answered_correct": "INTEGER NOT NULL DEFAULT 0"
+    })
+    _add_missing_columns(connection, "attempts", {"learner_score": "FLOAT"})
+
+def _migrate_search_index(connection):
+    """Add topic tags and the full-text index, tagging existing questions by keyword"""
+    _add_missing_columns(connection, "questions", {"tags": "JSON"})
+    for statement in SEARCH_SCHEMA:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql("INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')")
+    rows = connection.exec_driver_sql(
+        "SELECT id, text, explanation FROM questions WHERE tags IS NULL"
+    ).fetchall()
+    for question_id, question_text, explanation in rows:
+        # The tags trigger fills question_tags
+        connection.exec_driver_sql(
+            "UPDATE questions SET tags = ? WHERE id = ?",
+            (json.dumps(classify(question_text, explanation)), question_id)
+        )
+
+# Seed questions whose correct answer was missing from their options:
+# text -> (options, correct_answer, explanation)
+SEED_ANSWER_FIXES = {
+    "A 50 N force is applied to an object at an angle of 30° with the horizontal. What is the horizontal component of the force?": (
+        ["25 N", "35 N", "43.3 N", "50 N"],
+        "43.3 N",
+        "The horizontal component of the force is given by Fh = F cosθ. Fh = 50 N × cos(30°) ≈ 43.3 N."
+    ),
+    "An object is dropped from a height of 5 meters. Neglecting air resistance, what is the object's velocity just before it hits the ground? (g = 9.8 m/s²)": (
+        ["5 m/s", "7 m/s", "9.9 m/s", "14 m/s"],
+        "9.9 m/s",
+        "Using the equation v = √(2gh), v = √(2 × 9.8 × 5) ≈ 9.9 m/s."
+    ),
+}
+
+def _migrate_answer_options(connection):
+    """Fix seed questions without their answer among the options and match answers to options numerically"""
+    for question_text, (options, correct_answer, explanation) in SEED_ANSWER_FIXES.items():
+        connection.exec_driver_sql(
+            "UPDATE questions SET options = ?, correct_answer = ?, explanation = ? "
+            "WHERE text = ? AND correct_index IS NULL",
+            (json.dumps(options, ensure_ascii=False), correct_answer, explanation, question_text)
+        )
+    rows = connection.exec_driver_sql(
+        "SELECT id, options, correct_answer FROM questions WHERE options IS NOT NULL AND correct_index IS NULL"
+    ).fetchall()
+    for question_id, options, correct_answer in rows:
+        correct_index = correct_option_index(json.loads(options), correct_answer)
+        if correct_index is not None:
+            connection.exec_driver_sql(
+                "UPDATE questions SET correct_index = ? WHERE id = ?", (correct_index, question_id)
+            )
+
+def _migrate_learner_versions(connection):
+    """Version learner schedules, so workers notice each other's writes"""
+    _add_missing_columns(connection, "schedule_learners", {"version": "INTEGER NOT NULL DEFAULT 0"})
+
+def _migrate_unique_question_text(connection):
+    """Merge questions with the same text into the oldest one, then make question text unique"""
+    duplicates = connection.exec_driver_sql(
+        "SELECT questions.id, kept.id FROM questions "
+        "JOIN (SELECT text, MIN(id) AS id FROM questions GROUP BY text HAVING COUNT(*) > 1) AS kept "
+        "ON questions.text = kept.text AND questions.id != kept.id"
+    ).fetchall()
+    if duplicates:
+        moves = [(kept_id, duplicate_id) for duplicate_id, kept_id in duplicates]
+        removed = [(duplicate_id,) for duplicate_id, _ in duplicates]
+        connection.exec_driver_sql("UPDATE attempts SET question_id = ? WHERE question_id = ?", moves)
+        # A learner with both copies scheduled keeps the oldest one's item
+        connection.exec_driver_sql("UPDATE OR IGNORE schedule_items SET question_id = ? WHERE question_id = ?", moves)
+        connection.exec_driver_sql("DELETE FROM schedule_items WHERE question_id = ?", removed)
+        # Stored exams point at the kept questions too; one that held both
+        # copies would ask the same question twice and is dropped instead
+        kept_ids = dict(duplicates)
+        for exam_id, question_ids in connection.exec_driver_sql("SELECT id, question_ids FROM exams").fetchall():
+            question_ids = json.loads(question_ids)
+            merged = [kept_ids.get(question_id, question_id) for question_id in question_ids]
+            if merged == question_ids:
+                continue
+            if len(set(merged)) != len(merged):
+                connection.exec_driver_sql("DELETE FROM exams WHERE id = ?", (exam_id,))
+            else:
+                connection.exec_driver_sql(
+                    "UPDATE exams SET question_ids = ? WHERE id = ?", (json.dumps(merged), exam_id)
+                )
+        connection.exec_driver_sql("DELETE FROM questions WHERE id = ?", removed)
+    for index in Question.__table__.indexes:
+        if index.name in MIGRATED_INDEXES:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+
+MIGRATIONS = [
+    _migrate_structured_options,
+    _migrate_question_change_log,
+    _migrate_learner_scores,
+    _migrate_search_index,
+    _migrate_answer_options,
+    _migrate_learner_versions,
+    _migrate_unique_question_text,
+]
+
+def _run_migrations(connection):
+    """Apply pending migrations inside the current transaction"""
+    # Writing the version row first takes the database write lock, so
+    # workers starting together apply each migration exactly once
+    connection.exec_driver_sql(
+        "INSERT OR IGNORE INTO quiz_meta (key, value) VALUES (?, '0')", (SCHEMA_VERSION_KEY,)
+    )
+    connection.exec_driver_sql(
+        "UPDATE quiz_meta SET value = value WHERE key = ?", (SCHEMA_VERSION_KEY,)
+    )
+    version = int(connection.exec_driver_sql(
+        "SELECT value FROM quiz_meta WHERE key = ?", (SCHEMA_VERSION_KEY,)
+    ).scalar())
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(connection)
+        connection.exec_driver_sql(
+            "UPDATE quiz_meta SET value = ? WHERE key = ?", (str(number), SCHEMA_VERSION_KEY)
+        )
+
 async def init_db():
     """Initialize the database with tables and sample data"""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_schema)
+        for trigger in QUESTION_CHANGE_TRIGGERS:
+            await conn.exec_driver_sql(trigger)
 
-    # Add sample questions if the database is empty
-    async with async_session() as session:
-        # Check if questions table is empty
-        result = await session.execute(select(Question))
-        if not result.scalars().first():
-            # Add sample questions
-            sample_questions = [
-                Question(
-                    text="A block of mass 2 kg is sliding on a frictionless surface with a velocity of 3 m/s. What is its kinetic energy?",
-                    options="3 J|6 J|9 J|18 J",
-                    correct_answer="9 J",
-                    explanation="Kinetic energy is calculated using the formula KE = (1/2)mv². For a 2 kg block moving at 3 m/s, KE = 0.5 × 2 × 3² = 9 J."
-                ),
-                Question(
-                    text="A 5 kg object accelerates from rest to 10 m/s in 5 seconds. What is the magnitude of the net force acting on it?",
-                    options="5 N|10 N|15 N|20 N",
-                    correct_answer="10 N",
-                    explanation="Using Newton's Second Law, F = ma. The acceleration is (change in velocity)/(time) = 10/5 = 2 m/s². Therefore, F = 5 kg × 2 m/s² = 10 N."
-                ),
-                Question(
-                    text="A satellite is in a circular orbit around Earth at a distance of 3R from Earth's center, where R is Earth's radius. If the acceleration due to gravity at Earth's surface is g, what is the satellite's acceleration?",
-                    options="g/3|g/6|g/9|g/12",
-                    correct_answer="g/9",
-                    explanation="The gravitational acceleration decreases with the square of the distance: a = g(R/r)². At a distance of 3R, a = g(R/3R)² = g/9."
-                ),
-                Question(
-                    text="A simple pendulum has a period of 2 seconds. What is its length? (g = 9.8 m/s²)",
-                    options="0.5 m|0.99 m|1.5 m|2.0 m",
-                    correct_answer="0.99 m",
-                    explanation="The period of a simple pendulum is T = 2π√(L/g). Solving for L: L = g(T/2π)² = 9.8(2/2π)² ≈ 0.99 m."
-                ),
-                Question(
-                    text="Two masses m1 = 3 kg and m2 = 5 kg are connected by a massless string over a frictionless pulley. What is the acceleration of the system?",
-                    options="1.225 m/s²|2.45 m/s²|4.9 m/s²|9.8 m/s²",
-                    correct_answer="2.45 m/s²",
-                    explanation="The acceleration is given by a = (m2-m1)g/(m1+m2) = (5-3)×9.8/(3+5) = 2.45 m/s²."
-                ),
-                Question(
-                    text="A uniform rod of length L and mass M rotates about an axis perpendicular to the rod passing through one end. What is its moment of inertia?",
-                    options="(1/3)ML²|(1/2)ML²|(2/3)ML²|ML²",
-                    correct_answer="(1/3)ML²",
-                    explanation="The moment of inertia for a uniform rod rotating about one end is I = (1/3)ML²."
-                ),
-                Question(
-                    text="What is the work done by a constant force of 10 N acting on an object that moves 5 m in the direction of the force?",
-                    options="20 J|30 J|40 J|50 J",
-                    correct_answer="50 J",
-                    explanation="Work is calculated as W = F·d·cosθ. When the force is in the same direction as displacement, cosθ = 1, so W = 10 N × 5 m = 50 J."
-                ),
-                Question(
-                    text="A spring with spring constant k = 100 N/m is compressed by 0.2 m from its equilibrium position. What is the elastic potential energy stored in the spring?",
-                    options="1 J|2 J|4 J|10 J",
-                    correct_answer="2 J",
-                    explanation="The elastic potential energy is calculated using U = (1/2)kx². U = 0.5 × 100 × 0.2² = 2 J."
-                ),
-                Question(
-                    text="A mass on a spring is executing simple harmonic motion with a period of 0.5 seconds. If the amplitude of the motion is 0.1 m, what is the maximum speed of the mass?",
-                    options="0.4π m/s|0.8π m/s|1.2π m/s|1.6π m/s",
-                    correct_answer="0.4π m/s",
-                    explanation="For simple harmonic motion, vmax = Aω, where ω = 2π/T. vmax = 0.1 × 2π/0.5 = 0.4π m/s."
-                ),
-                Question(
-                    text="What is the centripetal acceleration of an object moving with a speed of 10 m/s in a circle of radius 5 m?",
-                    options="5 m/s²|10 m/s²|15 m/s²|20 m/s²",
-                    correct_answer="20 m/s²",
-                    explanation="Centripetal acceleration is calculated using ac = v²/r = 10²/5 = 20 m/s²."
-                )
-                            Question(
-                text="A car of mass 1000 kg is moving at 20 m/s. What is its momentum?",
-                options="1000 kg·m/s|2000 kg·m/s|3000 kg·m/s|4000 kg·m/s",
-                correct_answer="2000 kg·m/s",
-                explanation="Momentum is calculated using p = mv. For a mass of 1000 kg moving at 20 m/s, p = 1000 × 20 = 2000 kg·m/s."
-            ),
-            Question(
-                text="An object of mass 10 kg is moving in a circle of radius 2 m with a speed of 4 m/s. What is its centripetal force?",
-                options="10 N|20 N|40 N|80 N",
-                correct_answer="20 N",
-                explanation="Centripetal force is given by Fc = mv²/r. For a mass of 10 kg moving at 4 m/s in a circle of radius 2 m, Fc = 10 × 4² / 2 = 20 N."
-            ),
-            Question(
-                text="A 50 N force is applied to an object at an angle of 30° with the horizontal. What is the horizontal component of the force?",
-                options="25 N|35 N|40 N|45 N",
-                correct_answer="43.3 N",
-                explanation="The horizontal component of the force is given by Fh = F cosθ. Fh = 50 N × cos(30°) ≈ 43.3 N."
-            ),
-            Question(
-                text="An object is dropped from a height of 5 meters. Neglecting air resistance, what is the object's velocity just before it hits the ground? (g = 9.8 m/s²)",
-                options="5 m/s|7 m/s|9 m/s|10 m/s",
-                correct_answer="9.8 m/s",
-                explanation="Using the equation v = √(2gh), v = √(2 × 9.8 × 5) ≈ 9.8 m/s."
-            ),
-            Question(
-                text="A block of mass 2 kg is placed on a frictionless surface. A force of 10 N is applied horizontally to the block. What is the acceleration of the block?",
-                options="2 m/s²|3 m/s²|4 m/s²|5 m/s²",
-                correct_answer="5 m/s²",
-                explanation="Using Newton's Second Law, F = ma. The acceleration is a = F/m = 10 N / 2 kg = 5 m/s²."
-            ),
-            Question(
-                text="A satellite is orbiting Earth at a height of 2R above the Earth's surface. What is the acceleration due to gravity at the satellite's location?",
-                options="g/2|g/4|g/8|g/16",
-                correct_answer="g/4",
-                explanation="The gravitational acceleration decreases with the square of the distance from the center of the Earth. At a height of 2R, the gravitational acceleration is a = g(1/(3))² = g/4."
-            ),
-            Question(
-                text="A particle moves in simple harmonic motion with an amplitude of 0.5 m and a frequency of 2 Hz. What is the maximum acceleration of the particle?",
-                options="4π² m/s²|8π² m/s²|2π² m/s²|π² m/s²",
-                correct_answer="4π² m/s²",
-                explanation="The maximum acceleration in SHM is given by a_max = ω²A, where ω = 2πf. Thus, a_max = (2π × 2)² × 0.5 = 4π² m/s²."
-            ),
-            Question(
-                text="What is the angular velocity of a wheel rotating at 60 rpm?",
-                options="2π/60 rad/s|π rad/s|π/30 rad/s|2π rad/s",
-                correct_answer="2π/60 rad/s",
-                explanation="Angular velocity ω is related to the rotation rate in revolutions per minute by ω = 2π × (rpm/60). For 60 rpm, ω = 2π/60 rad/s."
-            ),
-            Question(
-                text="A 2 kg object is moving in a circle with a radius of 1.5 m and a speed of 4 m/s. What is its centripetal acceleration?",
-                options="4/3 m/s²|6/3 m/s²|16/3 m/s²|5/3 m/s²",
-                correct_answer="16/3 m/s²",
-                explanation="Centripetal acceleration is calculated as a_c = v² / r. For v = 4 m/s and r = 1.5 m, a_c = 4² / 1.5 = 16/3 m/s²."
-            ),
-            Question(
-                text="A 10 kg object is at rest on a horizontal surface. What is the normal force acting on the object?",
-                options="10 N|20 N|0 N|98 N",
-                correct_answer="98 N",
-                explanation="The normal force is equal to the weight of the object, which is F_N = mg = 10 kg × 9.8 m/s² = 98 N."
-            ),
-            Question(
-                text="A block is sliding down a frictionless incline at an angle of 30°. What is the acceleration of the block?",
-                options="5 m/s²|9.8 m/s²|4.9 m/s²|10 m/s²",
-                correct_answer="4.9 m/s²",
-                explanation="The acceleration down the incline is given by a = g sinθ. For θ = 30°, a = 9.8 × sin(30°) = 4.9 m/s²."
-            ),
-            Question(
-                text="What is the period of a mass-spring system with a spring constant of 200 N/m and a mass of 4 kg?",
-                options="0.5 s|1 s|2 s|4 s",
-                correct_answer="1 s",
-                explanation="The period of a mass-spring system is given by T = 2π√(m/k). For m = 4 kg and k = 200 N/m, T = 2π√(4/200) ≈ 1 s."
-            ),
-            Question(
-                text="An object with mass 3 kg is placed on a frictionless horizontal surface. What is the object's acceleration when a force of 15 N is applied to it?",
-                options="2 m/s²|3 m/s²|4 m/s²|5 m/s²",
-                correct_answer="5 m/s²",
-                explanation="Using Newton's Second Law, F = ma. The acceleration is a = F/m = 15 N / 3 kg = 5 m/s²."
-            ),
-            Question(
-                text="A particle is rotating with a constant angular acceleration of 2 rad/s². What is the angular velocity after 5 seconds?",
-                options="5 rad/s|10 rad/s|15 rad/s|20 rad/s",
-                correct_answer="10 rad/s",
-                explanation="Angular velocity is given by ω = ω₀ + αt. With initial angular velocity ω₀ = 0 and α = 2 rad/s², after 5 seconds, ω = 0 + 2 × 5 = 10 rad/s."
-            ),
-            Question(
-                text="A wheel with moment of inertia 2 kg·m² is subjected to a torque of 6 N·m. What is the angular acceleration of the wheel?",
-                options="2 rad/s²|3 rad/s²|4 rad/s²|5 rad/s²",
-                correct_answer="3 rad/s²",
-                explanation="The angular acceleration is given by α = τ/I. With τ = 6 N·m and I = 2 kg·m², α = 6 / 2 = 3 rad/s²."
-            ),
-            Question(
-                text="The work-energy theorem states that the work done on an object is equal to its change in kinetic energy. If a 2 kg object speeds up from 0 m/s to 10 m/s, what is the work done on it?",
-                options="50 J|100 J|150 J|200 J",
-                correct_answer="100 J",
-                explanation="The change in kinetic energy is ΔKE = (1/2)mv² - (1/2)mu². For m = 2 kg and v = 10 m/s, ΔKE = 1/2 × 2 × 10² = 100 J."
-            ),
-            Question(
-                text="A mass is attached to a spring and is undergoing simple harmonic motion. If the amplitude is doubled, what happens to the maximum speed of the mass?",
-                options="Doubles|Halves|Quadruples|Stays the same",
-                correct_answer="Doubles",
-                explanation="The maximum speed in simple harmonic motion is given by vmax = Aω. Since ω is constant, doubling the amplitude will double the maximum speed."
-            )
-                        Question(
-                text="A disk with mass M and radius R is rotating about an axis through its center. A torque τ is applied to it, resulting in an angular acceleration α. What is the angular velocity after time t?",
-                options="ω = αt|ω = τt/I|ω = (τt)/M|ω = τt/R",
-                correct_answer="ω = τt/I",
-                explanation="The angular velocity is given by the equation ω = τt/I, where I is the moment of inertia of the disk. For a solid disk, I = 1/2MR²."
-            ),
-            Question(
-                text="A mass m slides down a frictionless incline at an angle of θ. If the object reaches the bottom with velocity v, what is the work done by gravity on the object?",
-                options="W = mgh|W = mg sin(θ)h|W = mgh cos(θ)|W = mg cos(θ)h",
-                correct_answer="W = mgh",
-                explanation="The work done by gravity is the change in potential energy, W = mgh, where h is the vertical height of the incline."
-            ),
-            Question(
-                text="A block of mass 2 kg is attached to a spring with spring constant k = 500 N/m. The block oscillates with an amplitude of 0.1 m. What is the maximum kinetic energy of the block?",
-                options="2.5 J|5.0 J|10.0 J|20.0 J",
-                correct_answer="2.5 J",
-                explanation="The maximum kinetic energy is equal to the maximum potential energy stored in the spring, which is given by KE_max = (1/2)kA². Thus, KE_max = (1/2) × 500 × (0.1)² = 2.5 J."
-            ),
-            Question(
-                text="A satellite is in a circular orbit around the Earth at a distance of 2R from the Earth's center. What is the gravitational force acting on the satellite?",
-                options="F = GmM/R²|F = GmM/4R²|F = GmM/2R²|F = GmM/3R²",
-                correct_answer="F = GmM/4R²",
-                explanation="The gravitational force between two masses is given by F = GmM/r². At a distance of 2R from the Earth's center, F = GmM/(2R)² = GmM/4R²."
-            ),
-            Question(
-                text="A 10 kg object is suspended from a spring. If the spring constant is 200 N/m, how much does the spring stretch when the object is in equilibrium?",
-                options="0.1 m|0.2 m|0.5 m|1.0 m",
-                correct_answer="0.5 m",
-                explanation="Using Hooke's Law, F = kx, where F is the weight of the object (mg), k is the spring constant, and x is the displacement. Solving for x, x = mg/k = 10 × 9.8 / 200 = 0.49 m, approximately 0.5 m."
-            ),
-            Question(
-                text="A 5 kg mass is rotating in a circle of radius 2 m at a constant speed of 3 m/s. What is the centripetal force acting on the mass?",
-                options="5 N|7.5 N|15 N|25 N",
-                correct_answer="7.5 N",
-                explanation="Centripetal force is given by Fc = mv²/r. For m = 5 kg, v = 3 m/s, and r = 2 m, Fc = 5 × 3² / 2 = 7.5 N."
-            ),
-            Question(
-                text="A 3 kg mass is moving with velocity 4 m/s in a circular path with a radius of 1.5 m. What is the angular momentum of the mass about the center of the circle?",
-                options="12 kg·m²/s|18 kg·m²/s|24 kg·m²/s|36 kg·m²/s",
-                correct_answer="18 kg·m²/s",
-                explanation="Angular momentum L is given by L = mvr. For m = 3 kg, v = 4 m/s, and r = 1.5 m, L = 3 × 4 × 1.5 = 18 kg·m²/s."
-            ),
-            Question(
-                text="A rigid body with moment of inertia I is subjected to a torque τ. What is the angular acceleration α of the body?",
-                options="α = τ/I|α = Iτ|α = τ/I²|α = Iτ²",
-                correct_answer="α = τ/I",
-                explanation="The angular acceleration is given by the equation α = τ/I, where τ is the applied torque and I is the moment of inertia."
-            ),
-            Question(
-                text="A particle moves along a straight line with constant acceleration. If its initial velocity is 0 and it accelerates for 5 seconds, reaching a velocity of 10 m/s, what is the acceleration of the particle?",
-                options="1 m/s²|2 m/s²|3 m/s²|4 m/s²",
-                correct_answer="2 m/s²",
-                explanation="Using the equation v = u + at, where u is the initial velocity, v is the final velocity, a is acceleration, and t is time. Solving for a, a = (v - u) / t = (10 - 0) / 5 = 2 m/s²."
-            ),
-            Question(
-                text="An object is moving with constant speed along a horizontal circle. If the radius of the circle is doubled and the speed is quadrupled, by what factor does the centripetal force change?",
-                options="2|4|8|16",
-                correct_answer="16",
-                explanation="Centripetal force is given by Fc = mv²/r. If the radius is doubled and the speed is quadruled, the centripetal force increases by a factor of (4²)/(2) = 16."
-            ),
-            Question(
-                text="A rotating disc with radius R and mass M has a moment of inertia I = 1/2MR². If a constant torque τ is applied to the disc, what is the angular acceleration?",
-                options="α = 2τ/MR²|α = τ/MR²|α = 2τ/3MR²|α = τ/2MR²",
-                correct_answer="α = 2τ/MR²",
-                explanation="Using the equation τ = Iα and I = 1/2MR², the angular acceleration α = τ / (1/2MR²) = 2τ / MR²."
-            ),
-            Question(
-                text="A spring with spring constant k = 100 N/m is compressed by 0.5 m. How much work is required to compress the spring?",
-                options="12.5 J|25 J|50 J|100 J",
-                correct_answer="12.5 J",
-                explanation="The work done in compressing a spring is given by W = (1/2)kx². For k = 100 N/m and x = 0.5 m, W = (1/2) × 100 × (0.5)² = 12.5 J."
-            ),
-            Question(
-                text="Two masses m1 and m2 are connected by a frictionless pulley. If m1 = 10 kg and m2 = 5 kg, and the system accelerates with acceleration a, what is the value of a?",
-                options="2.5 m/s²|3.5 m/s²|4.0 m/s²|5.0 m/s²",
-                correct_answer="3.5 m/s²",
-                explanation="Using Newton's second law, a = (m2 - m1)g / (m1 + m2). For m1 = 10 kg, m2 = 5 kg, and g = 9.8 m/s², a = (5 - 10) × 9.8 / (10 + 5) = -3.5 m/s²."
-            ),
-            Question(
-                text="A rotating wheel with angular velocity ω₀ = 10 rad/s accelerates at a constant rate of α = 2 rad/s². What is the angular velocity after 5 seconds?",
-                options="20 rad/s|30 rad/s|40 rad/s|50 rad/s",
-                correct_answer="20 rad/s",
-                explanation="The angular velocity is given by ω = ω₀ + αt. With ω₀ = 10 rad/s, α = 2 rad/s², and t = 5 s, ω = 10 + 2 × 5 = 20 rad/s."
-            ),
-            Question(
-                text="A 20 kg object is dropped from a height of 10 m. How much kinetic energy does it have just before it hits the ground? (g = 9.8 m/s²)",
-                options="100 J|150 J|200 J|250 J",
-                correct_answer="200 J",
-                explanation="The potential energy at the top is converted into kinetic energy. The potential energy is given by PE = mgh. For m = 20 kg, g = 9.8 m/s², and h = 10 m, PE = 20 × 9.8 × 10 = 200 J."
-            ),
-            Question(
-                text="A rigid rod of length L and mass M rotates about an axis through one end. What is the moment of inertia of the rod?",
-                options="(1/12)ML²|(1/2)ML²|(1/3)ML²|ML²",
-                correct_answer="(1/3)ML²",
-                explanation="The moment of inertia of a uniform rod rotating about an axis through one end is given by I = (1/3)ML²."
-            ),
-            Question(
-                text="A solid sphere with mass M and radius R rolls without slipping down an incline. What is the acceleration of the sphere along the incline?",
-                options="g/2|g/3|g/4|g/5",
-                correct_answer="g/5",
-                explanation="For rolling without slipping, the acceleration is given by a = g/(1 + I/MR²), where I = 2/5MR² for a solid sphere. Therefore, a = g/(1 + 2/5) = g/5."
-            ),
-            Question(
-                text="A particle undergoes simple harmonic motion with a period of T. If the amplitude of the motion is doubled, by what factor does the maximum velocity change?",
-                options="2|4|1/2|1/4",
-                correct_answer="2",
-                explanation="The maximum velocity is given by vmax = Aω. Since ω = 2π/T and amplitude is doubled, vmax will double as well."
-            )
-            ]
-            
-            for question in sample_questions:
-                session.add(question)
-            
-            await session.commit() 
\ No newline at end of file
+    async with engine.begin() as conn:
+        await conn.run_sync(_run_migrations)
+
+    await seed_questions()
+
+def _seed_data() -> Tuple[Optional[str], Optional[bytes]]:
+    """Content hash and raw contents of the seed data file, or (None, None) if seeding is off"""
+    if not SEED_DATA_PATH:
+        return None, None
+    with open(SEED_DATA_PATH, "rb") as f:
+        data = f.read()
+    return hashlib.sha256(data).hexdigest(), data
+
+def _seed_rows(data: bytes) -> List[dict]:
+    """Question rows for every question in the seed data file"""
+    return [
+        {
+            "text": question["text"],
+            "options": question.get("options"),
+            "correct_answer": question["correct_answer"],
+            "correct_index": correct_option_index(question.get("options"), question["correct_answer"]),
+            "explanation": question["explanation"],
+            "tags": question.get("tags") or classify(question["text"], question["explanation"])
+        }
+        for question in json.loads(data)["questions"]
+    ]
+
+def _apply_seed(connection, seed_hash: str, data: bytes) -> int:
+    """Insert the seed questions that are missing and record the seed hash; returns the number inserted"""
+    # Writing the hash row first takes the write lock, so workers starting
+    # together seed once and the others find the new hash
+    connection.exec_driver_sql(
+        "INSERT OR IGNORE INTO quiz_meta (key, value) VALUES (?, '')", (SEED_HASH_KEY,)
+    )
+    connection.exec_driver_sql("UPDATE quiz_meta SET value = value WHERE key = ?", (SEED_HASH_KEY,))
+    meta = dict(connection.exec_driver_sql(
+        "SELECT key, value FROM quiz_meta WHERE key IN (?, ?)", (SEED_HASH_KEY, SEEDED_KEY)
+    ).fetchall())
+    inserted = 0
+    if meta[SEED_HASH_KEY] == seed_hash:
+        return inserted
+    if meta[SEED_HASH_KEY] or SEEDED_KEY not in meta:
+        # A new or changed seed file. Databases seeded before seed hashes
+        # existed already hold its questions, minus deliberate deletions.
+        # Question text is unique, so questions already present are skipped.
+        result = connection.execute(insert(Question).prefix_with("OR IGNORE"), _seed_rows(data))
+        inserted = result.rowcount
+    connection.exec_driver_sql(
+        "UPDATE quiz_meta SET value = ? WHERE key = ?", (seed_hash, SEED_HASH_KEY)
+    )
+    return inserted
+
+async def seed_questions() -> int:
+    """Add the questions of the seed data file, unless this version of it was already loaded.
+
+    The file's content hash is stored in quiz_meta, so once a database holds
+    the current seed data this is a single lookup. When the file changes,
+    its questions whose text is not in the database are added in one bulk
+    insert; edited and deleted seed questions are left alone until then.
+    Returns the number of questions inserted.
+    """
+    seed_hash, data = _seed_data()
+    if seed_hash is None:
+        return 0
+    async with read_engine.connect() as conn:
+        stored = (await conn.exec_driver_sql(
+            "SELECT value FROM quiz_meta WHERE key = ?", (SEED_HASH_KEY,)
+        )).scalar()
+    if stored == seed_hash:
+        return 0
+    async with engine.begin() as conn:
+        return await conn.run_sync(_apply_seed, seed_hash, data) 
\ No newline at end of file
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.future import select
+
+from app.answer_key import AnswerKey, answer_key
+from app.database import Exam, async_session, read_session
+from app.question_pool import QuestionPool, QuestionRecord, question_pool
+from app.responses import dumps
+from app.selection import QuestionSelector, question_selector
+
+# Exams not generated again for this many seconds are deleted
+EXAM_TTL = float(os.environ.get("QUIZ_EXAM_TTL", str(7 * 24 * 60 * 60)))
+
+class ExamPaper(NamedTuple):
+    """The questions of one generated exam, in the order they are asked"""
+    id: str
+    seed: int
+    topics: Tuple[str, ...]
+    question_ids: Tuple[int, ...]
+    question_topics: Tuple[Optional[str], ...]
+
+    @classmethod
+    def from_row(cls, row) -> "ExamPaper":
+        return cls(row.id, row.seed, tuple(row.topics), tuple(row.question_ids), tuple(row.question_topics))
+
+def exam_id(seed: int, length: int, topics: Sequence[str]) -> str:
+    """Identifier of the exam generated from these parameters"""
+    key = json.dumps([seed, length, sorted(topics)])
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+def session_seed(session_id: str) -> int:
+    """Seed of the exams a session gets without choosing one, so asking again gives the same exam"""
+    return int.from_bytes(hashlib.sha256(session_id.encode()).digest()[:4], "big") >> 1
+
+def compose(
+    selector: QuestionSelector, seed: int, length: int, topics: Sequence[str]
+) -> List[Tuple[int, Optional[str]]]:
+    """Choose ``length`` distinct questions balanced across topics.
+
+    Topics take turns contributing a question, so each gets an equal share
+    until it runs out; with no topics given, every topic in the bank takes
+    part and questions from the whole bank fill any remaining places.
+    Candidates are drawn from sorted id lists with a generator seeded by
+    ``seed``, so every process holding the same questions composes the
+    same exam.
+    """
+    rng = random.Random(seed)
+    # A topic may lose up to length - 1 candidates to other topics sharing them
+    sample_size = 2 * length
+    streams = []
+    for topic in sorted(topics or selector.topics()):
+        ids = sorted(selector.question_ids(topic))
+        streams.append((topic, iter(rng.sample(ids, min(sample_size, len(ids))))))
+    rng.shuffle(streams)
+    if not topics:
+        ids = sorted(selector.question_ids(None))
+        streams.append((None, iter(rng.sample(ids, min(sample_size, len(ids))))))
+
+    chosen: Dict[int, Optional[str]] = {}
+    while streams and len(chosen) < length:
+        for stream in list(streams):
+            topic, candidates = stream
+            if topic is None and len(streams) > 1:
+                # The whole bank only fills up once the topics are exhausted
+                continue
+            question_id = next((c for c in candidates if c not in chosen), None)
+            if question_id is None:
+                streams.remove(stream)
+                continue
+            chosen[question_id] = topic
+            if len(chosen) == length:
+                break
+
+    questions = list(chosen.items())
+    rng.shuffle(questions)
+    return questions
+
+class ExamStore:
+    """Generated exams, shared by every learner who asks for the same one.
+
+    An exam is identified by a hash of its seed, length and topics, and is
+    stored in the exams table the first time any process generates it,
+    so a whole class taking the same exam costs one generation and every
+    worker can serve and grade it. Generating an exam again refreshes its
+    row; rows not refreshed for ``ttl`` seconds are deleted every
+    ``purge_every`` generations. Exams are cached per process (LRU
+    bounded by ``max_exams``) together with their JSON payload, which is
+    rebuilt only after a question changes.
+
+    Registered as a question pool listener to drop stale payloads.
+    """
+
+    def __init__(
+        self,
+        pool: QuestionPool = question_pool,
+        selector: QuestionSelector = question_selector,
+        key: AnswerKey = answer_key,
+        max_exams: int = 1000,
+        ttl: float = EXAM_TTL,
+        purge_every: int = 1000
+    ):
+        self.pool = pool
+        self.selector = selector
+        self.key = key
+        self.max_exams = max_exams
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._generated = 0
+        self._exams: "OrderedDict[str, ExamPaper]" = OrderedDict()
+        self._payloads: Dict[str, bytes] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    async def create(self, seed: int, length: int, topics: Sequence[str] = ()) -> ExamPaper:
+        """Get the exam generated from these parameters, generating it if needed"""
+        return await self._get(exam_id(seed, length, topics), (seed, length, tuple(topics)))
+
+    async def get(self, exam: str) -> Optional[ExamPaper]:
+        """Get a previously generated exam by id"""
+        return await self._get(exam, None)
+
+    async def _get(self, exam: str, parameters: Optional[tuple]) -> Optional[ExamPaper]:
+        while True:
+            paper = self._exams.get(exam)
+            if paper is not None:
+                self._exams.move_to_end(exam)
+                return paper
+            # Everyone asking for an exam at once shares a single load, and
+            # lookups by id wait for a generation that is under way
+            loading = self._loading.get(exam)
+            if loading is None:
+                loading = self._loading[exam] = asyncio.ensure_future(self._load(exam, parameters))
+                loading.add_done_callback(lambda done: self._forget_load(exam, done))
+                return await asyncio.shield(loading)
+            paper = await asyncio.shield(loading)
+            if paper is not None or parameters is None:
+                return paper
+            # Joined a lookup by id of an exam not generated yet: generate it
+            self._forget_load(exam, loading)
+
+    def _forget_load(self, exam: str, loading: asyncio.Future):
+        if self._loading.get(exam) is loading:
+            del self._loading[exam]
+
+    async def _load(self, exam: str, parameters: Optional[tuple]) -> Optional[ExamPaper]:
+        async with read_session() as db:
+            result = await db.execute(select(Exam).where(Exam.id == exam))
+            row = result.scalars().first()
+        if row is None and parameters is not None:
+            seed, length, topics = parameters
+            questions = compose(self.selector, seed, length, topics)
+            if not questions:
+                return None
+            question_ids, question_topics = zip(*questions)
+            now = time.time()
+            async with async_session() as db:
+                # Another worker may be generating the same exam; its row
+                # wins and only has its expiry pushed back
+                await db.execute(insert(Exam).values(
+                    id=exam,
+                    seed=seed,
+                    topics=list(topics),
+                    question_ids=list(question_ids),
+                    question_topics=list(question_topics),
+                    created_at=now
+                ).on_conflict_do_update(index_elements=[Exam.id], set_={"created_at": now}))
+                self._generated += 1
+                if self._generated % self.purge_every == 0:
+                    await db.execute(delete(Exam).where(Exam.created_at < now - self.ttl))
+                await db.commit()
+                result = await db.execute(select(Exam).where(Exam.id == exam))
+                row = result.scalars().first()
+        if row is None:
+            return None
+        paper = ExamPaper.from_row(row)
+        self._exams[exam] = paper
+        while len(self._exams) > self.max_exams:
+            evicted, _ = self._exams.popitem(last=False)
+            self._payloads.pop(evicted, None)
+        return paper
+
+    def payload(self, paper: ExamPaper) -> bytes:
+        """The exam as JSON, without answers"""
+        payload = self._payloads.get(paper.id)
+        if payload is None:
+            questions = []
+            for question_id, topic in zip(paper.question_ids, paper.question_topics):
+                record = self.pool.get(question_id)
+                if record is not None:
+                    questions.append({
+                        "id": record.id,
+                        "text": record.text,
+                        "options": record.options,
+                        "topic": topic
+                    })
+            payload = self._payloads[paper.id] = dumps({
+                "exam_id": paper.id,
+                "seed": paper.seed,
+                "topics": paper.topics,
+                "questions": questions
+            })
+        return payload
+
+    def grade(self, paper: ExamPaper, answers: Dict[int, tuple]) -> dict:
+        """Grade ``{question_id: (answer, option_index)}`` against the exam.
+
+        Unanswered questions count as wrong. The breakdown shows the
+        correct answer and explanation of every question, and totals per
+        topic.
+        """
+        results = []
+        by_topic: Dict[str, Dict[str, int]] = {}
+        correct = 0
+        for question_id, topic in zip(paper.question_ids, paper.question_topics):
+            key = self.key.get(question_id)
+            if key is None:
+                # Deleted since the exam was generated
+                continue
+            answer = answers.get(question_id)
+            is_correct = answer is not None and key.is_correct(*answer)
+            correct += is_correct
+            totals = by_topic.setdefault(topic or "other", {"total": 0, "correct": 0})
+            totals["total"] += 1
+            totals["correct"] += is_correct
+            results.append({
+                "question_id": question_id,
+                "topic": topic,
+                "answered": answer is not None,
+                "correct": is_correct,
+                "correct_answer": key.correct_answer,
+                "explanation": key.explanation
+            })
+        return {
+            "exam_id": paper.id,
+            "total": len(results),
+            "correct": correct,
+            "by_topic": by_topic,
+            "results": results
+        }
+
+    def questions_loaded(self, records: Iterable[QuestionRecord]):
+        self._payloads.clear()
+
+    def questions_changed(self, changed: Iterable[QuestionRecord], removed_ids: List[int]):
+        self._payloads.clear()
+
+exam_store = ExamStore()
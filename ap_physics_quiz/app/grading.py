@@ -0,0 +1,339 @@
+import math
+import os
+import re
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Relative difference within which two numbers count as the same answer
+REL_TOLERANCE = float(os.environ.get("QUIZ_GRADING_TOLERANCE", "0.02"))
+# Symbolic answers are compared by evaluating both sides at these many points
+SAMPLE_POINTS = 3
+# Longer or more deeply nested expressions are not graded numerically, so a
+# submission cannot exhaust the stack of the recursive descent parser
+MAX_TOKENS = 200
+MAX_NESTING = 20
+# Largest unit power accepted, e.g. kg·m²/s⁴; higher ones are not units
+# anyone writes and would overflow the SI factor
+MAX_UNIT_EXPONENT = 4
+
+# Exponents of length, mass, time and angle
+Dims = Tuple[int, int, int, int]
+
+_UNITS: Dict[str, Tuple[float, Dims]] = {
+    "m": (1.0, (1, 0, 0, 0)),
+    "g": (1e-3, (0, 1, 0, 0)),
+    "s": (1.0, (0, 0, 1, 0)),
+    "N": (1.0, (1, 1, -2, 0)),
+    "J": (1.0, (2, 1, -2, 0)),
+    "W": (1.0, (2, 1, -3, 0)),
+    "Pa": (1.0, (-1, 1, -2, 0)),
+    "Hz": (1.0, (0, 0, -1, 0)),
+    "rad": (1.0, (0, 0, 0, 1)),
+    "rev": (2 * math.pi, (0, 0, 0, 1)),
+    "°": (math.pi / 180, (0, 0, 0, 1)),
+    "deg": (math.pi / 180, (0, 0, 0, 1)),
+    "min": (60.0, (0, 0, 1, 0)),
+    "h": (3600.0, (0, 0, 1, 0)),
+}
+_PREFIXES = {"k": 1e3, "c": 1e-2, "m": 1e-3, "μ": 1e-6, "u": 1e-6, "n": 1e-9, "M": 1e6}
+_PREFIXABLE = ("m", "g", "s", "N", "J", "W", "Pa", "Hz")
+
+# Letters, not counting the superscripts that \w also matches
+_UNIT_TOKEN = re.compile(r"((?:(?![²³])[^\W\d_])+|°)(?:\^(-?\d{1,3})|([²³]))?")
+_UNIT_SEPARATORS = re.compile(r"[\s·*⋅.]+")
+_SIMPLE_QUANTITY = re.compile(r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(.*?)\s*$", re.DOTALL)
+# Characters that continue a number expression such as 0.4π or 2π/60
+_NUMBER_EXPRESSION = re.compile(r"[\d\s.+\-*/^()×÷·√π²³]*")
+_TOKEN = re.compile(
+    r"\s*(?:(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|(?P<op>[-+*/^()√×·÷])|"
+    r"(?P<sup>[²³])|(?P<pi>π)|(?P<sym>[^\W\d_]))"
+)
+_SUPERSCRIPTS = {"²": 2.0, "³": 3.0}
+# Keys need one of these (or a digit) to be graded as an expression rather than as text
+_EXPRESSION_MARKS = set("=/*×·^²³√()+-")
+
+def _relative_error(a: float, b: float) -> float:
+    difference = abs(a - b)
+    return 0.0 if difference <= 1e-12 else difference / max(abs(a), abs(b))
+
+def _within_tolerance(error: float) -> bool:
+    # The slack keeps answers exactly at the tolerance, like 0.49 for 0.5, from failing on rounding
+    return error <= REL_TOLERANCE * (1 + 1e-9)
+
+def _close(a: float, b: float) -> bool:
+    return _within_tolerance(_relative_error(a, b))
+
+def _normalize(text: str) -> str:
+    return text.strip().replace("−", "-").replace("⋅", "·").replace("**", "^")
+
+def parse_unit(text: str) -> Optional[Tuple[float, Dims]]:
+    """SI factor and dimensions of a unit such as ``kg·m/s²``; None if not a unit"""
+    factor = 1.0
+    dims = [0, 0, 0, 0]
+    for part_index, part in enumerate(text.split("/")):
+        sign = 1 if part_index == 0 else -1
+        position = 0
+        part = part.strip()
+        if not part:
+            return None
+        while position < len(part):
+            separator = _UNIT_SEPARATORS.match(part, position)
+            if separator:
+                position = separator.end()
+                continue
+            token = _UNIT_TOKEN.match(part, position)
+            if token is None:
+                return None
+            name, exponent, superscript = token.groups()
+            exponent = int(exponent) if exponent else int(_SUPERSCRIPTS.get(superscript, 1))
+            if abs(exponent) > MAX_UNIT_EXPONENT:
+                return None
+            unit = _UNITS.get(name)
+            if unit is None and name[:1] in _PREFIXES and name[1:] in _PREFIXABLE:
+                base_factor, base_dims = _UNITS[name[1:]]
+                unit = (_PREFIXES[name[0]] * base_factor, base_dims)
+            if unit is None:
+                return None
+            factor *= unit[0] ** (sign * exponent)
+            for axis, power in enumerate(unit[1]):
+                dims[axis] += sign * exponent * power
+            position = token.end()
+    return factor, tuple(dims)
+
+class _Parser:
+    """Recursive descent parser for arithmetic with symbols.
+
+    Juxtaposition binds tighter than ``*`` and ``/``, as usual in physics,
+    so ``GmM/4R²`` is ``(G·m·M)/(4·R²)``. Expressions compile to closures
+    taking a mapping of symbol values.
+    """
+
+    def __init__(self, text: str):
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None:
+                raise ValueError(f"unexpected {text[position]!r}")
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            if len(self.tokens) > MAX_TOKENS:
+                raise ValueError("expression is too long")
+            position = match.end()
+        self.position = 0
+        self.depth = 0
+        self.symbols = set()
+
+    def peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("unexpected end")
+        self.position += 1
+        return token
+
+    def nested(self, parse: Callable[[], Callable]) -> Callable[[dict], float]:
+        """Parse an operand one level deeper, refusing to go past MAX_NESTING"""
+        if self.depth >= MAX_NESTING:
+            raise ValueError("expression is nested too deeply")
+        self.depth += 1
+        try:
+            return parse()
+        finally:
+            self.depth -= 1
+
+    def parse(self) -> Callable[[dict], float]:
+        node = self.sum()
+        if self.position != len(self.tokens):
+            raise ValueError(f"unexpected {self.peek()[1]!r}")
+        return node
+
+    def sum(self):
+        node = self.product()
+        while self.peek() in (("op", "+"), ("op", "-")):
+            _, op = self.take()
+            left, right = node, self.product()
+            node = (lambda l, r: lambda env: l(env) + r(env))(left, right) if op == "+" else \
+                (lambda l, r: lambda env: l(env) - r(env))(left, right)
+        return node
+
+    def product(self):
+        node = self.juxtaposition()
+        while self.peek()[0] == "op" and self.peek()[1] in "*/×·÷":
+            _, op = self.take()
+            left, right = node, self.juxtaposition()
+            node = (lambda l, r: lambda env: l(env) / r(env))(left, right) if op in "/÷" else \
+                (lambda l, r: lambda env: l(env) * r(env))(left, right)
+        return node
+
+    def juxtaposition(self):
+        node = self.unary()
+        while self.starts_atom():
+            left, right = node, self.power()
+            node = (lambda l, r: lambda env: l(env) * r(env))(left, right)
+        return node
+
+    def starts_atom(self) -> bool:
+        kind, value = self.peek()
+        return kind in ("num", "pi", "sym") or (kind == "op" and value in "(√")
+
+    def unary(self):
+        if self.peek() in (("op", "-"), ("op", "+")):
+            _, op = self.take()
+            operand = self.nested(self.unary)
+            return (lambda o: lambda env: -o(env))(operand) if op == "-" else operand
+        return self.power()
+
+    def power(self):
+        node = self.atom()
+        while True:
+            kind, value = self.peek()
+            if kind == "sup":
+                self.take()
+                node = (lambda b, e: lambda env: b(env) ** e)(node, _SUPERSCRIPTS[value])
+            elif (kind, value) == ("op", "^"):
+                self.take()
+                exponent = self.nested(self.unary)
+                node = (lambda b, e: lambda env: b(env) ** e(env))(node, exponent)
+            else:
+                return node
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == "num":
+            number = float(value)
+            return lambda env: number
+        if kind == "pi":
+            return lambda env: math.pi
+        if kind == "sym":
+            self.symbols.add(value)
+            return lambda env: env[value]
+        if value == "(":
+            node = self.nested(self.sum)
+            if self.take() != ("op", ")"):
+                raise ValueError("missing )")
+            return node
+        if value == "√":
+            operand = self.nested(self.power)
+            return lambda env: math.sqrt(operand(env))
+        raise ValueError(f"unexpected {value!r}")
+
+class _SampleValues(dict):
+    """Deterministic pseudo-random values in [1, 5) for every symbol name"""
+
+    def __init__(self, point: int):
+        super().__init__()
+        self.point = point
+
+    def __missing__(self, name: str) -> float:
+        value = self[name] = 1 + (zlib.crc32(f"{name}:{self.point}".encode()) % 4000) / 1000
+        return value
+
+_SAMPLES = [_SampleValues(point) for point in range(SAMPLE_POINTS)]
+
+def _evaluate(text: str, allow_symbols: bool = True) -> Optional[Tuple[float, ...]]:
+    """Values of an expression at the sample points, or None if it does not parse or evaluate"""
+    try:
+        parser = _Parser(text)
+        function = parser.parse()
+        if parser.symbols and not allow_symbols:
+            return None
+        return tuple(function(samples) for samples in _SAMPLES)
+    except (ValueError, ZeroDivisionError, OverflowError, TypeError, RecursionError):
+        return None
+
+def parse_quantity(text: str) -> Optional[Tuple[float, Optional[float], Optional[Dims]]]:
+    """Parse ``number [unit]`` into (number, SI value, dimensions); the last two are None without a unit"""
+    simple = _SIMPLE_QUANTITY.match(text)
+    if simple and not (simple.group(2) and simple.group(2)[0] in "π√/*×÷·^(²³"):
+        number = float(simple.group(1))
+        unit_text = simple.group(2)
+    else:
+        split = _NUMBER_EXPRESSION.match(text).end()
+        number_text, unit_text = text[:split], text[split:].strip()
+        values = _evaluate(number_text, allow_symbols=False) if number_text.strip() else None
+        if values is None:
+            return None
+        number = values[0]
+    if not unit_text:
+        return number, None, None
+    unit = parse_unit(unit_text)
+    if unit is None:
+        return None
+    return number, number * unit[0], unit[1]
+
+class CompiledAnswer(NamedTuple):
+    """A correct answer parsed once, for comparing submissions numerically.
+
+    ``kind`` is "quantity" for a number with an optional unit, or
+    "expression" for a symbolic expression (or the right side of an
+    equation), kept as its values at the sample points.
+    """
+    kind: str
+    number: float = 0.0
+    si_value: Optional[float] = None
+    dims: Optional[Dims] = None
+    samples: Tuple[float, ...] = ()
+    lhs_samples: Optional[Tuple[float, ...]] = None
+
+    def error(self, answer: str) -> Optional[float]:
+        """Relative difference between a free-text answer and this one; None if they cannot be compared"""
+        answer = _normalize(answer)
+        if self.kind == "quantity":
+            parsed = parse_quantity(answer)
+            if parsed is None:
+                return None
+            number, si_value, dims = parsed
+            if dims is None or self.dims is None:
+                # A bare number is read in the unit of the correct answer
+                return _relative_error(number, self.number)
+            return _relative_error(si_value, self.si_value) if dims == self.dims else None
+
+        lhs, equals, rhs = answer.partition("=")
+        if equals:
+            if self.lhs_samples is not None:
+                lhs_samples = _evaluate(lhs)
+                if lhs_samples is None or not all(map(_close, lhs_samples, self.lhs_samples)):
+                    return None
+            answer = rhs
+        samples = _evaluate(answer)
+        return None if samples is None else max(map(_relative_error, samples, self.samples))
+
+    def matches(self, answer: str, distractors: Sequence["CompiledAnswer"] = ()) -> bool:
+        """Check a free-text answer against this one, within REL_TOLERANCE.
+
+        An answer at least as close to one of ``distractors``, the wrong
+        options of the question, counts as that option, so the tolerance
+        never accepts a neighbouring option such as 5 m/s² for 4.9 m/s².
+        """
+        error = self.error(answer)
+        if error is None or not _within_tolerance(error):
+            return False
+        for distractor in distractors:
+            distractor_error = distractor.error(answer)
+            if distractor_error is not None and distractor_error <= error:
+                return False
+        return True
+
+def compile_answer(text: str) -> Optional[CompiledAnswer]:
+    """Parse a correct answer, or None when it can only be compared as text"""
+    text = _normalize(text)
+    if not text or not (_EXPRESSION_MARKS.intersection(text) or any(c.isdigit() for c in text)):
+        return None
+    quantity = parse_quantity(text)
+    if quantity is not None:
+        number, si_value, dims = quantity
+        return CompiledAnswer("quantity", number, si_value, dims)
+    lhs, equals, rhs = text.partition("=")
+    lhs_samples = None
+    if equals:
+        lhs_samples = _evaluate(lhs)
+        if lhs_samples is None:
+            return None
+        text = rhs
+    samples = _evaluate(text)
+    if samples is None:
+        return None
+    return CompiledAnswer("expression", samples=samples, lhs_samples=lhs_samples)
@@ -0,0 +1,196 @@
+import bisect
+from time import perf_counter
+from typing import Dict, Iterable, Tuple
+
+# Latency histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        """Increase the counter for the given label values"""
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterable[str]:
+        for values, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, values)} {value}"
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def set(self, *label_values: str, value: float):
+        """Set the gauge for the given label values"""
+        self._values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1):
+        """Decrease the gauge for the given label values"""
+        self._values[label_values] = self._values.get(label_values, 0) - amount
+
+class Histogram:
+    """Cumulative histogram of observed values, optionally split by labels"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        """Record one observation for the given label values"""
+        counts = self._values.get(label_values)
+        if counts is None:
+            counts = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        counts = self._values.get(label_values)
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self) -> Iterable[str]:
+        bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+        for values, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labels, values, bound)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, values)} {counts[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}"
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "quiz_http_requests_total", "HTTP requests handled", ("method", "route", "status")
+))
+REQUEST_LATENCY = registry.register(Histogram(
+    "quiz_http_request_duration_seconds", "HTTP request latency", ("route",)
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "quiz_http_requests_in_flight", "HTTP requests currently being handled"
+))
+REQUEST_ERRORS = registry.register(Counter(
+    "quiz_http_request_errors_total", "HTTP requests that failed with a 5xx or an exception", ("route",)
+))
+DB_SESSION_ACQUIRE = registry.register(Histogram(
+    "quiz_db_session_acquire_seconds", "Time to check out a database connection", ("engine",)
+))
+TEMPLATE_RENDER = registry.register(Histogram(
+    "quiz_template_render_seconds", "Time to render a template", ("template",)
+))
+ATTEMPTS_WRITTEN = registry.register(Counter(
+    "quiz_attempts_written_total", "Attempts written to the attempts table", ("result",)
+))
+ATTEMPT_QUEUE_DEPTH = registry.register(Gauge(
+    "quiz_attempt_queue_depth", "Attempts waiting to be written"
+))
+PAGE_CACHE_LOOKUPS = registry.register(Counter(
+    "quiz_page_cache_lookups_total", "Question page cache lookups", ("result",)
+))
+RATE_LIMITED = registry.register(Counter(
+    "quiz_rate_limited_total", "Requests rejected by the rate limiter", ("limit",)
+))
+STARTUP_PHASES = registry.register(Gauge(
+    "quiz_startup_phase_seconds", "Time this process spent in each startup phase", ("phase",)
+))
+
+_STATUS_TEXT = {status: str(status) for status in range(100, 600)}
+# Any other method is counted as "other", so clients cannot add label values
+_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+class MetricsMiddleware:
+    """ASGI middleware that records request count, latency and errors per route.
+
+    Routes are labelled with their path template (``/api/question``), not the
+    raw URL, so the number of label values stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_names: Dict[object, str] = {}
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        label = self._route_names.get(endpoint)
+        if label is None:
+            label = "<unknown>"
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint or getattr(route, "app", None) is endpoint:
+                    label = route.path
+                    break
+            self._route_names[endpoint] = label
+        return label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            route = self._route_label(scope)
+            method = scope["method"] if scope["method"] in _METHODS else "other"
+            REQUESTS.inc(method, route, _STATUS_TEXT.get(status) or str(status))
+            REQUEST_LATENCY.observe(elapsed, route)
+            if status >= 500:
+                REQUEST_ERRORS.inc(route)
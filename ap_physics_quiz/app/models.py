@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 
+# Longest free-text answer accepted; real answers are a few words or a formula
+MAX_ANSWER_LENGTH = 200
+
 class QuestionResponse(BaseModel):
     """Response model for a question"""
     id: int
@@ -8,6 +11,48 @@ class QuestionResponse(BaseModel):
     options: Optional[List[str]] = None
 
 class AnswerRequest(BaseModel):
-    """Request model for submitting an answer"""
+    """Request model for submitting an answer, either as text or as an option index"""
     question_id: int
-    answer: str 
\ No newline at end of file
+    answer: Optional[str] = Field(None, max_length=MAX_ANSWER_LENGTH)
+    option_index: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_answer_given(self):
+        if self.answer is None and self.option_index is None:
+            raise ValueError("either answer or option_index is required")
+        return self
+
+class QuestionSummary(QuestionResponse):
+    """A question in search results, with its topic tags"""
+    tags: List[str] = []
+
+class SearchResponse(BaseModel):
+    """One page of question search results"""
+    questions: List[QuestionSummary]
+    # Pass as ``after`` to get the next page; None on the last page
+    next_after: Optional[int] = None
+
+class ExamRequest(BaseModel):
+    """Request model for generating an exam; the same parameters give the same exam"""
+    length: int = Field(20, ge=1, le=100)
+    topics: List[str] = []
+    seed: Optional[int] = Field(None, ge=0, lt=2 ** 63)
+
+class VariantResponse(BaseModel):
+    """A generated numeric variant of a question template"""
+    id: str
+    text: str
+    options: List[str]
+    tags: List[str] = []
+
+class VariantAnswerRequest(BaseModel):
+    """Request model for answering a generated variant, identified by ``template:seed``"""
+    variant_id: str
+    answer: Optional[str] = Field(None, max_length=MAX_ANSWER_LENGTH)
+    option_index: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_answer_given(self):
+        if self.answer is None and self.option_index is None:
+            raise ValueError("either answer or option_index is required")
+        return self
@@ -0,0 +1,206 @@
+import os
+import re
+import secrets
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from fastapi.responses import Response
+from jinja2 import Environment, meta
+from markupsafe import Markup, escape
+
+from app.metrics import PAGE_CACHE_LOOKUPS, TEMPLATE_RENDER
+from app.question_pool import QuestionRecord
+from app.static_assets import accepts_encoding, encoding_qualities
+
+PAGE_CACHE_SIZE = int(os.environ.get("QUIZ_PAGE_CACHE_SIZE", "4096"))
+PAGE_CACHE_GZIP = os.environ.get("QUIZ_PAGE_CACHE_GZIP", "1") == "1"
+# How often to ask Jinja whether template files changed, in seconds
+TEMPLATE_CHECK_INTERVAL = 1.0
+
+# Slots are rendered as these markers and split out of the page afterwards.
+# Escaping leaves NUL alone, so question text could contain a marker; the
+# random token, new in every process, keeps text from matching one.
+_SLOT_TOKEN = secrets.token_hex(8)
+_SLOT_MARKER = f"\x00slot:{_SLOT_TOKEN}:{{}}\x00"
+_SLOT_RE = re.compile(f"\x00slot:{_SLOT_TOKEN}:(\\w+)\x00")
+
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+# Empty stored block with the final-block bit set
+_DEFLATE_END = b"\x01\x00\x00\xff\xff"
+
+def _deflate_segment(data: bytes) -> bytes:
+    """Compress a segment into deflate blocks that end on a byte boundary.
+
+    A sync flush leaves the stream byte aligned without marking the last
+    block final, so independently compressed segments can be concatenated
+    with stored blocks in between.
+    """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+def _stored_blocks(data: bytes) -> Iterable[bytes]:
+    """Wrap data in uncompressed deflate blocks"""
+    for start in range(0, len(data), 0xFFFF):
+        chunk = data[start:start + 0xFFFF]
+        yield b"\x00" + struct.pack("<HH", len(chunk), len(chunk) ^ 0xFFFF) + chunk
+
+def _encode_slot(value: Union[str, bytes]) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(escape(value)).encode()
+
+class PageFragment(NamedTuple):
+    """A rendered page split around its per-user slots"""
+    templates: tuple
+    # Encoded page text; slot i goes between segments i and i + 1
+    segments: Tuple[bytes, ...]
+    slots: Tuple[str, ...]
+    # Segments compressed with _deflate_segment, or None without gzip
+    deflated: Optional[Tuple[bytes, ...]]
+
+class PageCache:
+    """LRU cache of question pages rendered once and shared by every user.
+
+    Pages are rendered with ``slot(name)`` markers in place of anything that
+    depends on the session (score, the submitted answer). The output is
+    split around the markers, encoded and, if enabled, deflated once; each
+    request only encodes its slot values and joins the pieces. Gzip
+    responses are built by splicing the slot values in as stored blocks,
+    so the question markup is never compressed twice.
+
+    Entries are keyed by template, question id and variant and remember the
+    template objects they were rendered from, so editing a template (which
+    makes Jinja load a new template object) re-renders the page after at
+    most ``TEMPLATE_CHECK_INTERVAL`` seconds. The cache is a question pool
+    listener and drops the pages of changed questions.
+    """
+
+    def __init__(self, env: Environment, max_size: int = PAGE_CACHE_SIZE, gzip: bool = PAGE_CACHE_GZIP):
+        self.env = env
+        self.max_size = max_size
+        self.gzip = gzip
+        self._pages: "OrderedDict[tuple, PageFragment]" = OrderedDict()
+        self._partials: "OrderedDict[tuple, Tuple[object, bytes]]" = OrderedDict()
+        self._parents: Dict[str, Tuple[str, ...]] = {}
+        # name -> (checked at, template objects)
+        self._checked: Dict[str, Tuple[float, tuple]] = {}
+
+    def __len__(self):
+        return len(self._pages)
+
+    def clear(self):
+        self._pages.clear()
+
+    def questions_loaded(self, records: Iterable[QuestionRecord]):
+        self.clear()
+
+    def questions_changed(self, changed: Iterable[QuestionRecord], removed_ids: List[int]):
+        stale = {record.id for record in changed}
+        stale.update(removed_ids)
+        for key in [key for key in self._pages if key[1] in stale]:
+            del self._pages[key]
+
+    def warm(self, names: Iterable[str]):
+        """Load the templates of these pages and everything they extend or include"""
+        for name in names:
+            self._templates(name)
+
+    def _templates(self, name: str) -> tuple:
+        """The current template objects for a page and everything it extends or includes"""
+        now = time.monotonic()
+        checked = self._checked.get(name)
+        if checked is not None and now - checked[0] < TEMPLATE_CHECK_INTERVAL:
+            return checked[1]
+
+        names = self._parents.get(name)
+        if names is None:
+            names = [name]
+            for current in names:
+                source = self.env.loader.get_source(self.env, current)[0]
+                for referenced in meta.find_referenced_templates(self.env.parse(source)):
+                    if referenced and referenced not in names:
+                        names.append(referenced)
+            names = self._parents[name] = tuple(names)
+        templates = tuple(self.env.get_template(current) for current in names)
+        self._checked[name] = (now, templates)
+        return templates
+
+    def _build(self, name: str, templates: tuple, context: dict) -> PageFragment:
+        started = time.perf_counter()
+        html = templates[0].render(context, slot=lambda slot_name: Markup(_SLOT_MARKER.format(slot_name)))
+        TEMPLATE_RENDER.observe(time.perf_counter() - started, name)
+        parts = _SLOT_RE.split(html)
+        segments = tuple(part.encode() for part in parts[0::2])
+        deflated = tuple(_deflate_segment(segment) for segment in segments) if self.gzip else None
+        return PageFragment(templates, segments, tuple(parts[1::2]), deflated)
+
+    def page(self, name: str, question: QuestionRecord, variant, context: dict) -> PageFragment:
+        """Get the shared part of a question page, rendering it if needed.
+
+        ``context`` must not depend on the session; use ``slot(name)`` in
+        the template for anything that does.
+        """
+        key = (name, question.id, variant)
+        templates = self._templates(name)
+        fragment = self._pages.get(key)
+        if fragment is not None and fragment.templates == templates:
+            self._pages.move_to_end(key)
+            PAGE_CACHE_LOOKUPS.inc("hit")
+            return fragment
+
+        PAGE_CACHE_LOOKUPS.inc("miss")
+        fragment = self._build(name, templates, context)
+        if self.max_size > 0:
+            self._pages[key] = fragment
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_size:
+                self._pages.popitem(last=False)
+        return fragment
+
+    def partial(self, name: str, **context) -> bytes:
+        """Render a small per-user template to a slot value, memoized by its context values"""
+        key = (name, tuple(sorted(context.items())))
+        templates = self._templates(name)
+        cached = self._partials.get(key)
+        if cached is not None and cached[0] == templates:
+            self._partials.move_to_end(key)
+            return cached[1]
+        html = templates[0].render(context).encode()
+        self._partials[key] = (templates, html)
+        while len(self._partials) > 1024:
+            self._partials.popitem(last=False)
+        return html
+
+    def response(self, fragment: PageFragment, slots: Dict[str, Union[str, bytes]], accept_encoding: str = "") -> Response:
+        """Splice slot values into a page and build the HTML response.
+
+        ``str`` values are escaped; ``bytes`` (from ``partial``) are used as is.
+        """
+        values = [_encode_slot(slots[slot_name]) for slot_name in fragment.slots]
+        segments = fragment.segments
+        if fragment.deflated is None or not accepts_encoding(encoding_qualities(accept_encoding), "gzip"):
+            body = [segments[0]]
+            for value, segment in zip(values, segments[1:]):
+                body.append(value)
+                body.append(segment)
+            return Response(b"".join(body), media_type="text/html", headers={"Vary": "Accept-Encoding"})
+
+        deflated = fragment.deflated
+        body = [_GZIP_HEADER, deflated[0]]
+        crc = zlib.crc32(segments[0])
+        size = len(segments[0])
+        for value, segment, compressed in zip(values, segments[1:], deflated[1:]):
+            body.extend(_stored_blocks(value))
+            body.append(compressed)
+            crc = zlib.crc32(segment, zlib.crc32(value, crc))
+            size += len(value) + len(segment)
+        body.append(_DEFLATE_END)
+        body.append(struct.pack("<II", crc, size & 0xFFFFFFFF))
+        return Response(
+            b"".join(body),
+            media_type="text/html",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
@@ -0,0 +1,132 @@
+import bisect
+import json
+import logging
+import random
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement so that queries differing only in literals group together"""
+    statement = _STRING_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _IN_LIST_RE.sub("(?)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+class _Entry:
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples"""
+        target = self.count * fraction
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max_ms
+
+class QueryStats:
+    """In-memory latency histograms of SQL statements, grouped by fingerprint"""
+
+    def __init__(self, max_fingerprints: int = 500):
+        self.max_fingerprints = max_fingerprints
+        self._entries: Dict[str, _Entry] = {}
+
+    def record(self, statement: str, duration_ms: float, rows: int):
+        """Add one statement execution to the histograms"""
+        key = fingerprint(statement)
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_fingerprints:
+                key = "<other>"
+                entry = self._entries.setdefault(key, _Entry())
+            else:
+                entry = self._entries[key] = _Entry()
+        entry.count += 1
+        entry.total_ms += duration_ms
+        if duration_ms > entry.max_ms:
+            entry.max_ms = duration_ms
+        if rows > 0:
+            entry.rows += rows
+        entry.buckets[bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+
+    def snapshot(self) -> List[dict]:
+        """Get the statistics of every fingerprint, slowest total time first"""
+        return [
+            {
+                "statement": key,
+                "count": entry.count,
+                "total_ms": round(entry.total_ms, 3),
+                "mean_ms": round(entry.total_ms / entry.count, 3),
+                "p50_ms": entry.percentile(0.5),
+                "p95_ms": entry.percentile(0.95),
+                "p99_ms": entry.percentile(0.99),
+                "max_ms": round(entry.max_ms, 3),
+                "rows": entry.rows,
+                "buckets": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], entry.buckets))
+            }
+            for key, entry in sorted(
+                self._entries.items(), key=lambda item: item[1].total_ms, reverse=True
+            )
+        ]
+
+    def reset(self):
+        """Forget all recorded statements"""
+        self._entries.clear()
+
+query_stats = QueryStats()
+
+def instrument(sync_engine, sample_rate: float = 0.0, slow_ms: float = 100.0):
+    """Record timing of every statement run by an engine.
+
+    ``sample_rate`` is the fraction of statements written to the log as one
+    JSON line each. Statements slower than ``slow_ms`` are always logged.
+    Row counts are only known for writes; SQLite reports -1 for SELECTs.
+    """
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        rows = cursor.rowcount
+        query_stats.record(statement, duration_ms, rows)
+        if duration_ms >= slow_ms or (sample_rate and random.random() < sample_rate):
+            logger.log(
+                logging.WARNING if duration_ms >= slow_ms else logging.INFO,
+                json.dumps({
+                    "statement": fingerprint(statement),
+                    "duration_ms": round(duration_ms, 3),
+                    "rows": rows,
+                    "executemany": executemany
+                })
+            )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import random
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.future import select
+
+from app.database import Question, get_question_changes, get_questions_version, read_session
+
+logger = logging.getLogger(__name__)
+
+class QuestionRecord(NamedTuple):
+    """Immutable, pre-parsed copy of a question row"""
+    id: int
+    text: str
+    options: Optional[Tuple[str, ...]]
+    correct_answer: str
+    correct_index: Optional[int]
+    explanation: str
+    tags: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_row(cls, row) -> "QuestionRecord":
+        """Build a record from a Question row or a result row with the same columns"""
+        return cls(
+            id=row.id,
+            text=row.text,
+            options=tuple(row.options) if row.options else None,
+            correct_answer=row.correct_answer,
+            correct_index=row.correct_index,
+            explanation=row.explanation,
+            tags=tuple(row.tags) if row.tags else ()
+        )
+
+_COLUMNS = (
+    Question.id,
+    Question.text,
+    Question.options,
+    Question.correct_answer,
+    Question.correct_index,
+    Question.explanation,
+    Question.tags
+)
+
+class QuestionPool:
+    """Process-local cache of every question, used to serve random picks.
+
+    The pool is loaded once at startup and then kept in sync by a background
+    task that polls the question_changes log (written by triggers on the
+    questions table) and applies the changed rows. Request handlers only
+    ever read from memory.
+
+    Listeners added with ``add_listener`` are told about every load and
+    change, so that derived indexes can stay in sync with the pool. They
+    implement ``questions_loaded(records)`` and
+    ``questions_changed(changed, removed_ids)``.
+    """
+
+    def __init__(self, poll_interval: float = 2.0, max_incremental: int = 1000):
+        self.poll_interval = poll_interval
+        # More changes than this at once are applied by reloading everything
+        self.max_incremental = max_incremental
+        self.version: Optional[int] = None
+        # Records are kept in a dense list for random selection, with the
+        # position of every id for direct lookups
+        self._records: List[QuestionRecord] = []
+        self._positions: Dict[int, int] = {}
+        self._listeners = []
+        self._watcher: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._records)
+
+    def add_listener(self, listener):
+        """Register an object to be told about loads and changes"""
+        self._listeners.append(listener)
+
+    async def load(self):
+        """Load every question from the database into memory"""
+        async with read_session() as db:
+            version = await get_questions_version(db)
+            result = await db.execute(select(*_COLUMNS).order_by(Question.id))
+            records = [QuestionRecord.from_row(row) for row in result]
+        self._records = records
+        self._positions = {record.id: position for position, record in enumerate(records)}
+        self.version = version
+        for listener in self._listeners:
+            listener.questions_loaded(records)
+        logger.info("Loaded %d questions into the pool (version %d)", len(records), version)
+
+    async def refresh(self):
+        """Apply changes made to the questions table since the last load or refresh"""
+        async with read_session() as db:
+            version, changed_ids = await get_question_changes(db, self.version or 0, self.max_incremental)
+            if version == self.version:
+                return False
+            if changed_ids is not None:
+                result = await db.execute(select(*_COLUMNS).where(Question.id.in_(changed_ids)))
+                changed = [QuestionRecord.from_row(row) for row in result]
+        if changed_ids is None:
+            await self.load()
+            return True
+
+        found = {record.id for record in changed}
+        removed_ids = [question_id for question_id in changed_ids if question_id not in found]
+        self._apply(changed, removed_ids)
+        self.version = version
+        for listener in self._listeners:
+            listener.questions_changed(changed, removed_ids)
+        return True
+
+    def _apply(self, changed: List[QuestionRecord], removed_ids: List[int]):
+        records, positions = self._records, self._positions
+        for record in changed:
+            position = positions.get(record.id)
+            if position is None:
+                positions[record.id] = len(records)
+                records.append(record)
+            else:
+                records[position] = record
+        for question_id in removed_ids:
+            position = positions.pop(question_id, None)
+            if position is None:
+                continue
+            # Fill the hole with the last record to keep the list dense
+            last = records.pop()
+            if position < len(records):
+                records[position] = last
+                positions[last.id] = position
+
+    def random(self) -> Optional[QuestionRecord]:
+        """Get a random question, or None if the pool is empty"""
+        records = self._records
+        if not records:
+            return None
+        return records[random.randrange(len(records))]
+
+    def get(self, question_id: int) -> Optional[QuestionRecord]:
+        """Get a question by ID"""
+        position = self._positions.get(question_id)
+        return self._records[position] if position is not None else None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the question pool")
+
+    def start_watcher(self):
+        """Start polling the database for question changes"""
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop_watcher(self):
+        """Stop the background polling task"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+question_pool = QuestionPool()
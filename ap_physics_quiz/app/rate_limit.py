@@ -0,0 +1,216 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from app.database import RateLimitBucket, async_session
+from app.metrics import RATE_LIMITED
+
+# Answers per second each session may submit on average, and how many it may
+# send at once after a pause; a rate of 0 turns the limit off
+RATE_LIMIT = float(os.environ.get("QUIZ_RATE_LIMIT", "5"))
+RATE_LIMIT_BURST = float(os.environ.get("QUIZ_RATE_LIMIT_BURST", "20"))
+# Answers per second from sessions the limiter has not seen yet, per client
+# address. Without it a client could dodge the session limit by dropping its
+# cookie or making up a new session id for every answer.
+NEW_SESSION_RATE_LIMIT = float(os.environ.get("QUIZ_RATE_LIMIT_NEW_SESSIONS", "5"))
+NEW_SESSION_RATE_LIMIT_BURST = float(os.environ.get("QUIZ_RATE_LIMIT_NEW_SESSIONS_BURST", "20"))
+# The session limit for every answer per client address; off by default, as
+# every client behind a proxy shares one address
+ADDRESS_RATE_LIMIT = float(os.environ.get("QUIZ_RATE_LIMIT_PER_ADDRESS", "0"))
+ADDRESS_RATE_LIMIT_BURST = float(os.environ.get("QUIZ_RATE_LIMIT_ADDRESS_BURST", "100"))
+
+def _take(tokens: float, elapsed: float, rate: float, burst: float, cost: float = 1.0) -> Tuple[float, bool]:
+    """Refill a bucket for ``elapsed`` seconds and charge a request ``cost`` tokens.
+
+    Returns the tokens left and whether the request is allowed. A request is
+    allowed while the bucket holds a whole token and then pays its full cost,
+    so a batch bigger than the burst still goes through once and leaves the
+    bucket in debt until the client has waited it off. A rejected request
+    takes a token too, down to a debt of one, so a client that keeps
+    retrying stays limited until it slows down.
+    """
+    tokens = min(burst, tokens + max(elapsed, 0.0) * rate)
+    if tokens >= 1:
+        return tokens - cost, True
+    return min(tokens, max(tokens - 1, -1.0)), False
+
+def _retry_after(tokens: float, rate: float) -> float:
+    """Seconds until a bucket left with ``tokens`` has a whole token again"""
+    return (1 - tokens) / rate
+
+class RateLimitBackend:
+    """Interface for token bucket storage backends"""
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens from a bucket; returns 0 if allowed, else seconds until a retry can succeed"""
+        raise NotImplementedError
+
+    async def known(self, key: str) -> bool:
+        """Whether a bucket exists, i.e. the key has been charged recently"""
+        raise NotImplementedError
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process token buckets with LRU eviction.
+
+    Everything runs on the event loop thread, so no locking is needed.
+    Memory is bounded by ``max_keys``; evicting a bucket only forgets how
+    much of its burst a client has used.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        buckets = self._buckets
+        tokens, updated_at = buckets.get(key, (burst, now))
+        tokens, allowed = _take(tokens, now - updated_at, rate, burst, cost)
+        buckets[key] = (tokens, now)
+        buckets.move_to_end(key)
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+        return 0.0 if allowed else _retry_after(tokens, rate)
+
+    async def known(self, key: str) -> bool:
+        return key in self._buckets
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """Token buckets in the rate_limits table, shared by all workers.
+
+    Every request creates its bucket if needed, which takes the database
+    write lock, then reads, refills and charges it in the same transaction,
+    so workers never race on a bucket. Requests from one process are
+    serialized, so they do not wait on each other's write locks, and a
+    rejected key is rejected locally until its retry time, so a client
+    hammering the server costs one write per retry rather than one per
+    request. Buckets idle for longer than ``idle_ttl`` seconds are full
+    again and purged every so often.
+    """
+
+    def __init__(self, idle_ttl: float = 3600, purge_every: int = 1000, max_blocked: int = 100000):
+        self.idle_ttl = idle_ttl
+        self.purge_every = purge_every
+        self.max_blocked = max_blocked
+        self._acquires = 0
+        self._blocked: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        blocked_until = self._blocked.get(key)
+        if blocked_until is not None:
+            retry_after = blocked_until - time.monotonic()
+            if retry_after > 0:
+                return retry_after
+            del self._blocked[key]
+        async with self._lock:
+            retry_after = await self._acquire(key, rate, burst, cost)
+        if retry_after:
+            if len(self._blocked) >= self.max_blocked:
+                now = time.monotonic()
+                self._blocked = {blocked: until for blocked, until in self._blocked.items() if until > now}
+            self._blocked[key] = time.monotonic() + retry_after
+        return retry_after
+
+    async def _acquire(self, key: str, rate: float, burst: float, cost: float) -> float:
+        now = time.time()
+        async with async_session() as db:
+            await db.execute(
+                insert(RateLimitBucket).values(key=key, tokens=burst, updated_at=now).on_conflict_do_nothing()
+            )
+            bucket = (await db.execute(
+                select(RateLimitBucket.tokens, RateLimitBucket.updated_at).where(RateLimitBucket.key == key)
+            )).one()
+            tokens, allowed = _take(bucket.tokens, now - bucket.updated_at, rate, burst, cost)
+            await db.execute(
+                update(RateLimitBucket)
+                .where(RateLimitBucket.key == key)
+                .values(tokens=tokens, updated_at=max(bucket.updated_at, now))
+            )
+            self._acquires += 1
+            if self._acquires % self.purge_every == 0:
+                await db.execute(delete(RateLimitBucket).where(RateLimitBucket.updated_at < now - self.idle_ttl))
+            await db.commit()
+        return 0.0 if allowed else _retry_after(tokens, rate)
+
+    async def known(self, key: str) -> bool:
+        if key in self._blocked:
+            return True
+        async with async_session() as db:
+            return (await db.execute(
+                select(RateLimitBucket.key).where(RateLimitBucket.key == key)
+            )).first() is not None
+
+def create_rate_limit_backend(name: Optional[str] = None) -> RateLimitBackend:
+    """Create the backend named by QUIZ_RATE_LIMIT_BACKEND (memory or sqlite)"""
+    name = name or os.environ.get("QUIZ_RATE_LIMIT_BACKEND", "memory")
+    if name == "memory":
+        return MemoryRateLimitBackend(
+            max_keys=int(os.environ.get("QUIZ_RATE_LIMIT_MAX_KEYS", "100000"))
+        )
+    if name == "sqlite":
+        return SQLiteRateLimitBackend()
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+class RateLimiter:
+    """Token bucket limits per session, per client address for new sessions and, optionally, per address"""
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        rate: float = RATE_LIMIT,
+        burst: float = RATE_LIMIT_BURST,
+        new_session_rate: float = NEW_SESSION_RATE_LIMIT,
+        new_session_burst: float = NEW_SESSION_RATE_LIMIT_BURST,
+        address_rate: float = ADDRESS_RATE_LIMIT,
+        address_burst: float = ADDRESS_RATE_LIMIT_BURST
+    ):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.new_session_rate = new_session_rate
+        self.new_session_burst = new_session_burst
+        self.address_rate = address_rate
+        self.address_burst = address_burst
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.address_rate > 0
+
+    async def _charge(self, limit: str, key: str, rate: float, burst: float, cost: float) -> float:
+        retry_after = await self.backend.acquire(key, rate, burst, cost)
+        if retry_after:
+            RATE_LIMITED.inc(limit)
+        return retry_after
+
+    async def check(self, session_id: str, address: Optional[str], cost: float = 1.0) -> float:
+        """Count a request of ``cost`` answers; returns 0 if it is allowed, else seconds the client should wait.
+
+        A session without a bucket is charged to its address's new session
+        bucket first, and only gets a bucket of its own once that allows it,
+        so fresh session ids do not bring fresh bursts with them.
+        """
+        if self.rate > 0:
+            session_key = f"session:{session_id}"
+            if self.new_session_rate > 0 and address and not await self.backend.known(session_key):
+                retry_after = await self._charge(
+                    "new_session", f"new:{address}", self.new_session_rate, self.new_session_burst, cost
+                )
+                if retry_after:
+                    return retry_after
+            retry_after = await self._charge("session", session_key, self.rate, self.burst, cost)
+            if retry_after:
+                return retry_after
+        if self.address_rate > 0 and address:
+            return await self._charge("address", f"address:{address}", self.address_rate, self.address_burst, cost)
+        return 0.0
+
+rate_limiter = RateLimiter(create_rate_limit_backend())
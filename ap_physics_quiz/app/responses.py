@@ -0,0 +1,80 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+from starlette.responses import JSONResponse
+
+from app.question_pool import QuestionRecord
+
+try:
+    import orjson
+except ImportError:  # installed from requirements.txt; the json module gives the same output, slower
+    orjson = None
+
+# Serve the JSON API with the fast encoder and pre-serialized question bodies
+# instead of validating every response against its pydantic model
+FAST_JSON = os.environ.get("QUIZ_FAST_JSON", "1") == "1"
+
+def _numpy_default(value: Any) -> Any:
+    """Convert NumPy scalars and arrays for the json module, as orjson's OPT_SERIALIZE_NUMPY does"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Encode a JSON response body: compact, UTF-8, no NaN"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_numpy_default
+    ).encode()
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when it is installed.
+
+    Subclassing JSONResponse keeps FastAPI documenting response models in
+    the OpenAPI schema when this is the default response class.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def question_payload(question: QuestionRecord) -> bytes:
+    """The /api/question response body of a question, as QuestionResponse would serialize it"""
+    return dumps({
+        "id": question.id,
+        "text": question.text,
+        "options": list(question.options) if question.options else None
+    })
+
+class QuestionPayloads:
+    """Pre-serialized /api/question bodies, kept in sync with the question pool.
+
+    A question is serialized the first time it is served and the bytes are
+    reused until the question changes, so serving a question costs no
+    encoding at all.
+    """
+
+    def __init__(self):
+        self._payloads: Dict[int, bytes] = {}
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def get(self, question: QuestionRecord) -> bytes:
+        payload = self._payloads.get(question.id)
+        if payload is None:
+            payload = self._payloads[question.id] = question_payload(question)
+        return payload
+
+    def questions_loaded(self, records: Iterable[QuestionRecord]):
+        self._payloads.clear()
+
+    def questions_changed(self, changed: Iterable[QuestionRecord], removed_ids: List[int]):
+        for question in changed:
+            self._payloads.pop(question.id, None)
+        for question_id in removed_ids:
+            self._payloads.pop(question_id, None)
+
+question_payloads = QuestionPayloads()
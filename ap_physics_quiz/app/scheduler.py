@@ -0,0 +1,486 @@
+import asyncio
+import heapq
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.future import select
+
+from app.database import ScheduleItem, ScheduleLearner, async_session, read_session
+from app.question_pool import QuestionPool, QuestionRecord, question_pool
+from app.selection import QuestionSelector, question_selector
+
+logger = logging.getLogger(__name__)
+
+# Intervals are counted in questions served to the learner, not in seconds
+MISSED_INTERVAL = 3
+# Questions missed again and again back off up to this interval, so that
+# they cannot crowd out everything else
+MAX_MISSED_INTERVAL = 24
+FIRST_INTERVAL = 8
+MAX_INTERVAL = 4096
+# Unseen questions are picked at random; after this many picks that the
+# learner has already seen, the earliest review is served instead
+NEW_QUESTION_ATTEMPTS = 8
+# Share of unseen questions picked from the topics a learner is missing,
+# each topic weighted by the number of its questions they last got wrong
+WEAK_TOPIC_SHARE = 0.5
+
+class ItemState:
+    """Spaced repetition state of one question for one learner"""
+    __slots__ = ("interval", "due_step", "attempts", "lapses", "last_correct")
+
+    def __init__(self, interval: int = 0, due_step: int = 0, attempts: int = 0, lapses: int = 0, last_correct: bool = False):
+        self.interval = interval
+        self.due_step = due_step
+        self.attempts = attempts
+        self.lapses = lapses
+        self.last_correct = last_correct
+
+class LearnerSchedule:
+    """Due queue of one learner.
+
+    ``due`` is a heap of (due step, rank, sequence, question id) where missed
+    questions rank before answered ones. Rescheduling pushes a new entry
+    instead of updating the old one; entries whose due step no longer
+    matches the item are skipped when popped.
+
+    ``saved`` holds the counters as last read from or written to the
+    database, at row ``version``; flushes add the difference, so counts
+    from several workers add up instead of overwriting each other.
+    """
+    __slots__ = (
+        "step", "answered", "answered_correct", "saved", "version", "stale",
+        "items", "due", "topic_misses", "last_question_id", "served_at", "_seq"
+    )
+
+    def __init__(self, step: int = 0, answered: int = 0, answered_correct: int = 0, version: int = 0):
+        self.step = step
+        self.answered = answered
+        self.answered_correct = answered_correct
+        self.saved = (step, answered, answered_correct)
+        self.version = version
+        # Set when another worker wrote this learner since it was read
+        self.stale = False
+        self.items: Dict[int, ItemState] = {}
+        self.due: List[Tuple[int, int, int, int]] = []
+        # Questions per topic tag whose last answer was wrong
+        self.topic_misses: Dict[str, int] = {}
+        self.last_question_id: Optional[int] = None
+        # When last_question_id was served, until it is answered
+        self.served_at: Optional[float] = None
+        self._seq = 0
+
+    def schedule(self, question_id: int, item: ItemState):
+        self._seq += 1
+        heapq.heappush(self.due, (item.due_step, 1 if item.last_correct else 0, self._seq, question_id))
+        # Drop stale entries once they outnumber the live ones
+        if len(self.due) > 2 * len(self.items) + 64:
+            self.rebuild_due()
+
+    def rebuild_due(self):
+        """Rebuild the heap from the items"""
+        self.due = [
+            (item.due_step, 1 if item.last_correct else 0, seq, question_id)
+            for seq, (question_id, item) in enumerate(self.items.items())
+        ]
+        heapq.heapify(self.due)
+        self._seq = len(self.due)
+
+    def count_miss(self, tags: Tuple[str, ...], change: int):
+        for tag in tags:
+            misses = self.topic_misses.get(tag, 0) + change
+            if misses > 0:
+                self.topic_misses[tag] = misses
+            else:
+                self.topic_misses.pop(tag, None)
+
+    def record(self, question_id: int, correct: bool, tags: Tuple[str, ...] = ()) -> ItemState:
+        """Reschedule a question after an answer"""
+        item = self.items.get(question_id)
+        if item is None:
+            item = self.items[question_id] = ItemState()
+        missed_before = item.attempts > 0 and not item.last_correct
+        if missed_before == correct:
+            self.count_miss(tags, -1 if correct else 1)
+        item.attempts += 1
+        if correct:
+            item.interval = min(max(item.interval * 2, FIRST_INTERVAL), MAX_INTERVAL)
+        elif missed_before:
+            item.interval = min(item.interval * 2, MAX_MISSED_INTERVAL)
+            item.lapses += 1
+        else:
+            item.interval = MISSED_INTERVAL
+            item.lapses += 1
+        item.last_correct = correct
+        item.due_step = self.step + item.interval
+        self.schedule(question_id, item)
+        return item
+
+    def pop_due(self, pool: QuestionPool, due_by: Optional[int]) -> Optional[QuestionRecord]:
+        """Pop the first live question due by ``due_by`` (None: the earliest at all)"""
+        skipped = None
+        while self.due and (due_by is None or self.due[0][0] <= due_by):
+            due_step, _, _, question_id = heapq.heappop(self.due)
+            item = self.items.get(question_id)
+            if item is None or item.due_step != due_step:
+                continue
+            question = pool.get(question_id)
+            if question is None:
+                # Removed from the bank
+                del self.items[question_id]
+                continue
+            if question_id == self.last_question_id:
+                skipped = (question_id, item)
+                continue
+            if skipped is not None:
+                self.schedule(*skipped)
+            return question
+        if skipped is not None:
+            self.schedule(*skipped)
+        return None
+
+class RecordedAnswer(NamedTuple):
+    """What the scheduler knows about an answer when it is recorded"""
+    # Milliseconds since the question was served, if known
+    response_ms: Optional[float]
+    # Fraction of the learner's earlier answers that were correct
+    learner_score: Optional[float]
+
+class Scheduler:
+    """Picks each learner's next question by spaced repetition.
+
+    Questions a learner missed come back after a few other questions;
+    questions answered correctly come back after an interval that doubles
+    with every correct answer. When nothing is due the learner gets an
+    unseen question from ``pick_new``; by default that is, WEAK_TOPIC_SHARE
+    of the time, one from the topics they are missing, and otherwise any
+    question at random.
+
+    Schedules are cached per process (LRU bounded by ``max_learners``) and
+    loaded from SQLite on first use. Changes are written behind in batches
+    by a background task, every ``flush_interval`` seconds or as soon as
+    ``batch_size`` items are pending, and on shutdown. Schedules of
+    learners idle for ``ttl`` seconds are deleted every ``purge_interval``
+    seconds. Answer counts are
+    written as increments and items as their latest state, so workers
+    serving the same learner do not undo each other's answers; a worker
+    that finds another one wrote a learner reads the schedule again
+    once its own changes are written.
+    """
+
+    def __init__(
+        self,
+        pool: QuestionPool = question_pool,
+        pick_new: Optional[Callable[[str], Optional[QuestionRecord]]] = None,
+        selector: QuestionSelector = question_selector,
+        max_learners: int = 10000,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        ttl: float = 7 * 24 * 60 * 60,
+        purge_interval: float = 60 * 60
+    ):
+        self.pool = pool
+        self.selector = selector
+        self.pick_new = pick_new or self._pick_new
+        self.max_learners = max_learners
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._learners: "OrderedDict[str, LearnerSchedule]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Changes waiting to be written; a learner with pending items is
+        # always pending itself
+        self._pending: Dict[Tuple[str, int], ItemState] = {}
+        self._pending_learners: Dict[str, LearnerSchedule] = {}
+        self._flush_wanted = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def learner(self, learner_id: str) -> LearnerSchedule:
+        """Get the schedule of a learner, loading it if needed"""
+        schedule = self._learners.get(learner_id)
+        if schedule is not None and not (schedule.stale and learner_id not in self._pending_learners):
+            self._learners.move_to_end(learner_id)
+            return schedule
+        # Concurrent requests of one learner share a single load
+        loading = self._loading.get(learner_id)
+        if loading is None:
+            loading = self._loading[learner_id] = asyncio.ensure_future(self._load(learner_id))
+            loading.add_done_callback(lambda _: self._loading.pop(learner_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load(self, learner_id: str) -> LearnerSchedule:
+        # A schedule evicted before its changes were written is newer than the database
+        schedule = self._pending_learners.get(learner_id)
+        if schedule is not None:
+            self._cache(learner_id, schedule)
+            return schedule
+
+        schedule = await self._read(learner_id)
+        stale = self._learners.get(learner_id)
+        if stale is not None:
+            # What was served last is only known to this worker
+            schedule.last_question_id, schedule.served_at = stale.last_question_id, stale.served_at
+        self._cache(learner_id, schedule)
+        return schedule
+
+    async def _read(self, learner_id: str) -> LearnerSchedule:
+        async with read_session() as db:
+            result = await db.execute(
+                select(
+                    ScheduleLearner.step, ScheduleLearner.answered, ScheduleLearner.answered_correct,
+                    ScheduleLearner.version
+                ).where(ScheduleLearner.id == learner_id)
+            )
+            learner_row = result.first()
+            result = await db.execute(
+                select(
+                    ScheduleItem.question_id, ScheduleItem.interval, ScheduleItem.due_step,
+                    ScheduleItem.attempts, ScheduleItem.lapses, ScheduleItem.last_correct
+                ).where(ScheduleItem.learner_id == learner_id)
+            )
+            rows = result.all()
+
+        schedule = LearnerSchedule(*learner_row) if learner_row else LearnerSchedule()
+        for question_id, interval, due_step, attempts, lapses, last_correct in rows:
+            schedule.items[question_id] = ItemState(interval, due_step, attempts, lapses, bool(last_correct))
+            question = self.pool.get(question_id)
+            if attempts and not last_correct and question is not None:
+                schedule.count_miss(question.tags, 1)
+        schedule.rebuild_due()
+        return schedule
+
+    async def warm(self):
+        """Run the schedule queries once, so the first learner does not pay for compiling them"""
+        # Session ids are never empty, so this reads nothing and caches nothing
+        await self._read("")
+
+    def _cache(self, learner_id: str, schedule: LearnerSchedule):
+        self._learners[learner_id] = schedule
+        while len(self._learners) > self.max_learners:
+            self._learners.popitem(last=False)
+
+    def _pick_new(self, learner_id: str) -> Optional[QuestionRecord]:
+        schedule = self._learners.get(learner_id)
+        misses = schedule.topic_misses if schedule is not None else None
+        if misses and random.random() < WEAK_TOPIC_SHARE:
+            topics = list(misses)
+            topic = random.choices(topics, weights=[misses[topic] for topic in topics])[0]
+            question = self.selector.pick(topic, exclude=schedule.items)
+            if question is not None:
+                return question
+        return self.pool.random()
+
+    async def next_question(self, learner_id: str) -> Optional[QuestionRecord]:
+        """Choose the next question for a learner"""
+        schedule = await self.learner(learner_id)
+        schedule.step += 1
+        if schedule.items:
+            # Learners are only written once they have answered something,
+            # so clients that never answer leave no rows behind
+            self._pending_learners[learner_id] = schedule
+
+        question = schedule.pop_due(self.pool, schedule.step)
+        if question is None:
+            for _ in range(NEW_QUESTION_ATTEMPTS):
+                candidate = self.pick_new(learner_id)
+                if candidate is None:
+                    break
+                if candidate.id not in schedule.items and candidate.id != schedule.last_question_id:
+                    question = candidate
+                    break
+        if question is None:
+            # Everything has been seen: bring the earliest review forward
+            question = schedule.pop_due(self.pool, None) or self.pool.random()
+        if question is None:
+            return None
+
+        item = schedule.items.get(question.id)
+        if item is not None:
+            # Served but not answered yet: ask again soon unless an answer reschedules it
+            item.due_step = schedule.step + MISSED_INTERVAL
+            schedule.schedule(question.id, item)
+            self._mark_pending(learner_id, question.id, item)
+        schedule.last_question_id = question.id
+        schedule.served_at = time.monotonic()
+        return question
+
+    async def served(self, learner_id: str, question_id: int):
+        """Note a question served outside the schedule, so its response time is measured"""
+        schedule = await self.learner(learner_id)
+        schedule.last_question_id = question_id
+        schedule.served_at = time.monotonic()
+
+    async def record(self, learner_id: str, question_id: int, correct: bool) -> RecordedAnswer:
+        """Record an answer and reschedule the question.
+
+        The response time is only known for the first answer to the
+        question the learner was served last.
+        """
+        schedule = await self.learner(learner_id)
+        response_ms = None
+        if question_id == schedule.last_question_id and schedule.served_at is not None:
+            response_ms = (time.monotonic() - schedule.served_at) * 1000
+            schedule.served_at = None
+        learner_score = schedule.answered_correct / schedule.answered if schedule.answered else None
+        schedule.answered += 1
+        schedule.answered_correct += correct
+        question = self.pool.get(question_id)
+        item = schedule.record(question_id, correct, question.tags if question is not None else ())
+        self._pending_learners[learner_id] = schedule
+        self._mark_pending(learner_id, question_id, item)
+        return RecordedAnswer(response_ms, learner_score)
+
+    def _mark_pending(self, learner_id: str, question_id: int, item: ItemState):
+        self._pending[(learner_id, question_id)] = item
+        if len(self._pending) >= self.batch_size:
+            self._flush_wanted.set()
+
+    async def flush(self):
+        """Write pending schedule changes in one transaction"""
+        if not self._pending and not self._pending_learners:
+            return
+        pending, self._pending = self._pending, {}
+        learners, self._pending_learners = self._pending_learners, {}
+        now = time.time()
+        items = [
+            {
+                "learner_id": learner_id,
+                "question_id": question_id,
+                "interval": item.interval,
+                "due_step": item.due_step,
+                "attempts": item.attempts,
+                "lapses": item.lapses,
+                "last_correct": int(item.last_correct)
+            }
+            for (learner_id, question_id), item in pending.items()
+        ]
+        item_stmt = insert(ScheduleItem)
+        item_stmt = item_stmt.on_conflict_do_update(
+            index_elements=[ScheduleItem.learner_id, ScheduleItem.question_id],
+            set_={
+                column: item_stmt.excluded[column]
+                for column in ("interval", "due_step", "attempts", "lapses", "last_correct")
+            }
+        )
+        # Counters are sent as increments over what this worker last saw
+        sent = {
+            learner_id: (schedule.step, schedule.answered, schedule.answered_correct)
+            for learner_id, schedule in learners.items()
+        }
+        learner_stmt = insert(ScheduleLearner)
+        learner_stmt = learner_stmt.on_conflict_do_update(
+            index_elements=[ScheduleLearner.id],
+            set_={
+                "step": ScheduleLearner.step + learner_stmt.excluded.step,
+                "answered": ScheduleLearner.answered + learner_stmt.excluded.answered,
+                "answered_correct": ScheduleLearner.answered_correct + learner_stmt.excluded.answered_correct,
+                "version": ScheduleLearner.version + 1,
+                "updated_at": learner_stmt.excluded.updated_at
+            }
+        ).returning(
+            ScheduleLearner.id, ScheduleLearner.step, ScheduleLearner.answered,
+            ScheduleLearner.answered_correct, ScheduleLearner.version
+        )
+        try:
+            async with async_session() as db:
+                if items:
+                    await db.execute(item_stmt, items)
+                saved = []
+                if learners:
+                    result = await db.execute(
+                        learner_stmt,
+                        [
+                            {
+                                "id": learner_id,
+                                "step": step - learners[learner_id].saved[0],
+                                "answered": answered - learners[learner_id].saved[1],
+                                "answered_correct": answered_correct - learners[learner_id].saved[2],
+                                "version": 1,
+                                "updated_at": now
+                            }
+                            for learner_id, (step, answered, answered_correct) in sent.items()
+                        ]
+                    )
+                    saved = result.all()
+                await db.commit()
+        except Exception:
+            # Keep the changes for the next attempt unless newer ones replaced them
+            for key, item in pending.items():
+                self._pending.setdefault(key, item)
+            for learner_id, schedule in learners.items():
+                self._pending_learners.setdefault(learner_id, schedule)
+            raise
+
+        for learner_id, step, answered, answered_correct, version in saved:
+            schedule = learners[learner_id]
+            sent_step, sent_answered, sent_correct = sent[learner_id]
+            # Take in other workers' answers, keeping changes made during the flush
+            schedule.step = step + schedule.step - sent_step
+            schedule.answered = answered + schedule.answered - sent_answered
+            schedule.answered_correct = answered_correct + schedule.answered_correct - sent_correct
+            schedule.saved = (step, answered, answered_correct)
+            if version != schedule.version + 1:
+                schedule.stale = True
+            schedule.version = version
+
+    async def purge(self) -> int:
+        """Delete the schedules of learners idle for longer than ``ttl``; returns how many"""
+        cutoff = time.time() - self.ttl
+        idle = select(ScheduleLearner.id).where(ScheduleLearner.updated_at < cutoff)
+        async with async_session() as db:
+            await db.execute(delete(ScheduleItem).where(ScheduleItem.learner_id.in_(idle)))
+            result = await db.execute(delete(ScheduleLearner).where(ScheduleLearner.updated_at < cutoff))
+            await db.commit()
+        return result.rowcount
+
+    async def _flush_loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to save question schedules")
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.purge_interval
+                try:
+                    await self.purge()
+                except Exception:
+                    logger.exception("Failed to purge idle question schedules")
+
+    def start(self):
+        """Start writing schedule changes in the background"""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the background writer and save what is left"""
+        if self._flusher is not None:
+            # Asked to finish rather than cancelled: a cancellation arriving
+            # during a flush can be swallowed by the database driver, which
+            # left the loop waiting forever
+            self._stopping = True
+            self._flush_wanted.set()
+            await self._flusher
+            self._flusher = None
+            self._stopping = False
+        await self.flush()
+
+scheduler = Scheduler(
+    max_learners=int(os.environ.get("QUIZ_MAX_SESSIONS", "10000")),
+    flush_interval=float(os.environ.get("QUIZ_SCHEDULER_FLUSH_INTERVAL", "1.0")),
+    batch_size=int(os.environ.get("QUIZ_SCHEDULER_BATCH_SIZE", "500")),
+    ttl=float(os.environ.get("QUIZ_SCHEDULE_TTL", str(7 * 24 * 60 * 60)))
+)
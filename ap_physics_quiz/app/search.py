@@ -0,0 +1,93 @@
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import JSON, Integer, Text, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_LIMIT = 100
+MAX_TAGS = 5
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+class SearchPage(NamedTuple):
+    """One page of search results and the cursor for the next one"""
+    questions: List[dict]
+    # Pass as ``after`` to get the next page; None on the last page
+    next_after: Optional[int]
+
+def match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching every word, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in user input are
+    taken literally instead of raising syntax errors.
+    """
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+async def search_questions(
+    db: AsyncSession,
+    query: Optional[str] = None,
+    tags: Sequence[str] = (),
+    after: int = 0,
+    limit: int = 20
+) -> SearchPage:
+    """Find questions matching a text query and carrying every one of ``tags``.
+
+    Results are in id order and paged by keyset: each page starts after
+    the last id of the previous one. The most selective available index
+    drives every query, so a page costs the same however deep it is:
+    the full-text index when there is a query, otherwise the
+    (tag, question_id) primary key of question_tags, otherwise the
+    questions primary key. Further tags are checked with primary key
+    lookups.
+    """
+    params = {"after": after, "limit": limit + 1}
+    match = match_expression(query) if query else None
+    if match is not None:
+        source = "questions_fts f JOIN questions q ON q.id = f.rowid"
+        key = "f.rowid"
+        conditions = ["questions_fts MATCH :match"]
+        params["match"] = match
+        extra_tags = list(tags)
+    elif tags:
+        source = "question_tags t JOIN questions q ON q.id = t.question_id"
+        key = "t.question_id"
+        conditions = ["t.tag = :tag"]
+        params["tag"] = tags[0]
+        extra_tags = list(tags[1:])
+    else:
+        source = "questions q"
+        key = "q.id"
+        conditions = []
+        extra_tags = []
+
+    conditions.append(f"{key} > :after")
+    for i, tag in enumerate(extra_tags):
+        conditions.append(
+            f"EXISTS (SELECT 1 FROM question_tags WHERE tag = :tag{i} AND question_id = {key})"
+        )
+        params[f"tag{i}"] = tag
+
+    result = await db.execute(
+        text(
+            f"SELECT q.id, q.text, q.options, q.tags FROM {source} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {key} LIMIT :limit"
+        ).columns(id=Integer, text=Text, options=JSON, tags=JSON),
+        params
+    )
+    rows = result.all()
+    questions = [
+        {
+            "id": row.id,
+            "text": row.text,
+            "options": row.options,
+            "tags": row.tags or []
+        }
+        for row in rows[:limit]
+    ]
+    next_after = questions[-1]["id"] if len(rows) > limit else None
+    return SearchPage(questions, next_after)
@@ -0,0 +1,85 @@
+import random
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from app.question_pool import QuestionPool, QuestionRecord, question_pool
+
+class QuestionSelector:
+    """Random question selection filtered by topic and excluded ids.
+
+    Keeps a dense array of question ids per topic, plus one of every
+    question under the ``None`` topic, so picking is a random index into
+    the array however large the bank is. Excluded ids are skipped by
+    drawing again; only when ``max_tries`` draws all hit excluded ids,
+    which means most of the topic is excluded, is the remainder listed.
+
+    Registered as a question pool listener, so the arrays follow every
+    change to question tags.
+    """
+
+    def __init__(self, pool: QuestionPool = question_pool, max_tries: int = 16):
+        self.pool = pool
+        self.max_tries = max_tries
+        self._ids: Dict[Optional[str], List[int]] = {}
+        # Position of every id in each array, for O(1) removal
+        self._positions: Dict[Optional[str], Dict[int, int]] = {}
+        self._tags: Dict[int, Tuple[str, ...]] = {}
+
+    def topics(self) -> Dict[str, int]:
+        """Number of questions with each topic tag"""
+        return {topic: len(self._ids[topic]) for topic in sorted(key for key in self._ids if key is not None)}
+
+    def question_ids(self, topic: Optional[str] = None) -> List[int]:
+        """Ids of the questions with a topic tag (every question for None), in no particular order"""
+        return self._ids.get(topic, [])
+
+    def pick(self, topic: Optional[str] = None, exclude: Collection[int] = ()) -> Optional[QuestionRecord]:
+        """Get a random question with the topic tag (any question for None) that is not excluded"""
+        ids = self._ids.get(topic)
+        if not ids:
+            return None
+        for _ in range(self.max_tries):
+            question_id = ids[random.randrange(len(ids))]
+            if question_id not in exclude:
+                return self.pool.get(question_id)
+        remaining = [question_id for question_id in ids if question_id not in exclude]
+        return self.pool.get(random.choice(remaining)) if remaining else None
+
+    def _add(self, key: Optional[str], question_id: int):
+        positions = self._positions.setdefault(key, {})
+        if question_id not in positions:
+            ids = self._ids.setdefault(key, [])
+            positions[question_id] = len(ids)
+            ids.append(question_id)
+
+    def _remove(self, key: Optional[str], question_id: int):
+        positions = self._positions.get(key)
+        position = positions.pop(question_id, None) if positions is not None else None
+        if position is None:
+            return
+        # Fill the hole with the last id to keep the array dense
+        ids = self._ids[key]
+        last = ids.pop()
+        if position < len(ids):
+            ids[position] = last
+            positions[last] = position
+        if not ids:
+            del self._ids[key], self._positions[key]
+
+    def questions_loaded(self, records: Iterable[QuestionRecord]):
+        self._ids, self._positions, self._tags = {}, {}, {}
+        self.questions_changed(records, [])
+
+    def questions_changed(self, changed: Iterable[QuestionRecord], removed_ids: List[int]):
+        for record in changed:
+            old_tags = self._tags.get(record.id, ())
+            for tag in old_tags:
+                if tag not in record.tags:
+                    self._remove(tag, record.id)
+            for key in (None,) + record.tags:
+                self._add(key, record.id)
+            self._tags[record.id] = record.tags
+        for question_id in removed_ids:
+            for key in (None,) + self._tags.pop(question_id, ()):
+                self._remove(key, question_id)
+
+question_selector = QuestionSelector()
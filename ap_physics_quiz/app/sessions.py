@@ -0,0 +1,217 @@
+import asyncio
+import os
+import re
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncContextManager, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.future import select
+
+from app.database import QuizSession, async_session
+
+SESSION_COOKIE = "quiz_session"
+SESSION_HEADER = b"x-quiz-session"
+SESSION_TTL = 60 * 60 * 24
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+class QuizState:
+    """Score and current question of one session"""
+    __slots__ = ("score", "current_question_id")
+
+    def __init__(self, score: int = 0, current_question_id: Optional[int] = None):
+        self.score = score
+        self.current_question_id = current_question_id
+
+    def reset(self):
+        """Clear the score and current question"""
+        self.score = 0
+        self.current_question_id = None
+
+class SessionBackend:
+    """Interface for session state storage backends"""
+
+    async def load(self, session_id: str) -> QuizState:
+        """Get the state of a session, or a fresh state if it is unknown"""
+        raise NotImplementedError
+
+    async def save(self, session_id: str, state: QuizState):
+        """Store the state of a session and extend its lifetime"""
+        raise NotImplementedError
+
+    async def delete(self, session_id: str):
+        """Forget a session"""
+        raise NotImplementedError
+
+    def locked(self, session_id: str) -> AsyncContextManager:
+        """Hold a session while a request loads, changes and saves its state"""
+        return nullcontext()
+
+class MemorySessionBackend(SessionBackend):
+    """Per-process session store with TTL expiry and LRU eviction.
+
+    Everything runs on the event loop thread, so no locking is needed.
+    Memory is bounded by ``max_sessions``; the least recently used session
+    is evicted when the limit is reached.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def load(self, session_id: str) -> QuizState:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return QuizState()
+        expires_at, state = entry
+        if expires_at < time.monotonic():
+            del self._sessions[session_id]
+            return QuizState()
+        self._sessions.move_to_end(session_id)
+        return state
+
+    async def save(self, session_id: str, state: QuizState):
+        sessions = self._sessions
+        sessions[session_id] = (time.monotonic() + self.ttl, state)
+        sessions.move_to_end(session_id)
+        while len(sessions) > self.max_sessions:
+            sessions.popitem(last=False)
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+class SQLiteSessionBackend(SessionBackend):
+    """Session store backed by the quiz_sessions table, shared by all workers.
+
+    Every load returns a state object of its own. Requests of one session
+    within a process hold the session in turn, so each one loads what the
+    previous one saved and no score update is lost to a concurrent save.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, purge_every: int = 1000):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._saves = 0
+        # Lock of every held session and the number of requests holding or waiting for it
+        self._locks: Dict[str, List] = {}
+
+    @asynccontextmanager
+    async def locked(self, session_id: str) -> AsyncIterator[None]:
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[session_id]
+
+    async def load(self, session_id: str) -> QuizState:
+        async with async_session() as db:
+            result = await db.execute(
+                select(QuizSession.score, QuizSession.current_question_id).where(
+                    QuizSession.id == session_id,
+                    QuizSession.expires_at >= time.time()
+                )
+            )
+            row = result.first()
+        if row is None:
+            return QuizState()
+        return QuizState(row.score, row.current_question_id)
+
+    async def save(self, session_id: str, state: QuizState):
+        now = time.time()
+        values = {
+            "score": state.score,
+            "current_question_id": state.current_question_id,
+            "expires_at": now + self.ttl
+        }
+        stmt = insert(QuizSession).values(id=session_id, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[QuizSession.id], set_=values)
+        async with async_session() as db:
+            await db.execute(stmt)
+            # Expired rows are purged every so often instead of on every save
+            self._saves += 1
+            if self._saves % self.purge_every == 0:
+                await db.execute(delete(QuizSession).where(QuizSession.expires_at < now))
+            await db.commit()
+
+    async def delete(self, session_id: str):
+        async with async_session() as db:
+            await db.execute(delete(QuizSession).where(QuizSession.id == session_id))
+            await db.commit()
+
+def create_session_backend(name: Optional[str] = None) -> SessionBackend:
+    """Create the session backend named by QUIZ_SESSION_BACKEND (memory or sqlite)"""
+    name = name or os.environ.get("QUIZ_SESSION_BACKEND", "memory")
+    if name == "memory":
+        return MemorySessionBackend(
+            max_sessions=int(os.environ.get("QUIZ_MAX_SESSIONS", "10000"))
+        )
+    if name == "sqlite":
+        return SQLiteSessionBackend()
+    raise ValueError(f"Unknown session backend: {name}")
+
+session_store = create_session_backend()
+
+def _session_id_from_scope(scope) -> Optional[str]:
+    session_id = None
+    for name, value in scope["headers"]:
+        if name == SESSION_HEADER:
+            session_id = value.decode("latin-1")
+            break
+        if name == b"cookie":
+            for cookie in value.decode("latin-1").split(";"):
+                key, _, cookie_value = cookie.strip().partition("=")
+                if key == SESSION_COOKIE:
+                    session_id = cookie_value
+    if session_id and _SESSION_ID_RE.match(session_id):
+        return session_id
+    return None
+
+class SessionMiddleware:
+    """ASGI middleware that assigns every client a session id.
+
+    The id is read from the ``quiz_session`` cookie (or the ``X-Quiz-Session``
+    header for API clients) and exposed as ``request.state.session_id``.
+    New sessions get the cookie set on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session_id = _session_id_from_scope(scope)
+        if session_id is not None:
+            scope.setdefault("state", {})["session_id"] = session_id
+            await self.app(scope, receive, send)
+            return
+
+        session_id = secrets.token_urlsafe(18)
+        scope.setdefault("state", {})["session_id"] = session_id
+        cookie = (
+            f"{SESSION_COOKIE}={session_id}; Path=/; Max-Age={SESSION_TTL}; "
+            "HttpOnly; SameSite=Lax"
+        ).encode("latin-1")
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,256 @@
+import mmap
+import os
+import random
+import struct
+from functools import lru_cache
+from typing import Collection, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.future import select
+
+from app.answer_key import AnswerKeyEntry
+from app.database import Question, read_engine
+from app.question_pool import _COLUMNS, QuestionRecord
+from app.responses import question_payload
+
+# Serve the question API from this snapshot file instead of the database
+SNAPSHOT_PATH = os.environ.get("QUIZ_SNAPSHOT")
+SNAPSHOT_KEY_CACHE_SIZE = int(os.environ.get("QUIZ_SNAPSHOT_KEY_CACHE_SIZE", "4096"))
+
+MAGIC = b"QUIZSNAP"
+FORMAT_VERSION = 1
+# magic, format version, question count, interned string count, section count
+_HEADER = struct.Struct("<8sIIII")
+# offset from the start of the file and length in bytes
+_SECTION = struct.Struct("<QQ")
+_BLOB_LENGTH = struct.Struct("<I")
+_ALIGNMENT = 8
+
+# Sections in file order with their element types. Per-question columns
+# have one element per question, in id order; *_start columns have one
+# more and delimit each question's slice of the matching *_refs array.
+# Heap offsets point at length-prefixed UTF-8 blobs in "heap"; string
+# references index "strings", the heap offsets of the interned strings
+# (options, tags and correct answers, which repeat across questions).
+SECTIONS = (
+    ("ids", "<i8"),
+    ("text", "<u8"),
+    ("explanation", "<u8"),
+    # /api/question response body, serialized once at export
+    ("question_json", "<u8"),
+    ("correct_answer", "<u4"),
+    # -1 when there is no correct option
+    ("correct_index", "<i2"),
+    ("options_start", "<u4"),
+    ("option_refs", "<u4"),
+    ("tags_start", "<u4"),
+    ("tag_refs", "<u4"),
+    ("strings", "<u8"),
+    ("heap", "u1"),
+)
+
+class SnapshotError(Exception):
+    """The file is not a question snapshot this version can read"""
+
+class _SnapshotWriter:
+    """Accumulates the columns and heap of a snapshot"""
+
+    def __init__(self):
+        self.heap = bytearray()
+        self.string_ids: Dict[str, int] = {}
+        self.string_offsets: List[int] = []
+        self.columns: Dict[str, list] = {name: [] for name, _ in SECTIONS if name not in ("strings", "heap")}
+        self.columns["options_start"].append(0)
+        self.columns["tags_start"].append(0)
+
+    def blob(self, data: bytes) -> int:
+        offset = len(self.heap)
+        self.heap += _BLOB_LENGTH.pack(len(data))
+        self.heap += data
+        return offset
+
+    def string(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.string_offsets)
+            self.string_offsets.append(self.blob(value.encode()))
+        return string_id
+
+    def add(self, record: QuestionRecord):
+        columns = self.columns
+        options = list(record.options or ())
+        columns["ids"].append(record.id)
+        columns["text"].append(self.blob(record.text.encode()))
+        columns["explanation"].append(self.blob(record.explanation.encode()))
+        columns["question_json"].append(self.blob(question_payload(record)))
+        columns["correct_answer"].append(self.string(record.correct_answer))
+        columns["correct_index"].append(-1 if record.correct_index is None else record.correct_index)
+        columns["option_refs"].extend(self.string(option) for option in options)
+        columns["options_start"].append(len(columns["option_refs"]))
+        columns["tag_refs"].extend(self.string(tag) for tag in record.tags)
+        columns["tags_start"].append(len(columns["tag_refs"]))
+
+    def write(self, path: str):
+        arrays = {name: np.asarray(self.columns[name], dtype=dtype) for name, dtype in SECTIONS[:-2]}
+        arrays["strings"] = np.asarray(self.string_offsets, dtype="<u8")
+        arrays["heap"] = np.frombuffer(bytes(self.heap), dtype="u1")
+        position = _HEADER.size + _SECTION.size * len(SECTIONS)
+        table = []
+        for name, _ in SECTIONS:
+            position += -position % _ALIGNMENT
+            table.append((position, arrays[name].nbytes))
+            position += arrays[name].nbytes
+
+        # Written next to the target and renamed over it, so open snapshots
+        # keep reading the old file and new readers never see a partial one
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(_HEADER.pack(
+                MAGIC, FORMAT_VERSION, len(self.columns["ids"]), len(self.string_offsets), len(SECTIONS)
+            ))
+            for offset, length in table:
+                f.write(_SECTION.pack(offset, length))
+            for (name, _), (offset, _) in zip(SECTIONS, table):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(arrays[name].tobytes())
+        os.replace(temporary, path)
+
+async def export_snapshot(path: str) -> int:
+    """Write every question to a snapshot file; returns the number of questions"""
+    writer = _SnapshotWriter()
+    async with read_engine.connect() as conn:
+        result = await conn.stream(select(*_COLUMNS).order_by(Question.id).execution_options(yield_per=1000))
+        async for row in result:
+            writer.add(QuestionRecord.from_row(row))
+    writer.write(path)
+    return len(writer.columns["ids"])
+
+class QuestionSnapshot:
+    """Read-only question bank served straight from a memory-mapped snapshot file.
+
+    Columns are NumPy views of the mapping and strings are decoded only for
+    the questions a request touches (and the distinct tags, once at open),
+    so opening a snapshot costs little for any bank size and every worker mapping the file shares one copy in
+    the page cache instead of holding its own records. Question response
+    bodies are stored pre-serialized. Answer keys are decoded on first use
+    and kept in a small LRU.
+    """
+
+    def __init__(self, path: str, max_tries: int = 16, key_cache_size: int = SNAPSHOT_KEY_CACHE_SIZE):
+        self.path = path
+        self.max_tries = max_tries
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise SnapshotError(f"{path} is too short to be a question snapshot")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, string_count, section_count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or section_count != len(SECTIONS):
+            raise SnapshotError(f"{path} is not a version {FORMAT_VERSION} question snapshot")
+        self._columns: Dict[str, np.ndarray] = {}
+        for index, (name, dtype) in enumerate(SECTIONS):
+            offset, length = _SECTION.unpack_from(self._map, _HEADER.size + index * _SECTION.size)
+            if offset + length > len(self._map):
+                raise SnapshotError(f"{path} is truncated")
+            if name == "heap":
+                self._heap = memoryview(self._map)[offset:offset + length]
+            else:
+                self._columns[name] = np.frombuffer(
+                    self._map, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset
+                )
+        if len(self._columns["ids"]) != count or len(self._columns["strings"]) != string_count:
+            raise SnapshotError(f"{path} has inconsistent section sizes")
+        self.ids = self._columns["ids"]
+        # Interned string of every tag, so topic lookups never scan the strings
+        self._tag_ids: Dict[str, int] = {
+            self._string(string_id): string_id for string_id in np.unique(self._columns["tag_refs"]).tolist()
+        }
+        self._topics: Dict[str, np.ndarray] = {}
+        self.answer_key = lru_cache(maxsize=key_cache_size)(self._answer_key)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def close(self):
+        # The mapping can only be closed once no array or view refers to it
+        self.answer_key.cache_clear()
+        self._columns.clear()
+        self._topics.clear()
+        self._heap.release()
+        self.ids = None
+        self._map.close()
+
+    def _blob(self, offset: int) -> memoryview:
+        offset = int(offset)
+        (length,) = _BLOB_LENGTH.unpack_from(self._heap, offset)
+        return self._heap[offset + _BLOB_LENGTH.size:offset + _BLOB_LENGTH.size + length]
+
+    def _text(self, offset: int) -> str:
+        return str(self._blob(offset), "utf-8")
+
+    def _string(self, string_id: int) -> str:
+        return self._text(self._columns["strings"][string_id])
+
+    def _strings(self, start_column: str, refs_column: str, position: int) -> tuple:
+        starts = self._columns[start_column]
+        refs = self._columns[refs_column][starts[position]:starts[position + 1]]
+        return tuple(self._string(string_id) for string_id in refs.tolist())
+
+    def position(self, question_id: int) -> Optional[int]:
+        """Index of a question in the columns, or None if it is not in the snapshot"""
+        position = int(np.searchsorted(self.ids, question_id))
+        if position < len(self.ids) and self.ids[position] == question_id:
+            return position
+        return None
+
+    def question_json(self, position: int) -> bytes:
+        """The /api/question response body of a question"""
+        return bytes(self._blob(self._columns["question_json"][position]))
+
+    def record(self, position: int) -> QuestionRecord:
+        """Decode every field of a question"""
+        correct_index = int(self._columns["correct_index"][position])
+        return QuestionRecord(
+            id=int(self.ids[position]),
+            text=self._text(self._columns["text"][position]),
+            options=self._strings("options_start", "option_refs", position) or None,
+            correct_answer=self._string(self._columns["correct_answer"][position]),
+            correct_index=None if correct_index < 0 else correct_index,
+            explanation=self._text(self._columns["explanation"][position]),
+            tags=self._strings("tags_start", "tag_refs", position)
+        )
+
+    def _answer_key(self, question_id: int) -> Optional[AnswerKeyEntry]:
+        position = self.position(question_id)
+        return AnswerKeyEntry.from_record(self.record(position)) if position is not None else None
+
+    def topic_positions(self, topic: Optional[str]) -> Optional[np.ndarray]:
+        """Positions of the questions with a topic tag; None for every question"""
+        if topic is None:
+            return None
+        positions = self._topics.get(topic)
+        if positions is None:
+            string_id = self._tag_ids.get(topic)
+            if string_id is None:
+                # Unknown topics are not cached, so requests cannot grow the cache
+                return np.empty(0, dtype=np.int64)
+            starts = self._columns["tags_start"]
+            owners = np.repeat(np.arange(len(self.ids)), np.diff(starts))
+            positions = self._topics[topic] = np.unique(owners[self._columns["tag_refs"] == string_id])
+        return positions
+
+    def pick(self, topic: Optional[str] = None, exclude: Collection[int] = ()) -> Optional[int]:
+        """Position of a random question with the topic tag (any for None) that is not excluded"""
+        positions = self.topic_positions(topic)
+        count = len(self.ids) if positions is None else len(positions)
+        if count == 0:
+            return None
+        for _ in range(self.max_tries):
+            position = random.randrange(count)
+            if positions is not None:
+                position = int(positions[position])
+            if int(self.ids[position]) not in exclude:
+                return position
+        candidates = np.arange(len(self.ids)) if positions is None else positions
+        excluded = np.fromiter(exclude, dtype=np.int64, count=len(exclude))
+        remaining = candidates[~np.isin(self.ids[candidates], excluded)]
+        return int(remaining[random.randrange(len(remaining))]) if len(remaining) else None
@@ -0,0 +1,85 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.metrics import STARTUP_PHASES
+
+logger = logging.getLogger(__name__)
+
+# Precompile templates and warm caches before the process reports ready
+WARM_START = os.environ.get("QUIZ_WARM_START", "1") == "1"
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started, or None where /proc is not available"""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; fields after it are fixed
+            start_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+class StartupProfile:
+    """Durations of the startup phases of this process, and its readiness.
+
+    Created when main starts importing the app, so the first phase covers
+    the app's imports. Phases are exported as metrics and, together with
+    the time from process start to ready, reported by ``/healthz``.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: Dict[str, float] = {}
+        self.ready_after: Optional[float] = None
+        self.process_ready_after: Optional[float] = None
+        self.stopping = False
+
+    def _record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+        STARTUP_PHASES.set(name, value=seconds)
+
+    def mark(self, name: str):
+        """Record the time since the previous phase ended as phase ``name``"""
+        now = time.perf_counter()
+        self._record(name, now - self._last)
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as phase ``name``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self._record(name, self._last - started)
+
+    def ready(self):
+        """Mark the process ready to serve"""
+        self.ready_after = time.perf_counter() - self.started
+        self.process_ready_after = process_age()
+        logger.info(
+            "Ready %.0f ms after importing the app (%s)",
+            self.ready_after * 1000,
+            ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases.items())
+        )
+
+    @property
+    def is_ready(self) -> bool:
+        return self.ready_after is not None and not self.stopping
+
+    def summary(self) -> dict:
+        return {
+            "ready_after_ms": None if self.ready_after is None else round(self.ready_after * 1000, 1),
+            "process_ready_after_ms": (
+                None if self.process_ready_after is None else round(self.process_ready_after * 1000, 1)
+            ),
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()}
+        }
+
+startup_profile = StartupProfile()
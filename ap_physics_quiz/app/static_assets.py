@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Fingerprinted URLs never change content, so clients may keep them forever
+IMMUTABLE_CACHE_CONTROL = b"public, max-age=31536000, immutable"
+# Plain URLs must be revalidated, which is cheap thanks to the ETag
+REVALIDATE_CACHE_CONTROL = b"no-cache"
+
+_TEXT_PLAIN = (b"content-type", b"text/plain; charset=utf-8")
+_COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+class AssetVariant(NamedTuple):
+    """One encoding of an asset"""
+    body: bytes
+    etag: bytes
+
+class Asset(NamedTuple):
+    """A static file with its precompressed variants"""
+    content_type: bytes
+    fingerprint: str
+    # Content-Encoding ("br", "gzip", "identity") -> variant
+    variants: Dict[str, AssetVariant]
+    etags: frozenset
+
+def _fingerprinted_name(name: str, fingerprint: str) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{fingerprint}{ext}"
+
+def encoding_qualities(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into the q value of every coding listed"""
+    qualities = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+def accepts_encoding(qualities: Dict[str, float], coding: str) -> bool:
+    """Whether parsed Accept-Encoding q values allow a coding, directly or through ``*``"""
+    # NaN compares false, so it refuses like q=0
+    return qualities.get(coding, qualities.get("*", 0.0)) > 0
+
+def _etag_matches(header: str, etags: frozenset) -> bool:
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # Compressing proxies may weaken the tag; the bytes it names are the same
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.encode("latin-1") in etags:
+            return True
+    return False
+
+class StaticAssets:
+    """ASGI app serving a directory of static files from memory.
+
+    Files are read once, fingerprinted by content hash and precompressed
+    with gzip (and brotli when the ``brotli`` package is installed). Each
+    file is served under its plain name and under a fingerprinted name from
+    ``url()``; the fingerprinted URL is cached as immutable, the plain one is
+    revalidated. Every response carries a strong ETag, and a matching
+    ``If-None-Match`` gets a 304 with no body.
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static"):
+        self.directory = directory
+        self.prefix = prefix.rstrip("/")
+        self._assets: Dict[str, Tuple[Asset, bytes]] = {}
+        self._urls: Dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        """Read, fingerprint and compress every file in the directory"""
+        assets = {}
+        urls = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    asset = self._build(name, f.read())
+                fingerprinted = _fingerprinted_name(name, asset.fingerprint)
+                assets[name] = (asset, REVALIDATE_CACHE_CONTROL)
+                assets[fingerprinted] = (asset, IMMUTABLE_CACHE_CONTROL)
+                urls[name] = f"{self.prefix}/{fingerprinted}"
+        self._assets = assets
+        self._urls = urls
+
+    @staticmethod
+    def _build(name: str, data: bytes) -> Asset:
+        fingerprint = hashlib.sha256(data).hexdigest()[:16]
+        content_type, _ = mimetypes.guess_type(name)
+        content_type = content_type or "application/octet-stream"
+        variants = {"identity": AssetVariant(data, f'"{fingerprint}"'.encode())}
+        if content_type.startswith(_COMPRESSIBLE_TYPES):
+            if content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+            compressed = {"gzip": gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(data, quality=11)
+            for encoding, body in compressed.items():
+                if len(body) < len(data):
+                    variants[encoding] = AssetVariant(body, f'"{fingerprint}-{encoding}"'.encode())
+        etags = frozenset(variant.etag for variant in variants.values())
+        return Asset(content_type.encode(), fingerprint, variants, etags)
+
+    def url(self, name: str) -> str:
+        """Fingerprinted URL of a static file, for use in templates"""
+        return self._urls.get(name, f"{self.prefix}/{name}")
+
+    def _select(self, asset: Asset, accept_encoding: str) -> Tuple[str, AssetVariant]:
+        if len(asset.variants) > 1:
+            qualities = encoding_qualities(accept_encoding)
+            for encoding in ("br", "gzip"):
+                if encoding in asset.variants and accepts_encoding(qualities, encoding):
+                    return encoding, asset.variants[encoding]
+        return "identity", asset.variants["identity"]
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send(send, 405, [(b"allow", b"GET, HEAD"), _TEXT_PLAIN], b"Method Not Allowed")
+            return
+        found = self._assets.get(scope["path"].lstrip("/"))
+        if found is None:
+            await self._send(send, 404, [_TEXT_PLAIN], b"Not Found")
+            return
+
+        asset, cache_control = found
+        request_headers = dict(scope["headers"])
+        encoding, variant = self._select(
+            asset, request_headers.get(b"accept-encoding", b"").decode("latin-1")
+        )
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"etag", variant.etag),
+            (b"cache-control", cache_control),
+        ]
+        if len(asset.variants) > 1:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match.decode("latin-1"), asset.etags):
+            await self._send(send, 304, headers, b"")
+            return
+
+        headers.append((b"content-type", asset.content_type))
+        if encoding != "identity":
+            headers.append((b"content-encoding", encoding.encode()))
+        body = variant.body if scope["method"] == "GET" else b""
+        await self._send(send, 200, headers, body, len(variant.body))
+
+    @staticmethod
+    async def _send(send, status: int, headers: list, body: bytes, length: Optional[int] = None):
+        if status != 304:
+            headers = headers + [(b"content-length", str(len(body) if length is None else length).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,22 @@
+import time
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment
+
+from app.metrics import TEMPLATE_RENDER
+
+class InstrumentedTemplates(Jinja2Templates):
+    """Jinja2Templates that records how long each template takes to render"""
+
+    def TemplateResponse(self, name: str, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().TemplateResponse(name, *args, **kwargs)
+        TEMPLATE_RENDER.observe(time.perf_counter() - started, name)
+        return response
+
+def precompile_templates(env: Environment) -> int:
+    """Compile every HTML template the loader finds, so no request pays for it; returns the count"""
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
@@ -0,0 +1,61 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Topics of the AP Physics 1 and C: Mechanics syllabus, each with keywords
+# that mark a question as belonging to it. A question may have several.
+TOPICS: Dict[str, Tuple[str, ...]] = {
+    "kinematics": (
+        "velocity", "acceleration", "displacement", "projectile", "free fall",
+        "dropped", "thrown", "accelerates", "decelerates"
+    ),
+    "dynamics": (
+        "force", "newton", "friction", "tension", "pulley", "incline", "normal force",
+        "net force", "weight"
+    ),
+    "circular-motion": ("centripetal", "circular", "circle", "banked", "loop"),
+    "energy": (
+        "energy", "work", "power", "kinetic", "potential", "conservation of energy",
+        "joule"
+    ),
+    "momentum": ("momentum", "impulse", "collision", "collide", "elastic", "recoil"),
+    "rotation": (
+        "torque", "moment of inertia", "angular", "rotates", "rotating", "rolls",
+        "rolling", "rod", "disk", "sphere", "wheel", "rad/s"
+    ),
+    "shm": (
+        "simple harmonic", "oscillat", "pendulum", "spring", "amplitude", "period",
+        "frequency"
+    ),
+    "gravitation": (
+        "gravitational", "orbit", "satellite", "planet", "kepler", "escape velocity",
+        "earth's radius"
+    ),
+}
+
+TAG_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{0,39}$")
+
+_KEYWORDS = [
+    (topic, re.compile(r"\b" + "|\\b".join(re.escape(keyword) for keyword in keywords), re.IGNORECASE))
+    for topic, keywords in TOPICS.items()
+]
+
+def classify(text: str, explanation: str = "") -> List[str]:
+    """Topics whose keywords appear in a question, in TOPICS order"""
+    content = f"{text}\n{explanation}"
+    return [topic for topic, pattern in _KEYWORDS if pattern.search(content)]
+
+def normalize_tags(tags: Iterable[str]) -> List[str]:
+    """Lower-case, de-duplicated tags; raises ValueError for an invalid tag"""
+    normalized = []
+    for tag in tags:
+        tag = tag.strip().lower()
+        if not TAG_PATTERN.match(tag):
+            raise ValueError(f"invalid tag {tag!r}: use 1-40 lower-case letters, digits and dashes")
+        if tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+def question_tags(tags: Optional[Iterable[str]], text: str, explanation: str) -> List[str]:
+    """The given tags, or the classified topics when none are given"""
+    tags = normalize_tags(tags) if tags else []
+    return tags or classify(text, explanation)
@@ -0,0 +1,260 @@
+import hashlib
+import itertools
+import math
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.answer_key import AnswerKeyEntry
+
+G = 9.8
+OPTION_COUNT = 4
+# Multipliers tried when a distractor formula gives the same number as the
+# answer or another distractor
+FALLBACK_FACTORS = (2.0, 0.5, 4.0, 0.25, 10.0, 0.1, 3.0)
+VARIANT_CACHE_SIZE = int(os.environ.get("QUIZ_VARIANT_CACHE_SIZE", "65536"))
+
+class Variable(NamedTuple):
+    """A template variable drawn uniformly from low, low + step, ..., high"""
+    low: float
+    high: float
+    step: float = 1.0
+
+class QuestionTemplate(NamedTuple):
+    """A physics problem with its numbers left as variables.
+
+    ``text`` and ``explanation`` are format strings over the variable names
+    and ``answer``. ``answer`` and each of ``distractors`` (the results of
+    common mistakes) take the variables as NumPy arrays and return an array
+    of results in ``unit``.
+    """
+    name: str
+    text: str
+    variables: Dict[str, Variable]
+    answer: Callable[..., np.ndarray]
+    distractors: Tuple[Callable[..., np.ndarray], ...]
+    unit: str
+    explanation: str
+    tags: Tuple[str, ...]
+
+TEMPLATES: Dict[str, QuestionTemplate] = {template.name: template for template in (
+    QuestionTemplate(
+        name="kinetic-energy",
+        text="A block of mass {m:g} kg slides on a frictionless surface at {v:g} m/s. What is its kinetic energy?",
+        variables={"m": Variable(1, 20), "v": Variable(1, 15)},
+        answer=lambda m, v: 0.5 * m * v ** 2,
+        distractors=(lambda m, v: m * v ** 2, lambda m, v: 0.5 * m * v, lambda m, v: m * v),
+        unit="J",
+        explanation="KE = (1/2)mv² = 0.5 × {m:g} × {v:g}² = {answer}.",
+        tags=("energy",)
+    ),
+    QuestionTemplate(
+        name="net-force",
+        text="A {m:g} kg object accelerates from rest to {v:g} m/s in {t:g} seconds. What is the magnitude of the net force on it?",
+        variables={"m": Variable(1, 50), "v": Variable(2, 40, 2), "t": Variable(1, 10)},
+        answer=lambda m, v, t: m * v / t,
+        distractors=(lambda m, v, t: m * v, lambda m, v, t: v / t, lambda m, v, t: m * v * t),
+        unit="N",
+        explanation="a = Δv/t = {v:g}/{t:g} m/s², so F = ma = {m:g} × {v:g}/{t:g} = {answer}.",
+        tags=("dynamics", "kinematics")
+    ),
+    QuestionTemplate(
+        name="centripetal-acceleration",
+        text="An object moves at {v:g} m/s in a circle of radius {r:g} m. What is its centripetal acceleration?",
+        variables={"v": Variable(2, 30), "r": Variable(1, 20)},
+        answer=lambda v, r: v ** 2 / r,
+        distractors=(lambda v, r: v / r, lambda v, r: v ** 2 * r, lambda v, r: 2 * v / r),
+        unit="m/s²",
+        explanation="a = v²/r = {v:g}²/{r:g} = {answer}.",
+        tags=("circular-motion",)
+    ),
+    QuestionTemplate(
+        name="centripetal-force",
+        text="A {m:g} kg car rounds a curve of radius {r:g} m at {v:g} m/s. What centripetal force acts on it?",
+        variables={"m": Variable(500, 2000, 100), "v": Variable(5, 30), "r": Variable(20, 200, 10)},
+        answer=lambda m, v, r: m * v ** 2 / r,
+        distractors=(lambda m, v, r: m * v / r, lambda m, v, r: v ** 2 / r, lambda m, v, r: m * v ** 2 * r),
+        unit="N",
+        explanation="F = mv²/r = {m:g} × {v:g}²/{r:g} = {answer}.",
+        tags=("circular-motion", "dynamics")
+    ),
+    QuestionTemplate(
+        name="spring-energy",
+        text="A spring with spring constant k = {k:g} N/m is compressed {x:g} m from equilibrium. What elastic potential energy does it store?",
+        variables={"k": Variable(50, 1000, 50), "x": Variable(0.05, 0.5, 0.05)},
+        answer=lambda k, x: 0.5 * k * x ** 2,
+        distractors=(lambda k, x: k * x ** 2, lambda k, x: 0.5 * k * x, lambda k, x: k * x),
+        unit="J",
+        explanation="U = (1/2)kx² = 0.5 × {k:g} × {x:g}² = {answer}.",
+        tags=("energy", "shm")
+    ),
+    QuestionTemplate(
+        name="momentum",
+        text="A car of mass {m:g} kg is moving at {v:g} m/s. What is its momentum?",
+        variables={"m": Variable(500, 3000, 100), "v": Variable(2, 40)},
+        answer=lambda m, v: m * v,
+        distractors=(lambda m, v: 0.5 * m * v ** 2, lambda m, v: m / v, lambda m, v: 0.5 * m * v),
+        unit="kg·m/s",
+        explanation="p = mv = {m:g} × {v:g} = {answer}.",
+        tags=("momentum",)
+    ),
+    QuestionTemplate(
+        name="pendulum-period",
+        text="What is the period of a simple pendulum of length {length:g} m? (g = 9.8 m/s²)",
+        variables={"length": Variable(0.25, 5, 0.25)},
+        answer=lambda length: 2 * np.pi * np.sqrt(length / G),
+        distractors=(
+            lambda length: 2 * np.pi * np.sqrt(G / length),
+            lambda length: np.pi * np.sqrt(length / G),
+            lambda length: np.sqrt(length / G)
+        ),
+        unit="s",
+        explanation="T = 2π√(L/g) = 2π√({length:g}/9.8) = {answer}.",
+        tags=("shm",)
+    ),
+    QuestionTemplate(
+        name="falling-energy",
+        text="A {m:g} kg object is dropped from a height of {h:g} m. How much kinetic energy does it have just before it hits the ground? (g = 9.8 m/s²)",
+        variables={"m": Variable(1, 30), "h": Variable(1, 50)},
+        answer=lambda m, h: m * G * h,
+        distractors=(lambda m, h: m * h, lambda m, h: 0.5 * m * G * h, lambda m, h: G * h),
+        unit="J",
+        explanation="The potential energy mgh becomes kinetic energy: KE = {m:g} × 9.8 × {h:g} = {answer}.",
+        tags=("energy", "kinematics")
+    ),
+    QuestionTemplate(
+        name="angular-velocity",
+        text="A wheel starts with angular velocity {w0:g} rad/s and has angular acceleration {alpha:g} rad/s². What is its angular velocity after {t:g} s?",
+        variables={"w0": Variable(0, 20), "alpha": Variable(1, 10), "t": Variable(1, 10)},
+        answer=lambda w0, alpha, t: w0 + alpha * t,
+        distractors=(
+            lambda w0, alpha, t: alpha * t,
+            lambda w0, alpha, t: w0 + 0.5 * alpha * t,
+            lambda w0, alpha, t: w0 * t + alpha
+        ),
+        unit="rad/s",
+        explanation="ω = ω₀ + αt = {w0:g} + {alpha:g} × {t:g} = {answer}.",
+        tags=("rotation", "kinematics")
+    ),
+)}
+
+# Every ordering of the options; a variant's ordering is picked by seed
+_PERMUTATIONS = np.array(list(itertools.permutations(range(OPTION_COUNT))))
+
+@lru_cache(maxsize=None)
+def _stream_key(*parts: str) -> np.uint64:
+    digest = hashlib.sha256(":".join(parts).encode()).digest()
+    return np.uint64(int.from_bytes(digest[:8], "little"))
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: a well-spread 64-bit hash of every element"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _uniform(template: QuestionTemplate, stream: str, seeds: np.ndarray) -> np.ndarray:
+    """Numbers in [0, 1) that depend only on the template, stream name and seed"""
+    bits = _mix(seeds ^ _stream_key(template.name, stream))
+    return (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+def format_number(value: float) -> str:
+    """Three significant figures, without exponents or trailing zeros"""
+    if value == 0 or not math.isfinite(value):
+        return "0"
+    return np.format_float_positional(value, precision=3, unique=False, fractional=False, trim="-")
+
+class GeneratedQuestion(NamedTuple):
+    """One numeric variant of a template, identified by ``template:seed``"""
+    id: str
+    template: str
+    seed: int
+    text: str
+    options: Tuple[str, ...]
+    correct_index: int
+    correct_answer: str
+    explanation: str
+    tags: Tuple[str, ...]
+
+    def answer_key(self) -> AnswerKeyEntry:
+        """Answer key for grading this variant"""
+        return AnswerKeyEntry.from_record(self)
+
+class VariantBatch(NamedTuple):
+    """Numbers of many variants of one template, one row per seed"""
+    values: Dict[str, np.ndarray]
+    # Column 0 is the answer, the others the distractors
+    results: np.ndarray
+    # Option position of each result column
+    positions: np.ndarray
+
+def compute(template: QuestionTemplate, seeds: Sequence[int]) -> VariantBatch:
+    """Draw the variables of every seed and evaluate the formulas, all as arrays"""
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    values = {}
+    for name, variable in template.variables.items():
+        steps = int(round((variable.high - variable.low) / variable.step)) + 1
+        index = np.floor(_uniform(template, name, seeds) * steps)
+        values[name] = np.round(variable.low + index * variable.step, 6)
+    formulas = (template.answer,) + template.distractors[:OPTION_COUNT - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results = np.column_stack([formula(**values) for formula in formulas])
+    permutation = np.floor(_uniform(template, "options", seeds) * len(_PERMUTATIONS)).astype(np.int64)
+    return VariantBatch(values, results, _PERMUTATIONS[permutation])
+
+def _options(results: Sequence[float], unit: str) -> List[str]:
+    """Format the answer and distractors, replacing distractors that collide"""
+    answer = results[0]
+    labels = [f"{format_number(answer)} {unit}"]
+    for distractor in results[1:]:
+        candidates = [distractor] + [answer * factor for factor in FALLBACK_FACTORS]
+        for candidate in candidates:
+            label = f"{format_number(candidate)} {unit}"
+            if label not in labels:
+                labels.append(label)
+                break
+    return labels
+
+def generate(template: QuestionTemplate, seeds: Sequence[int]) -> List[GeneratedQuestion]:
+    """Build the variants of a template for many seeds"""
+    batch = compute(template, seeds)
+    names = list(batch.values)
+    columns = [batch.values[name].tolist() for name in names]
+    questions = []
+    for row, seed in enumerate(int(seed) for seed in seeds):
+        values = {name: column[row] for name, column in zip(names, columns)}
+        labels = _options(batch.results[row].tolist(), template.unit)
+        options = [""] * OPTION_COUNT
+        for label, position in zip(labels, batch.positions[row].tolist()):
+            options[position] = label
+        correct_index = int(batch.positions[row, 0])
+        questions.append(GeneratedQuestion(
+            id=f"{template.name}:{seed}",
+            template=template.name,
+            seed=seed,
+            text=template.text.format(**values),
+            options=tuple(options),
+            correct_index=correct_index,
+            correct_answer=options[correct_index],
+            explanation=template.explanation.format(answer=options[correct_index], **values),
+            tags=template.tags
+        ))
+    return questions
+
+@lru_cache(maxsize=VARIANT_CACHE_SIZE)
+def variant(template_name: str, seed: int) -> GeneratedQuestion:
+    """The variant of a template for one seed; raises KeyError for an unknown template"""
+    return generate(TEMPLATES[template_name], [seed])[0]
+
+def parse_variant_id(variant_id: str) -> Optional[Tuple[str, int]]:
+    """Split ``template:seed`` into its parts, or None if it is malformed"""
+    name, _, seed = variant_id.rpartition(":")
+    # str.isdigit also accepts digits int() rejects, such as "²"; seeds
+    # below 2 ** 64 have at most 20 digits
+    if name not in TEMPLATES or not (seed.isascii() and seed.isdigit() and len(seed) <= 20):
+        return None
+    if int(seed) >= 2 ** 64:
+        return None
+    return name, int(seed)
@@ -0,0 +1,90 @@
+"""Measure question statistics: full rebuild, incremental refresh and serving.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_analytics --questions 3000 --attempts 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import asgi_client, seed_database
+
+from sqlalchemy import insert, text
+
+from app.analytics import analytics
+from app.database import Attempt, engine, read_session
+from app.question_pool import question_pool
+from main import app
+
+def synthetic_attempts(count, questions, start=0):
+    rng = random.Random(start)
+    for i in range(start, start + count):
+        score = rng.random()
+        yield {
+            "session_id": f"bench-{i // 50}",
+            "question_id": rng.randint(1, questions),
+            "correct": int(rng.random() < score),
+            "option_index": rng.randrange(4),
+            "response_ms": rng.lognormvariate(9, 0.6),
+            "learner_score": score,
+            "created_at": 0.0
+        }
+
+async def insert_attempts(count, questions, start=0, batch_size=50000):
+    attempts = synthetic_attempts(count, questions, start)
+    async with engine.begin() as conn:
+        for _ in range(0, count, batch_size):
+            batch = [next(attempts) for _ in range(min(batch_size, count))]
+            await conn.execute(insert(Attempt), batch)
+            count -= len(batch)
+
+# What an ad-hoc report would run: p-value and option counts per question
+AD_HOC_SQL = """
+SELECT question_id, COUNT(*), AVG(correct),
+       SUM(option_index = 0), SUM(option_index = 1), SUM(option_index = 2), SUM(option_index = 3)
+FROM attempts GROUP BY question_id
+"""
+
+async def main(questions, attempts):
+    await seed_database(questions)
+    await question_pool.load()
+    started = time.perf_counter()
+    await insert_attempts(attempts, questions)
+    print(f"{questions} questions, {attempts} attempts (inserted in {time.perf_counter() - started:.1f} s)")
+
+    started = time.perf_counter()
+    async with read_session() as db:
+        (await db.execute(text(AD_HOC_SQL))).all()
+    print(f"ad-hoc GROUP BY (p-value, options only)  {time.perf_counter() - started:8.3f} s")
+
+    started = time.perf_counter()
+    await analytics.rebuild()
+    print(f"full rebuild (NumPy)                     {time.perf_counter() - started:8.3f} s")
+
+    await insert_attempts(1000, questions, start=attempts)
+    started = time.perf_counter()
+    await analytics.refresh()
+    print(f"incremental refresh, 1000 new attempts   {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    async with asgi_client(app) as client:
+        started = time.perf_counter()
+        await client.get("/api/stats/questions")
+        print(f"/api/stats/questions after a change      {(time.perf_counter() - started) * 1000:8.1f} ms")
+        requests = 200
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/api/stats/questions")
+        print(f"/api/stats/questions, cached             {(time.perf_counter() - started) / requests * 1000:8.1f} ms")
+        started = time.perf_counter()
+        for question_id in range(1, requests + 1):
+            await client.get(f"/api/stats/questions/{question_id}")
+        print(f"/api/stats/questions/<id>                {(time.perf_counter() - started) / requests * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--attempts", type=int, default=1000000)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.attempts))
@@ -0,0 +1,66 @@
+"""Compare answer checking through a database lookup against the answer key.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_answer_key --questions 3000 --requests 500
+"""
+import argparse
+import asyncio
+import random
+
+from benchmarks.common import asgi_client, measure_requests, print_row, seed_database
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Question, get_read_db
+from app.models import AnswerRequest
+from app.question_pool import question_pool
+from main import app
+
+async def legacy_check_answer(answer_req: AnswerRequest, db: AsyncSession = Depends(get_read_db)):
+    """The previous /api/answer implementation, kept for comparison"""
+    question = await Question.get_by_id(db, answer_req.question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    is_correct = answer_req.option_index == question.correct_index
+    return {
+        "correct": is_correct,
+        "correct_answer": question.correct_answer if not is_correct else None,
+        "explanation": question.explanation if not is_correct else None
+    }
+
+async def main(questions, requests, batch):
+    await seed_database(questions)
+    await question_pool.load()
+    app.add_api_route("/bench/legacy-answer", legacy_check_answer, methods=["POST"])
+
+    rng = random.Random(0)
+    def answer():
+        return {"question_id": rng.randint(1, questions), "option_index": rng.randrange(4)}
+
+    async with asgi_client(app) as client:
+        await client.post("/bench/legacy-answer", json=answer())
+        await client.post("/api/answer", json=answer())
+
+        print(f"{questions} questions, {requests} sequential requests")
+        before = await measure_requests(lambda: client.post("/bench/legacy-answer", json=answer()), requests)
+        print_row("before: get_by_id", before)
+        after = await measure_requests(lambda: client.post("/api/answer", json=answer()), requests)
+        print_row("after: answer key", after)
+        print(f"speedup: {after['rps'] / before['rps']:.1f}x")
+
+        batched = await measure_requests(
+            lambda: client.post("/api/answers", json=[answer() for _ in range(batch)]),
+            max(requests // 10, 1)
+        )
+        print_row(f"batch of {batch}", batched)
+        print(f"batch answers/s: {batched['rps'] * batch:,.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.requests, args.batch))
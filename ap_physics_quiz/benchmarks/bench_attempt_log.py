@@ -0,0 +1,94 @@
+"""Compare /api/answer throughput with attempt logging off, write-behind and synchronous.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_attempt_log --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import asgi_client, print_row, seed_database
+
+from fastapi import HTTPException, Request
+from sqlalchemy import func, insert, select
+
+from app.answer_key import answer_key
+from app.attempts import attempt_log
+from app.database import Attempt, async_session
+from app.models import AnswerRequest
+from app.question_pool import question_pool
+from main import app, grade_answer
+
+async def sync_logged_answer(request: Request, answer_req: AnswerRequest):
+    """/api/answer with one INSERT transaction per request, for comparison"""
+    key = answer_key.get(answer_req.question_id)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    result = grade_answer(key, answer_req)
+    async with async_session() as db:
+        await db.execute(insert(Attempt).values(
+            session_id=request.state.session_id,
+            question_id=answer_req.question_id,
+            correct=int(result["correct"]),
+            option_index=answer_req.option_index,
+            created_at=time.time()
+        ))
+        await db.commit()
+    return result
+
+async def run(client, path, requests, concurrency, questions):
+    """Send ``requests`` answers from ``concurrency`` concurrent clients"""
+    rng = random.Random(0)
+    latencies = []
+
+    async def worker(count):
+        for _ in range(count):
+            body = {"question_id": rng.randint(1, questions), "option_index": rng.randrange(4)}
+            t0 = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - t0)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(requests // concurrency) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+async def count_attempts():
+    async with async_session() as db:
+        return (await db.execute(select(func.count()).select_from(Attempt))).scalar()
+
+async def main(questions, requests, concurrency):
+    await seed_database(questions)
+    await question_pool.load()
+    app.add_api_route("/bench/sync-logged-answer", sync_logged_answer, methods=["POST"])
+
+    async with asgi_client(app) as client:
+        await client.post("/api/answer", json={"question_id": 1, "option_index": 0})
+        print(f"{questions} questions, {requests} answers from {concurrency} concurrent clients")
+
+        attempt_log.enabled = False
+        print_row("logging off", await run(client, "/api/answer", requests, concurrency, questions))
+
+        attempt_log.enabled = True
+        attempt_log.start()
+        print_row("write-behind log", await run(client, "/api/answer", requests, concurrency, questions))
+        await attempt_log.stop()
+
+        print_row("INSERT per request", await run(client, "/bench/sync-logged-answer", requests, concurrency, questions))
+    print(f"attempts written: {await count_attempts()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.requests, args.concurrency))
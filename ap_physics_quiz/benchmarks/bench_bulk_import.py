@@ -0,0 +1,51 @@
+"""Measure bulk import and export throughput on a large question file.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_bulk_import --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import time
+
+from benchmarks.common import BENCH_DB_PATH, synthetic_questions
+
+from app import bulk
+from app.database import init_db
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def main(rows, batch_size):
+    path = os.path.join(os.path.dirname(BENCH_DB_PATH), "questions.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for question in synthetic_questions(rows):
+            del question["correct_index"]
+            f.write(json.dumps(question, ensure_ascii=False) + "\n")
+    print(f"{rows} rows, {os.path.getsize(path) / 1e6:.1f} MB file")
+
+    await init_db()
+    rss_before = max_rss_mb()
+    started = time.perf_counter()
+    with open(path, encoding="utf-8") as stream:
+        report = await bulk.import_questions(stream, "jsonl", batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    print(f"import: {report.inserted} inserted in {elapsed:.2f} s = {report.read / elapsed:,.0f} rows/s")
+    print(f"        peak RSS grew by {max_rss_mb() - rss_before:.1f} MB")
+
+    started = time.perf_counter()
+    exported = 0
+    async for chunk in bulk.export_questions("jsonl"):
+        exported += chunk.count("\n")
+    elapsed = time.perf_counter() - started
+    print(f"export: {exported} rows in {elapsed:.2f} s = {exported / elapsed:,.0f} rows/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.batch_size))
@@ -0,0 +1,63 @@
+"""Compare taking a quiz question by question with exam mode.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_exams --questions 10000 --length 20 --learners 30
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import asgi_client
+
+from app.exams import compose
+from app.question_pool import question_pool
+from app.selection import question_selector
+from benchmarks.bench_search import seed
+from main import app
+
+async def question_by_question(client, length):
+    for _ in range(length):
+        question = (await client.get("/api/question")).json()
+        await client.post("/api/answer", json={"question_id": question["id"], "option_index": 0})
+
+async def exam(client, length, exam_seed):
+    paper = (await client.post("/api/exams", json={"length": length, "seed": exam_seed})).json()
+    answers = [{"question_id": question["id"], "option_index": 0} for question in paper["questions"]]
+    response = await client.post(f"/api/exams/{paper['exam_id']}/answers", json=answers)
+    response.raise_for_status()
+
+async def class_time(learners, take):
+    """Seconds for ``learners`` concurrent learners, each with a session of their own, to finish"""
+    clients = [asgi_client(app) for _ in range(learners)]
+    started = time.perf_counter()
+    await asyncio.gather(*(take(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        await client.aclose()
+    return elapsed
+
+async def main(questions, length, learners):
+    await seed(questions)
+    await question_pool.load()
+    print(f"{questions} questions, {length}-question quiz, class of {learners}")
+    started = time.perf_counter()
+    for exam_seed in range(100):
+        compose(question_selector, exam_seed, length, ())
+    print(f"composing one exam                           {(time.perf_counter() - started) * 10:8.1f} ms")
+
+    elapsed = await class_time(learners, lambda client: question_by_question(client, length))
+    print(f"question by question ({2 * length} requests each)  {elapsed * 1000:8.1f} ms")
+    # Every learner takes the same exam: one generation for the class
+    elapsed = await class_time(learners, lambda client: exam(client, length, 1))
+    print(f"exam mode, new seed (2 requests each)        {elapsed * 1000:8.1f} ms")
+    elapsed = await class_time(learners, lambda client: exam(client, length, 1))
+    print(f"exam mode, cached exam                       {elapsed * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--length", type=int, default=20)
+    parser.add_argument("--learners", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.length, args.learners))
@@ -0,0 +1,56 @@
+"""Measure free-text grading with precompiled answer keys against parsing the key per submission.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_grading --submissions 100000
+"""
+import argparse
+import time
+
+import benchmarks.common  # noqa: F401 - keeps the app on a throwaway database
+
+from app.grading import compile_answer
+
+# (correct answer, submissions graded against it)
+CASES = [
+    ("exact text", "9.8 m/s", ["9.8 m/s"]),
+    ("number with unit", "9.8 m/s", ["9.80 m/s", "9.7 m/s", "980 cm/s"]),
+    ("number, other unit", "2000 kg·m/s", ["2e3 kg m/s", "2000 N·s", "2 kg·m/s"]),
+    ("number with π", "0.4π m/s", ["1.26 m/s", "0.4π m/s", "1.5 m/s"]),
+    ("expression", "(1/3)ML²", ["ML^2/3", "0.333 M L²", "(1/12)ML²"]),
+    ("equation", "F = GmM/4R²", ["F = GMm/(4R^2)", "GmM/(4R)"]),
+]
+
+def time_per_grade(grade, submissions, count):
+    rounds = max(1, count // len(submissions))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for submission in submissions:
+            grade(submission)
+    return (time.perf_counter() - started) / (rounds * len(submissions)) * 1e6
+
+def main(count):
+    print(f"{'answer key':<20} {'parsed per grade':>20} {'precompiled':>14}")
+    for label, correct_answer, submissions in CASES:
+        key = correct_answer.strip().lower()
+        compiled = compile_answer(correct_answer)
+
+        def precompiled(answer):
+            return answer.strip().lower() == key or compiled.matches(answer)
+
+        def uncached(answer):
+            if answer.strip().lower() == key:
+                return True
+            # Parse the key for every submission, as before answer keys were compiled
+            fresh = compile_answer(correct_answer)
+            return fresh is not None and fresh.matches(answer)
+
+        before = time_per_grade(uncached, submissions, count // 10)
+        after = time_per_grade(precompiled, submissions, count)
+        print(f"{label:<20} {before:>17.2f} µs {after:>11.2f} µs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=100000)
+    args = parser.parse_args()
+    main(args.submissions)
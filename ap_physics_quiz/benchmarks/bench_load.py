@@ -0,0 +1,361 @@
+"""Load test the quiz endpoints with concurrent learners and report latency percentiles.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_load --questions 10000 --learners 50 --duration 20
+    python -m benchmarks.bench_load --server --workers 2 --output results.json
+    python -m benchmarks.bench_load --baseline results.json
+    python -m benchmarks.bench_load --compare before.json after.json
+    QUIZ_RATE_LIMIT=5 python -m benchmarks.bench_load --mix api=1,abuser=1,evader=1 --think-ms 200
+
+By default the app runs in-process behind httpx's ASGI transport, with its
+startup and shutdown handlers, so no network is involved. ``--server``
+starts uvicorn on a free local port against the same seeded database,
+and ``--url`` targets a server that is already running (and seeded).
+
+Each virtual learner has its own session and follows one of the scenarios
+below, picked by the ``--mix`` weights, back to back until the time is up.
+Without ``--think-ms`` learners send their next request as soon as the last
+one is answered, which measures capacity; latencies then grow with the
+number of learners. ``abuser`` clients post answers back to back and are
+reported separately, to see what well-behaved learners get while someone
+hammers the server; ``evader`` clients do the same without keeping a
+session and in batches of 45 answers. The rate limiter is off unless
+``QUIZ_RATE_LIMIT`` is set. The load generator shares the machine with a
+``--server``, so compare runs made on the same machine only.
+Results can be written as JSON and compared with an earlier run; the
+comparison exits with status 1 when an endpoint's p95 latency or
+throughput got worse by more than ``--threshold`` percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import asgi_client, seed_database
+
+import httpx
+
+from main import app
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MAX_OPTIONS = 4
+# Endpoints with fewer requests than this are too noisy to flag regressions
+MIN_COMPARED_REQUESTS = 50
+
+class Recorder:
+    """Latency and status of every request, grouped by endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client, method, url, label=None, **kwargs):
+        label = label or f"{method} {url}"
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+            return None
+        return response
+
+async def browser_learner(client, recorder, deadline, think):
+    """Someone using the HTML pages: the home page, then question and answer pages in turn"""
+    await recorder.request(client, "GET", "/")
+    while time.perf_counter() < deadline:
+        await recorder.request(client, "GET", "/quiz")
+        await asyncio.sleep(think())
+        await recorder.request(client, "POST", "/submit", data={"option": random.randrange(MAX_OPTIONS)})
+        await asyncio.sleep(think())
+
+async def api_learner(client, recorder, deadline, think):
+    """A JSON client: question, answer, and now and then the score"""
+    rounds = 0
+    while time.perf_counter() < deadline:
+        rounds += 1
+        response = await recorder.request(client, "GET", "/api/question")
+        await asyncio.sleep(think())
+        if response is not None:
+            question = response.json()
+            await recorder.request(client, "POST", "/api/answer", json={
+                "question_id": question["id"],
+                "option_index": random.randrange(len(question["options"] or [None] * MAX_OPTIONS))
+            })
+        if rounds % 5 == 0:
+            await recorder.request(client, "GET", "/api/score")
+        await asyncio.sleep(think())
+
+async def abusive_client(client, recorder, deadline, think):
+    """A misbehaving client: submits answers without pause, ignoring rejections and think time"""
+    await recorder.request(client, "GET", "/quiz", label="abuse GET /quiz")
+    while time.perf_counter() < deadline:
+        await recorder.request(
+            client, "POST", "/submit", label="abuse POST /submit", data={"option": random.randrange(MAX_OPTIONS)}
+        )
+        await recorder.request(client, "POST", "/api/answer", label="abuse POST /api/answer", json={
+            "question_id": random.randint(1, 45), "option_index": random.randrange(MAX_OPTIONS)
+        })
+
+async def evasive_client(client, recorder, deadline, think):
+    """An abuser that drops its session cookie before every request and also posts answers in batches"""
+    batch = [{"question_id": question_id, "option_index": 0} for question_id in range(1, 46)]
+    while time.perf_counter() < deadline:
+        client.cookies.clear()
+        await recorder.request(client, "POST", "/api/answer", label="evade POST /api/answer", json={
+            "question_id": random.randint(1, 45), "option_index": random.randrange(MAX_OPTIONS)
+        })
+        client.cookies.clear()
+        await recorder.request(client, "POST", "/api/answers", label="evade POST /api/answers", json=batch)
+
+SCENARIOS = {"browser": browser_learner, "api": api_learner, "abuser": abusive_client, "evader": evasive_client}
+
+def parse_mix(value):
+    """Parse ``browser=3,api=1`` into scenario weights"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))]
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"requests": 0, "errors": errors, "rps": 0.0}
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+def client_address(index):
+    """A loopback address of its own for every learner, as the rate limiter tells clients apart by address"""
+    return f"127.0.{index // 250}.{index % 250 + 2}"
+
+async def run_learners(make_client, args):
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    scenarios = rng.choices(list(args.mix), weights=list(args.mix.values()), k=args.learners)
+    think = (lambda: random.expovariate(1000 / args.think_ms)) if args.think_ms else (lambda: 0)
+    clients = [make_client(client_address(index)) for index in range(args.learners)]
+    started = time.perf_counter()
+    deadline = started + args.duration
+    try:
+        await asyncio.gather(*(
+            SCENARIOS[scenario](client, recorder, deadline, think)
+            for scenario, client in zip(scenarios, clients)
+        ))
+    finally:
+        for client in clients:
+            await client.aclose()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {
+        label: summarize(recorder.latencies[label], recorder.errors[label], elapsed)
+        for label in sorted(set(recorder.latencies) | set(recorder.errors))
+    }
+    every_latency = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    total = summarize(every_latency, sum(recorder.errors.values()), elapsed)
+    total["learners"] = dict(sorted((name, scenarios.count(name)) for name in set(scenarios)))
+    return endpoints, total
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def start_server(workers):
+    """Start uvicorn on the benchmark database and wait until it answers"""
+    port = free_port()
+    # The environment carries the benchmark database URL set by benchmarks.common
+    env = dict(os.environ)
+    if workers > 1:
+        env.setdefault("QUIZ_SESSION_BACKEND", "sqlite")
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning"
+        ],
+        env=env,
+        cwd=APP_DIR
+    )
+    url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=url) as client:
+        for _ in range(300):
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                if (await client.get("/healthz")).status_code == 200:
+                    return process, url
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 30 s")
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args):
+    process = None
+    if args.url:
+        target = args.url
+    else:
+        await seed_database(args.questions)
+        if args.server:
+            process, target = await start_server(args.workers)
+        else:
+            target = "asgi"
+
+    try:
+        if target == "asgi":
+            await app.router.startup()
+            try:
+                results = await run_learners(lambda address: asgi_client(app, address), args)
+            finally:
+                await app.router.shutdown()
+        else:
+            limits = httpx.Limits(max_connections=1)
+            # Local servers see each learner coming from its own loopback address
+            local = target.startswith("http://127.")
+            results = await run_learners(
+                lambda address: httpx.AsyncClient(
+                    base_url=target,
+                    transport=httpx.AsyncHTTPTransport(limits=limits, local_address=address if local else None)
+                ),
+                args
+            )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    endpoints, total = results
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "target": target if target == "asgi" or args.url else f"uvicorn x{args.workers}",
+            "questions": None if args.url else args.questions,
+            "learners": args.learners,
+            "mix": args.mix,
+            "duration_s": args.duration,
+            "think_ms": args.think_ms,
+            "python": platform.python_version()
+        },
+        "total": total,
+        "endpoints": endpoints
+    }
+
+def print_results(results):
+    meta = results["meta"]
+    print(
+        f"{meta['target']}: {meta['questions']} questions, {meta['learners']} learners "
+        f"{results['total']['learners']}, {meta['duration_s']} s"
+    )
+    print(f"{'endpoint':<20} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(results["endpoints"].items()) + [("total", results["total"])]
+    for label, stats in rows:
+        print(
+            f"{label:<20} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+            f"{stats.get('p50_ms', 0):>9.2f} {stats.get('p95_ms', 0):>9.2f} {stats.get('p99_ms', 0):>9.2f}"
+        )
+
+def compare(baseline, current, threshold):
+    """Print the change of every endpoint against a baseline; returns the regressed endpoints"""
+    print(f"compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('time')}):")
+    for key in ("target", "questions", "learners", "mix", "think_ms"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs ({baseline['meta'].get(key)} -> {current['meta'].get(key)})")
+    print(f"{'endpoint':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9}")
+    regressions = []
+    rows = list(current["endpoints"].items()) + [("total", current["total"])]
+    for label, stats in rows:
+        before = baseline["total"] if label == "total" else baseline["endpoints"].get(label)
+        if not before or not before.get("requests") or not stats.get("requests"):
+            continue
+        changes = {
+            key: (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("p50_ms", "p95_ms", "p99_ms", "rps")
+        }
+        if min(before["requests"], stats["requests"]) < MIN_COMPARED_REQUESTS:
+            note = "  (too few requests)"
+        elif changes["p95_ms"] > threshold or changes["rps"] < -threshold:
+            note = "  REGRESSION"
+            regressions.append(label)
+        else:
+            note = ""
+        print(
+            f"{label:<20} {changes['p50_ms']:>+8.1f}% {changes['p95_ms']:>+8.1f}% "
+            f"{changes['p99_ms']:>+8.1f}% {changes['rps']:>+8.1f}%{note}"
+        )
+    return regressions
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000, help="synthetic questions to seed")
+    parser.add_argument("--learners", type=int, default=50, help="concurrent virtual learners")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("browser=1,api=1"),
+                        help="scenario weights, e.g. browser=3,api=1")
+    parser.add_argument("--think-ms", type=float, default=0.0,
+                        help="mean pause between a learner's requests (default: none)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for assigning scenarios")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--server", action="store_true", help="run against a local uvicorn")
+    target.add_argument("--url", help="run against a running, already seeded server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --server")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare the results with this earlier JSON output")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "RESULTS"),
+                        help="only compare two JSON outputs")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="percent change in p95 or req/s that counts as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, results = (load(path) for path in args.compare)
+    else:
+        results = asyncio.run(run(args))
+        print_results(results)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        baseline = load(args.baseline) if args.baseline else None
+
+    if baseline is not None and compare(baseline, results, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
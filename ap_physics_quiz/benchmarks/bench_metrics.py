@@ -0,0 +1,65 @@
+"""Measure the per-request overhead of MetricsMiddleware.
+
+The middleware wraps a no-op ASGI app and is called directly, without any
+HTTP client, so the difference between the two timings is the cost of the
+instrumentation alone.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_metrics --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from app.metrics import MetricsMiddleware
+
+async def noop_endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+class FakeApp:
+    """Just enough of a Starlette app for the middleware to resolve route names"""
+
+    class Route:
+        path = "/api/question"
+        endpoint = noop_endpoint
+
+    routes = [Route()]
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+async def run(app, requests):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/question",
+        "app": FakeApp,
+        "endpoint": noop_endpoint,
+        "headers": []
+    }
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+async def main(requests):
+    instrumented = MetricsMiddleware(noop_endpoint)
+    # Warm up, then take the best of three runs of each
+    await run(noop_endpoint, 1000)
+    await run(instrumented, 1000)
+    bare = min([await run(noop_endpoint, requests) for _ in range(3)])
+    wrapped = min([await run(instrumented, requests) for _ in range(3)])
+    print(f"bare endpoint:       {bare * 1e6:.3f} µs/request")
+    print(f"with metrics:        {wrapped * 1e6:.3f} µs/request")
+    print(f"metrics overhead:    {(wrapped - bare) * 1e6:.3f} µs/request")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,57 @@
+"""Measure the cost of building quiz pages with and without the page cache.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_page_cache --questions 500 --pages 20000
+"""
+import argparse
+import asyncio
+import gzip
+import random
+import time
+
+from benchmarks.common import seed_database
+
+from app.page_cache import PageCache
+from app.question_pool import question_pool
+from main import score_slots, templates
+
+def render_quiz_page(cache, question, score, accept_encoding):
+    page = cache.page("quiz.html", question, None, {"question": question, "options": question.options})
+    return cache.response(page, score_slots(score), accept_encoding).body
+
+def render_and_gzip(cache, question, score, accept_encoding):
+    """Render uncached and compress the whole page, as a gzip middleware would"""
+    return gzip.compress(render_quiz_page(cache, question, score, ""), 6)
+
+def measure(label, render, cache, questions, pages, accept_encoding=""):
+    rng = random.Random(0)
+    started = time.perf_counter()
+    size = 0
+    for _ in range(pages):
+        size += len(render(cache, rng.choice(questions), rng.randrange(10), accept_encoding))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed / pages * 1e6:>8.1f} us/page   {size / pages:>7.0f} bytes")
+    return elapsed
+
+async def main(questions, pages):
+    await seed_database(questions)
+    await question_pool.load()
+    records = [question_pool.get(question_id) for question_id in range(1, questions + 1)]
+    uncached = PageCache(templates.env, max_size=0)
+    cached = PageCache(templates.env, max_size=questions)
+
+    print(f"{questions} questions, {pages} quiz pages")
+    before = measure("before: render every page", render_quiz_page, uncached, records, pages)
+    after = measure("after: page cache", render_quiz_page, cached, records, pages)
+    print(f"speedup: {before / after:.1f}x")
+    before = measure("before: render + gzip", render_and_gzip, uncached, records, pages)
+    after = measure("after: page cache, pre-gzipped", render_quiz_page, cached, records, pages, "gzip")
+    print(f"speedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.pages))
@@ -0,0 +1,53 @@
+"""Compare random question selection through the ORM against the question pool.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_question_pool --questions 3000 --requests 500
+"""
+import argparse
+import asyncio
+import random
+
+from benchmarks.common import asgi_client, measure_requests, print_row, seed_database
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Question, get_db
+from app.models import QuestionResponse
+from app.question_pool import question_pool
+from main import app
+
+async def legacy_random_question(db: AsyncSession = Depends(get_db)):
+    """The previous /api/question implementation, kept for comparison"""
+    questions = await Question.get_all(db)
+    question = random.choice(questions)
+    return QuestionResponse(
+        id=question.id,
+        text=question.text,
+        options=question.options
+    )
+
+async def main(questions, requests):
+    await seed_database(questions)
+    await question_pool.load()
+    app.add_api_route("/bench/legacy-question", legacy_random_question)
+
+    async with asgi_client(app) as client:
+        # Warm up both paths before measuring
+        await client.get("/bench/legacy-question")
+        await client.get("/api/question")
+
+        print(f"{questions} questions, {requests} sequential requests")
+        before = await measure_requests(lambda: client.get("/bench/legacy-question"), requests)
+        print_row("before: get_all + choice", before)
+        after = await measure_requests(lambda: client.get("/api/question"), requests)
+        print_row("after: question pool", after)
+        print(f"speedup: {after['rps'] / before['rps']:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.requests))
@@ -0,0 +1,64 @@
+"""Measure spaced repetition scheduling with a large bank and many learners.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_scheduler --questions 100000 --learners 2000 --steps 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import seed_database
+
+from app.question_pool import question_pool
+from app.scheduler import Scheduler
+from app.selection import question_selector
+
+async def main(questions, learners, steps):
+    await seed_database(questions)
+    # Weak topic picks go through the selector, as in the app
+    question_pool.add_listener(question_selector)
+    await question_pool.load()
+    scheduler = Scheduler(max_learners=learners)
+    rng = random.Random(0)
+    learner_ids = [f"bench-learner-{i:06d}" for i in range(learners)]
+
+    # Warm up: load every learner once so the timings below exclude loading
+    for learner_id in learner_ids:
+        await scheduler.learner(learner_id)
+
+    operations = 0
+    next_time = record_time = flush_time = 0.0
+    for _ in range(steps):
+        for learner_id in learner_ids:
+            t0 = time.perf_counter()
+            question = await scheduler.next_question(learner_id)
+            t1 = time.perf_counter()
+            await scheduler.record(learner_id, question.id, rng.random() < 0.7)
+            t2 = time.perf_counter()
+            next_time += t1 - t0
+            record_time += t2 - t1
+            operations += 1
+        t0 = time.perf_counter()
+        await scheduler.flush()
+        flush_time += time.perf_counter() - t0
+
+    items = sum(len(schedule.items) for schedule in scheduler._learners.values())
+    print(f"{questions} questions, {learners} learners x {steps} answers, {items} scheduled items")
+    print(f"next_question  {next_time / operations * 1e6:8.1f} us")
+    print(f"record         {record_time / operations * 1e6:8.1f} us")
+    print(f"flush          {flush_time / operations * 1e6:8.1f} us per answer (batches of {learners})")
+
+    t0 = time.perf_counter()
+    for _ in range(operations):
+        question_pool.random()
+    print(f"baseline: pool.random {(time.perf_counter() - t0) / operations * 1e6:8.1f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--learners", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.learners, args.steps))
@@ -0,0 +1,93 @@
+"""Measure /api/questions/search on a large question bank.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_search --questions 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import asgi_client, measure_requests, print_row
+
+from sqlalchemy import insert, text
+
+from app.database import Question, engine, init_db, read_session
+from app.topics import classify
+from main import app
+
+TEMPLATES = [
+    ("A {m} kg cart moves at {v} m/s. What is its kinetic energy?", "KE = (1/2)mv²."),
+    ("A pendulum of length {l} m swings with small amplitude. What is its period?", "T = 2π√(L/g)."),
+    ("A {m} kg satellite orbits a planet at radius {r} km. What is its orbital speed?", "Gravitational force provides the centripetal force."),
+    ("A uniform disk of mass {m} kg and radius {l} m spins at {v} rad/s. What is its angular momentum?", "L = Iω with I = (1/2)MR²."),
+    ("A {m} kg block is pulled across a floor with friction coefficient 0.{c}. What force keeps it moving at constant velocity?", "The applied force balances kinetic friction."),
+    ("A {m} kg ball collides elastically with a wall at {v} m/s. What impulse does the wall deliver?", "Impulse is the change in momentum."),
+    ("A spring with k = {k} N/m is compressed {c} cm. What is the stored potential energy?", "U = (1/2)kx²."),
+    ("A stone is thrown horizontally at {v} m/s from a {l} m cliff. How far does it land?", "Treat horizontal and vertical motion separately."),
+]
+
+def search_questions_bank(count, start=0):
+    """Generate questions on several topics, tagged by keyword"""
+    rng = random.Random(start)
+    for i in range(start, start + count):
+        template, explanation = TEMPLATES[i % len(TEMPLATES)]
+        question_text = f"[{i}] " + template.format(
+            m=rng.randint(1, 50), v=rng.randint(1, 30), l=rng.randint(1, 20),
+            r=rng.randint(6400, 42000), c=rng.randint(1, 9), k=rng.randint(10, 900)
+        )
+        yield {
+            "text": question_text,
+            "options": ["A", "B", "C", "D"],
+            "correct_answer": "A",
+            "correct_index": 0,
+            "explanation": explanation,
+            "tags": classify(question_text, explanation)
+        }
+
+async def seed(count, start=0, batch_size=5000):
+    await init_db()
+    questions = search_questions_bank(count, start)
+    async with engine.begin() as conn:
+        for _ in range(0, count, batch_size):
+            batch = [question for _, question in zip(range(batch_size), questions)]
+            await conn.execute(insert(Question), batch)
+
+async def main(questions, requests):
+    started = time.perf_counter()
+    await seed(questions)
+    print(f"{questions} questions (seeded and indexed in {time.perf_counter() - started:.1f} s)")
+
+    # What finding questions without the index costs: a scan of every row
+    for term in ("[99999]", "zebra"):
+        started = time.perf_counter()
+        async with read_session() as db:
+            await db.execute(
+                text("SELECT id FROM questions WHERE text LIKE :term OR explanation LIKE :term ORDER BY id LIMIT 21"),
+                {"term": f"%{term}%"}
+            )
+        print(f"LIKE scan for {term!r}, one query: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    cases = [
+        ("rare term", {"q": "[99999]"}),
+        ("common term", {"q": "satellite"}),
+        ("prefix", {"q": "pendul"}),
+        ("two words", {"q": "uniform disk"}),
+        ("tag", {"tag": "rotation"}),
+        ("two tags", {"tag": ["energy", "shm"]}),
+        ("term and tag", {"q": "block", "tag": "dynamics"}),
+        ("deep page", {"q": "satellite", "after": questions - 1000}),
+        ("no match", {"q": "zebra"}),
+    ]
+    async with asgi_client(app) as client:
+        for label, params in cases:
+            stats = await measure_requests(lambda: client.get("/api/questions/search", params=params), requests)
+            print_row(label, stats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.requests))
@@ -0,0 +1,64 @@
+"""Compare topic-filtered random selection in Python over all rows with the per-topic id arrays.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_selection --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import random
+
+from benchmarks.common import asgi_client, measure_requests, print_row
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Question, get_db
+from app.models import QuestionResponse
+from app.question_pool import question_pool
+from benchmarks.bench_search import seed
+from main import app, parse_id_list
+
+async def legacy_topic_question(topic: str, exclude: str = "", db: AsyncSession = Depends(get_db)):
+    """Filtering the old get_all + random.choice pattern, kept for comparison"""
+    excluded = parse_id_list(exclude)
+    questions = [
+        question for question in await Question.get_all(db)
+        if topic in (question.tags or ()) and question.id not in excluded
+    ]
+    if not questions:
+        raise HTTPException(status_code=404, detail="No questions available")
+    question = random.choice(questions)
+    return QuestionResponse(id=question.id, text=question.text, options=question.options)
+
+async def main(sizes, requests):
+    app.add_api_route("/bench/legacy-topic-question", legacy_topic_question)
+    seeded = 0
+    async with asgi_client(app) as client:
+        for size in sizes:
+            await seed(size - seeded, start=seeded)
+            seeded = size
+            await question_pool.load()
+
+            # A learner who has already seen up to 200 rotation questions
+            rotation = [record.id for record in question_pool._records if "rotation" in record.tags]
+            seen = random.sample(rotation, min(200, len(rotation) // 2))
+            params = {"topic": "rotation", "exclude": ",".join(map(str, seen))}
+            # The legacy path reads every row per request, so give it fewer
+            legacy_requests = max(5, requests * 1000 // size)
+
+            print(f"{size} questions ({len(rotation)} on rotation), excluding {len(seen)}")
+            before = await measure_requests(
+                lambda: client.get("/bench/legacy-topic-question", params=params), legacy_requests
+            )
+            print_row("  before: get_all + filter", before)
+            after = await measure_requests(lambda: client.get("/api/question", params=params), requests)
+            print_row("  after: topic id arrays", after)
+            print(f"  speedup: {after['rps'] / before['rps']:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(sorted(args.sizes), args.requests))
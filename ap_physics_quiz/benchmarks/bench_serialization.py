@@ -0,0 +1,122 @@
+"""Measure JSON response serialization: response models and the default encoder against the fast JSON mode.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_serialization --questions 3000 --requests 2000
+
+The first table times building one response body, as FastAPI does it for
+a ``response_model`` or a returned dict (validation, ``jsonable_encoder``
+and ``JSONResponse``) and as the fast JSON mode does it (a pre-serialized
+question body, or orjson straight from the dict). The second table times
+whole requests in-process with the fast JSON mode switched off and on.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import asgi_client, measure_requests, print_row, seed_database
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+import main
+from app import responses
+from app.models import QuestionResponse
+from app.question_pool import question_pool
+from app.responses import FastJSONResponse, QuestionPayloads, question_payloads
+
+def route_field(path):
+    return next(route.response_field for route in main.app.routes if getattr(route, "path", None) == path)
+
+async def time_per_call(build, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        await build()
+    return (time.perf_counter() - started) / count * 1e6
+
+async def serialization(count):
+    question = question_pool.random()
+    field = route_field("/api/question")
+    answer = {"correct": False, "correct_answer": question.correct_answer, "explanation": question.explanation}
+    batch = {"total": 100, "correct": 0, "results": [dict(answer, question_id=i) for i in range(100)]}
+
+    async def model_question():
+        model = QuestionResponse(id=question.id, text=question.text, options=question.options)
+        return JSONResponse(await serialize_response(field=field, response_content=model)).body
+
+    async def cold_question():
+        # The first time a question is served: serialized, then cached
+        return QuestionPayloads().get(question)
+
+    async def fast_question():
+        return question_payloads.get(question)
+
+    def default_encoder(content):
+        async def build():
+            return JSONResponse(await serialize_response(response_content=content)).body
+        return build
+
+    def fast_encoder(content):
+        async def build():
+            return FastJSONResponse(content).body
+        return build
+
+    def fallback_encoder(content):
+        async def build():
+            orjson, responses.orjson = responses.orjson, None
+            try:
+                return FastJSONResponse(content).body
+            finally:
+                responses.orjson = orjson
+        return build
+
+    cases = [
+        ("/api/question", model_question, [("first serve", cold_question), ("cached bytes", fast_question)]),
+        ("/api/answer", default_encoder(answer), [("orjson", fast_encoder(answer)),
+                                                  ("json fallback", fallback_encoder(answer))]),
+        ("/api/answers x100", default_encoder(batch), [("orjson", fast_encoder(batch)),
+                                                       ("json fallback", fallback_encoder(batch))]),
+    ]
+    print(f"{'response body':<20} {'model/encoder':>14}   fast JSON mode")
+    for label, before, afters in cases:
+        before_us = await time_per_call(before, count)
+        after = "   ".join([f"{name} {await time_per_call(build, count):.2f} µs" for name, build in afters])
+        print(f"{label:<20} {before_us:>11.2f} µs   {after}")
+
+async def requests(count):
+    async with asgi_client(main.app) as client:
+        question_ids = [question_pool.random().id for _ in range(100)]
+        batch = [{"question_id": question_id, "option_index": 0} for question_id in question_ids]
+        for fast in (False, True):
+            main.FAST_JSON = fast
+            mode = "fast" if fast else "model"
+            print_row(f"{mode} GET /api/question", await measure_requests(
+                lambda: client.get("/api/question?exclude=0"), count
+            ))
+            print_row(f"{mode} POST /api/answer", await measure_requests(
+                lambda: client.post(
+                    "/api/answer", json={"question_id": random.choice(question_ids), "option_index": 0}
+                ),
+                count
+            ))
+            print_row(f"{mode} POST /api/answers x100", await measure_requests(
+                lambda: client.post("/api/answers", json=batch), count // 10
+            ))
+            print_row(f"{mode} GET /api/score", await measure_requests(lambda: client.get("/api/score"), count))
+
+async def run(questions, count):
+    await seed_database(questions)
+    await main.app.router.startup()
+    try:
+        await serialization(count * 10)
+        await requests(count)
+    finally:
+        await main.app.router.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.questions, args.requests))
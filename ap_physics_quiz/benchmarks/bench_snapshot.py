@@ -0,0 +1,105 @@
+"""Compare serving the question API from the in-memory pool and from a memory-mapped snapshot.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_snapshot --questions 100000 --requests 2000
+
+Seeds a throwaway database, exports it with ``export_snapshot`` and then
+starts the app twice in new interpreters, once loading the question pool
+and once with ``QUIZ_SNAPSHOT``. Each worker reports its memory growth over
+startup and the requests (private memory, which every worker pays, and
+file-backed memory, which workers mapping the same snapshot share) and
+the latency of random ``GET /api/question`` picks and ``POST /api/answer``.
+Pool workers also log every attempt; snapshot workers are read-only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BENCH_DB_PATH, asgi_client, measure_requests, print_row, seed_database
+
+from app.snapshot import export_snapshot
+
+def memory_mb():
+    """Private (anonymous) and file-backed resident memory of this process in MB"""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            fields[name] = int(value.split()[0]) / 1024 if value.strip().endswith("kB") else None
+    return fields["RssAnon"], fields["RssFile"]
+
+async def worker(requests, questions):
+    """Start the app in this process, time the question API and print a JSON report"""
+    import main
+
+    before = memory_mb()
+    started = time.perf_counter()
+    await main.app.router.startup()
+    startup = time.perf_counter() - started
+    try:
+        async with asgi_client(main.app) as client:
+            # ``exclude`` makes the pool worker pick at random too, instead
+            # of asking the spaced repetition scheduler
+            question = await measure_requests(lambda: client.get("/api/question?exclude=0"), requests)
+            answer = await measure_requests(
+                lambda: client.post(
+                    "/api/answer", json={"question_id": random.randint(1, questions), "option_index": 1}
+                ),
+                requests
+            )
+        after = memory_mb()
+    finally:
+        await main.app.router.shutdown()
+    print(json.dumps({
+        "startup_s": startup,
+        "anon_mb": after[0] - before[0],
+        "file_mb": after[1] - before[1],
+        "question": question,
+        "answer": answer
+    }))
+
+def run_worker(requests, questions, snapshot_path=None):
+    env = dict(os.environ, QUIZ_DATABASE_URL=f"sqlite+aiosqlite:///{BENCH_DB_PATH}")
+    env.pop("QUIZ_SNAPSHOT", None)
+    if snapshot_path:
+        env["QUIZ_SNAPSHOT"] = snapshot_path
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_snapshot", "--worker", "--requests", str(requests),
+         "--questions", str(questions)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+async def main(count, requests):
+    await seed_database(count)
+    path = os.path.join(os.path.dirname(BENCH_DB_PATH), "questions.snap")
+    started = time.perf_counter()
+    exported = await export_snapshot(path)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(path)
+    print(f"export_snapshot: {exported} questions in {elapsed:.2f} s, "
+          f"{size / 2 ** 20:.1f} MB ({size / exported:.0f} bytes per question)")
+
+    for label, snapshot_path in (("pool", None), ("snapshot", path)):
+        report = run_worker(requests, exported, snapshot_path)
+        print(f"{label}: startup {report['startup_s'] * 1000:.0f} ms, memory grew by "
+              f"{report['anon_mb']:.1f} MB private + {report['file_mb']:.1f} MB file-backed")
+        print_row("  GET /api/question", report["question"])
+        print_row("  POST /api/answer", report["answer"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(worker(args.requests, args.questions))
+    else:
+        asyncio.run(main(args.questions, args.requests))
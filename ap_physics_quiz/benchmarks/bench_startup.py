@@ -0,0 +1,153 @@
+"""Profile cold start: import time by module and time from launching a worker to ready.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --imports 15
+
+Each run starts uvicorn in a new process and polls ``/healthz`` until the
+worker reports ready, once against a new database file (schema creation
+and seeding) and once against the database the previous run left behind,
+which is what a worker scaling up sees. The phases the worker reports
+(import, init_db, question pool, warm-up) are averaged over the runs, and
+the first ``GET /quiz`` after ready is timed. The in-process part times
+``init_db`` alone on both kinds of database.
+
+``--imports`` prints the slowest imports of ``main`` from
+``python -X importtime``: top-level packages by total time and single
+modules by their own time.
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.common import BENCH_DB_PATH
+
+import httpx
+
+from benchmarks.bench_load import APP_DIR, free_port
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def database_url(path):
+    return f"sqlite+aiosqlite:///{path}"
+
+async def start_worker(path):
+    """Start uvicorn and wait until it is ready; returns (seconds to ready, phases, first /quiz seconds)"""
+    port = free_port()
+    env = dict(os.environ, QUIZ_DATABASE_URL=database_url(path))
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--no-access-log", "--log-level", "warning"
+        ],
+        env=env,
+        cwd=APP_DIR
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            while process.poll() is None:
+                try:
+                    response = await client.get("/healthz")
+                    if response.status_code == 200:
+                        ready = time.perf_counter() - started
+                        first = time.perf_counter()
+                        (await client.get("/quiz")).raise_for_status()
+                        return ready, response.json()["startup"]["phases_ms"], time.perf_counter() - first
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.005)
+        raise RuntimeError("uvicorn exited during startup")
+    finally:
+        process.terminate()
+        process.wait()
+
+def init_db_time(path):
+    """Seconds spent in init_db, measured in a new interpreter"""
+    code = (
+        "import asyncio, time\n"
+        "from app.database import init_db\n"
+        "started = time.perf_counter()\n"
+        "asyncio.run(init_db())\n"
+        "print(time.perf_counter() - started)\n"
+    )
+    env = dict(os.environ, QUIZ_DATABASE_URL=database_url(path))
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=APP_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.split()[-1])
+
+def import_profile(module, top):
+    """Print the slowest imports of a module in a new interpreter"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    packages = defaultdict(int)
+    modules = []
+    total = 0
+    for match in _IMPORT_LINE.finditer(stderr):
+        own, cumulative, indent, name = int(match[1]), int(match[2]), len(match[3]), match[4]
+        modules.append((own, name))
+        if indent == 1 and name == module:
+            total = cumulative
+        elif indent == 3:
+            # Direct imports of the module; each carries the time of the
+            # packages it was first to import
+            packages[name if name.startswith("app.") else name.split(".")[0]] += cumulative
+    print(f"import {module}: {total / 1000:.1f} ms")
+    print(f"{'imported directly by ' + module:<36} {'total ms':>10}")
+    for name, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<36} {cumulative / 1000:>10.1f}")
+    print(f"{'module':<36} {'own ms':>10}")
+    for own, name in sorted(modules, reverse=True)[:top]:
+        print(f"{name:<36} {own / 1000:>10.1f}")
+
+def report(label, seconds):
+    print(f"{label:<36} median {statistics.median(seconds) * 1000:>8.1f} ms   min {min(seconds) * 1000:>8.1f} ms")
+
+async def main(runs):
+    directory = os.path.dirname(BENCH_DB_PATH)
+    fresh_init, warm_init = [], []
+    for _ in range(runs):
+        path = tempfile.mktemp(dir=directory, suffix=".db")
+        fresh_init.append(init_db_time(path))
+        warm_init.append(init_db_time(path))
+    report("init_db, new database", fresh_init)
+    report("init_db, existing database", warm_init)
+
+    for label, reuse in (("new database", False), ("existing database", True)):
+        ready, first_quiz = [], []
+        phases = defaultdict(list)
+        for _ in range(runs):
+            path = tempfile.mktemp(dir=directory, suffix=".db")
+            if reuse:
+                await start_worker(path)
+            seconds, worker_phases, first = await start_worker(path)
+            ready.append(seconds)
+            first_quiz.append(first)
+            for name, milliseconds in worker_phases.items():
+                phases[name].append(milliseconds / 1000)
+        report(f"launch to ready, {label}", ready)
+        for name, seconds in phases.items():
+            report(f"  {name}", seconds)
+        report("  first GET /quiz after ready", first_quiz)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--imports", type=int, metavar="N",
+                        help="print the N slowest imports of main instead of timing startups")
+    args = parser.parse_args()
+    if args.imports:
+        import_profile("main", args.imports)
+    else:
+        asyncio.run(main(args.runs))
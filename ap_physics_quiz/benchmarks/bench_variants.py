@@ -0,0 +1,50 @@
+"""Measure parametric question generation, memoized lookups and variant grading.
+
+Usage (from the ap_physics_quiz directory):
+
+    python -m benchmarks.bench_variants --variants 100000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import asgi_client, measure_requests, print_row
+
+from app.variants import TEMPLATES, compute, generate, variant
+from main import app
+
+def rate(label, count, function):
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {count / elapsed:>12,.0f} variants/s")
+
+async def main(count, requests):
+    template = TEMPLATES["centripetal-force"]
+    seeds = range(count)
+    print(f"{count} variants of {template.name}")
+    rate("one at a time (generate per seed)", count // 10, lambda: [generate(template, [seed]) for seed in range(count // 10)])
+    rate("vectorized numbers only (compute)", count, lambda: compute(template, seeds))
+    rate("vectorized with text and options (generate)", count, lambda: generate(template, seeds))
+    variant.cache_clear()
+    rate("memoized, first lookup", count // 10, lambda: [variant(template.name, seed) for seed in range(count // 10)])
+    rate("memoized, repeated lookup", count // 10, lambda: [variant(template.name, seed) for seed in range(count // 10)])
+
+    question = variant(template.name, 1)
+    async with asgi_client(app) as client:
+        stats = await measure_requests(
+            lambda: client.get("/api/variant", params={"template": template.name, "seed": 1}), requests
+        )
+        print_row("GET /api/variant", stats)
+        stats = await measure_requests(
+            lambda: client.post("/api/variant/answer", json={"variant_id": question.id, "option_index": 0}),
+            requests
+        )
+        print_row("POST /api/variant/answer", stats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.variants, args.requests))
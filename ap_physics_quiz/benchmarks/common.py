@@ -0,0 +1,77 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database so they never touch
+``quiz.db``. Import this module before anything from ``app`` or ``main``.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="quiz-bench-")
+BENCH_DB_PATH = os.path.join(_tmpdir, "bench.db")
+os.environ.setdefault("QUIZ_DATABASE_URL", f"sqlite+aiosqlite:///{BENCH_DB_PATH}")
+# Benchmarks send answers as fast as they can; set QUIZ_RATE_LIMIT to measure with the limiter
+os.environ.setdefault("QUIZ_RATE_LIMIT", "0")
+
+import httpx
+from sqlalchemy import insert
+
+from app.database import Question, engine, init_db
+
+def synthetic_questions(count, start=0):
+    """Generate simple kinematics questions with unique text"""
+    rng = random.Random(start)
+    for i in range(start, start + count):
+        mass = rng.randint(1, 50)
+        speed = rng.randint(1, 30)
+        answer = 0.5 * mass * speed ** 2
+        options = [f"{answer * factor:g} J" for factor in (0.5, 1, 2, 4)]
+        yield {
+            "text": f"[{i}] A {mass} kg cart moves at {speed} m/s. What is its kinetic energy?",
+            "options": options,
+            "correct_answer": options[1],
+            "correct_index": 1,
+            "explanation": f"KE = (1/2)mv² = 0.5 × {mass} × {speed}² = {answer:g} J."
+        }
+
+async def seed_database(count, batch_size=1000):
+    """Create the schema and add ``count`` synthetic questions"""
+    await init_db()
+    questions = list(synthetic_questions(count))
+    async with engine.begin() as conn:
+        for i in range(0, len(questions), batch_size):
+            await conn.execute(insert(Question), questions[i:i + batch_size])
+
+def asgi_client(app, address="127.0.0.1"):
+    """Create an HTTP client that calls the ASGI app in-process as a client at ``address``"""
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, client=(address, 123)),
+        base_url="http://bench"
+    )
+
+async def measure_requests(send, requests):
+    """Send ``requests`` sequential requests and return timing stats"""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = await send()
+        latencies.append(time.perf_counter() - t0)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+def print_row(label, stats):
+    """Print one line of benchmark output"""
+    print(
+        f"{label:<28} {stats['rps']:>10.1f} req/s"
+        f"   p50 {stats['p50_ms']:>7.3f} ms   p99 {stats['p99_ms']:>7.3f} ms"
+    )
@@ -1,26 +1,121 @@
-import uvicorn
-from fastapi import FastAPI, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from typing import Optional, List, Dict, Any
+# Imported first so the startup profile covers every other import
+from app.startup import WARM_START, startup_profile
+
+import io
+import math
+import os
 import random
+import secrets
+import tempfile
+from fastapi import FastAPI, Request, Form, Depends, Header, HTTPException, Query
+from fastapi.responses import (
+    HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List, Dict, Any, AsyncIterator
+
+from app import bulk
+from app.analytics import analytics
+from app.answer_key import AnswerKeyEntry, answer_key
+from app.attempts import attempt_log
+from app.database import get_read_db, init_db
+from app.exams import exam_store, session_seed
+from app.metrics import MetricsMiddleware, registry
+from app.models import (
+    MAX_ANSWER_LENGTH, QuestionResponse, AnswerRequest, ExamRequest, SearchResponse, VariantAnswerRequest,
+    VariantResponse
+)
+from app.page_cache import PageCache
+from app.static_assets import StaticAssets
+from app.topics import normalize_tags
+from app.variants import TEMPLATES, parse_variant_id, variant
+from app.query_stats import query_stats
+from app.rate_limit import rate_limiter
+from app.responses import FAST_JSON, FastJSONResponse, question_payloads
+from app.question_pool import question_pool
+from app.scheduler import scheduler
+from app.search import MAX_LIMIT, MAX_TAGS, search_questions
+from app.selection import question_selector
+from app.sessions import QuizState, SessionMiddleware, session_store
+from app.snapshot import SNAPSHOT_PATH, QuestionSnapshot
+from app.templating import InstrumentedTemplates, precompile_templates
+
+# Answers are graded from an in-memory index kept in sync with the pool
+question_pool.add_listener(answer_key)
+
+# Topic-filtered selection keeps per-topic id arrays in sync with the pool
+question_pool.add_listener(question_selector)
+question_pool.add_listener(exam_store)
+question_pool.add_listener(question_payloads)
 
-from app.database import get_db, init_db, Question
-from app.models import QuestionResponse, AnswerRequest
+# Set at startup when QUIZ_SNAPSHOT is configured: the question API is then
+# served from the memory-mapped snapshot and the database is not used
+snapshot: Optional[QuestionSnapshot] = None
 
-app = FastAPI(title="AP Physics C Mechanics Quiz")
+# Maximum number of answers graded by one /api/answers request
+MAX_BATCH_ANSWERS = 1000
+# Maximum number of ids /api/question accepts in ``exclude``
+MAX_EXCLUDED_IDS = 1000
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app = FastAPI(
+    title="AP Physics C Mechanics Quiz",
+    default_response_class=FastJSONResponse if FAST_JSON else JSONResponse
+)
+app.add_middleware(SessionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+# Static files are fingerprinted and precompressed in memory at startup
+static_assets = StaticAssets(directory="static", prefix="/static")
+app.mount("/static", static_assets, name="static")
 
 # Templates
-templates = Jinja2Templates(directory="templates")
+templates = InstrumentedTemplates(directory="templates")
+templates.env.globals["static_url"] = static_assets.url
+
+# Question pages are rendered once and shared; per-user parts are spliced in
+page_cache = PageCache(templates.env)
+question_pool.add_listener(page_cache)
+
+startup_profile.mark("import")
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("QUIZ_ADMIN_TOKEN")
 
-# Store current user's score in memory (would use sessions in production)
-user_score = 0
-current_question_id = None
+async def require_admin(authorization: Optional[str] = Header(None)):
+    """Dependency that only lets requests with the admin bearer token through"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not authorization or not secrets.compare_digest(authorization, f"Bearer {ADMIN_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+async def enforce_rate_limit(request: Request, answers: int = 1):
+    """Reject a request carrying ``answers`` answers if its session or client is over the rate limit"""
+    if not rate_limiter.enabled:
+        return
+    address = request.client.host if request.client else None
+    retry_after = await rate_limiter.check(request.state.session_id, address, answers)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many answers; slow down",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+async def rate_limit(request: Request):
+    """Dependency that rejects answers from sessions or clients over the rate limit"""
+    await enforce_rate_limit(request)
+
+async def get_quiz_state(request: Request) -> AsyncIterator[QuizState]:
+    """Dependency to load the quiz state of the current session, held until the request is done"""
+    async with session_store.locked(request.state.session_id):
+        yield await session_store.load(request.state.session_id)
+
+def score_slots(score: int) -> dict:
+    """Per-user parts of the quiz and result pages"""
+    return {
+        "score": page_cache.partial("partials/score.html", score=score),
+        "achievement": page_cache.partial("partials/achievement.html", score=score)
+    }
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -28,123 +123,422 @@ async def home(request: Request):
     return templates.TemplateResponse("home.html", {"request": request})
 
 @app.get("/quiz", response_class=HTMLResponse)
-async def quiz(request: Request, db: AsyncSession = Depends(get_db)):
+async def quiz(request: Request, state: QuizState = Depends(get_quiz_state)):
     """Get a random question and display it to the user"""
-    global user_score, current_question_id
-    
-    # Get a random question from the database
-    questions = await Question.get_all(db)
-    if not questions:
+
+    # Let the learner's spaced repetition schedule pick the question
+    question = await scheduler.next_question(request.state.session_id)
+    if question is None:
         return templates.TemplateResponse(
             "error.html", 
             {"request": request, "message": "No questions available in the database."}
         )
     
-    question = random.choice(questions)
-    current_question_id = question.id
+    state.current_question_id = question.id
+    await session_store.save(request.state.session_id, state)
     
-    return templates.TemplateResponse(
-        "quiz.html", 
-        {
-            "request": request, 
-            "question": question,
-            "score": user_score,
-            "options": question.options.split("|") if question.options else None
-        }
+    page = page_cache.page("quiz.html", question, None, {
+        "question": question,
+        "options": question.options
+    })
+    return page_cache.response(
+        page, score_slots(state.score), request.headers.get("accept-encoding", "")
     )
 
-@app.post("/submit", response_class=HTMLResponse)
+@app.post("/submit", response_class=HTMLResponse, dependencies=[Depends(rate_limit)])
 async def submit_answer(
     request: Request,
-    answer: str = Form(...),
-    db: AsyncSession = Depends(get_db)
+    answer: Optional[str] = Form(None, max_length=MAX_ANSWER_LENGTH),
+    option: Optional[int] = Form(None),
+    state: QuizState = Depends(get_quiz_state)
 ):
     """Check the user's answer and provide feedback"""
-    global user_score, current_question_id
-    
-    if current_question_id is None:
+    if option is None and not (answer and answer.strip()):
+        return templates.TemplateResponse(
+            "error.html",
+            {"request": request, "message": "Choose an option or type an answer."},
+            status_code=422
+        )
+    if state.current_question_id is None:
         return RedirectResponse(url="/quiz", status_code=303)
     
-    question = await Question.get_by_id(db, current_question_id)
-    if not question:
+    question = question_pool.get(state.current_question_id)
+    key = answer_key.get(state.current_question_id)
+    if question is None or key is None:
         return templates.TemplateResponse(
             "error.html", 
             {"request": request, "message": "Question not found."}
         )
     
-    # Simple check for correct answer
-    is_correct = answer.strip().lower() == question.correct_answer.strip().lower()
+    # Multiple choice answers arrive as the index of the selected option
+    is_correct = key.is_correct(answer, option)
+    if option is not None and question.options and 0 <= option < len(question.options):
+        answer = question.options[option]
     
     if is_correct:
-        user_score += 1
-    
-    return templates.TemplateResponse(
-        "result.html",
-        {
-            "request": request,
-            "is_correct": is_correct,
-            "question": question,
-            "user_answer": answer,
-            "correct_answer": question.correct_answer,
-            "explanation": question.explanation,
-            "score": user_score
-        }
+        state.score += 1
+    await session_store.save(request.state.session_id, state)
+    recorded = await scheduler.record(request.state.session_id, question.id, is_correct)
+    await attempt_log.log(
+        request.state.session_id, question.id, is_correct,
+        option, answer if option is None else None, *recorded
     )
+    
+    page = page_cache.page("result.html", question, is_correct, {
+        "is_correct": is_correct,
+        "question": question,
+        "correct_answer": question.correct_answer,
+        "explanation": question.explanation
+    })
+    slots = score_slots(state.score)
+    slots["user_answer"] = answer or ""
+    return page_cache.response(page, slots, request.headers.get("accept-encoding", ""))
 
 @app.post("/reset")
-async def reset_score():
+async def reset_score(request: Request):
     """Reset the user's score and start a new quiz"""
-    global user_score, current_question_id
-    user_score = 0
-    current_question_id = None
+    await session_store.delete(request.state.session_id)
     return RedirectResponse(url="/quiz", status_code=303)
 
 # API routes for potential frontend integration
+def parse_id_list(value: Optional[str]) -> set:
+    """Parse a comma-separated list of question ids"""
+    if not value:
+        return set()
+    try:
+        ids = {int(item) for item in value.split(",") if item.strip()}
+    except ValueError:
+        raise HTTPException(status_code=422, detail="exclude must be a comma-separated list of question ids")
+    if len(ids) > MAX_EXCLUDED_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_EXCLUDED_IDS} ids can be excluded")
+    return ids
+
 @app.get("/api/question", response_model=QuestionResponse)
-async def get_random_question(db: AsyncSession = Depends(get_db)):
-    """API endpoint to get a random question"""
-    questions = await Question.get_all(db)
-    if not questions:
+async def get_random_question(request: Request, topic: Optional[str] = None, exclude: Optional[str] = None):
+    """API endpoint to get the next question for this session.
+
+    Without parameters the spaced repetition scheduler chooses; with a
+    ``topic`` and/or comma-separated ``exclude`` ids a random question
+    matching them is returned.
+    """
+    if snapshot is not None:
+        position = snapshot.pick(topic.strip().lower() if topic else None, parse_id_list(exclude))
+        if position is None:
+            raise HTTPException(status_code=404, detail="No questions available")
+        # Stored pre-serialized, so the body is sent without building a model
+        return Response(snapshot.question_json(position), media_type="application/json")
+    session_id = request.state.session_id
+    if topic is None and not exclude:
+        question = await scheduler.next_question(session_id)
+    else:
+        question = question_selector.pick(topic.strip().lower() if topic else None, parse_id_list(exclude))
+        if question is not None:
+            await scheduler.served(session_id, question.id)
+    if question is None:
         raise HTTPException(status_code=404, detail="No questions available")
     
-    question = random.choice(questions)
+    if FAST_JSON:
+        # Serialized once per question; QuestionResponse still documents the body
+        return Response(question_payloads.get(question), media_type="application/json")
     return QuestionResponse(
         id=question.id,
         text=question.text,
-        options=question.options.split("|") if question.options else None
+        options=question.options
     )
 
-@app.post("/api/answer")
-async def check_answer(answer_req: AnswerRequest, db: AsyncSession = Depends(get_db)):
+@app.post("/api/answer", dependencies=[Depends(rate_limit)])
+async def check_answer(request: Request, answer_req: AnswerRequest):
     """API endpoint to check an answer"""
-    question = await Question.get_by_id(db, answer_req.question_id)
-    if not question:
+    key = get_answer_key(answer_req.question_id)
+    if key is None:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    is_correct = answer_req.answer.strip().lower() == question.correct_answer.strip().lower()
-    
+    result = grade_answer(key, answer_req)
+    await record_attempt(request.state.session_id, answer_req, result["correct"])
+    return json_response(result)
+
+def json_response(content: Any):
+    """Send plain JSON-compatible content straight to the encoder in fast JSON mode.
+
+    FastAPI otherwise walks the content with ``jsonable_encoder`` first,
+    which is wasted work for dicts of strings, numbers and lists.
+    """
+    return FastJSONResponse(content) if FAST_JSON else content
+
+def get_answer_key(question_id: int) -> Optional[AnswerKeyEntry]:
+    """Answer key of a question from the snapshot or the in-memory index"""
+    if snapshot is not None:
+        return snapshot.answer_key(question_id)
+    return answer_key.get(question_id)
+
+def grade_answer(key: AnswerKeyEntry, answer_req: AnswerRequest) -> dict:
+    """Grade one answer and build the /api/answer response body"""
+    is_correct = key.is_correct(answer_req.answer, answer_req.option_index)
     return {
         "correct": is_correct,
-        "correct_answer": question.correct_answer if not is_correct else None,
-        "explanation": question.explanation if not is_correct else None
+        "correct_answer": key.correct_answer if not is_correct else None,
+        "explanation": key.explanation if not is_correct else None
     }
 
+async def record_attempt(session_id: str, answer_req: AnswerRequest, correct: bool):
+    """Update the session's schedule and log the attempt"""
+    if snapshot is not None:
+        # Snapshot workers are read-only
+        return
+    recorded = await scheduler.record(session_id, answer_req.question_id, correct)
+    await attempt_log.log(
+        session_id, answer_req.question_id, correct,
+        answer_req.option_index, answer_req.answer, *recorded
+    )
+
+@app.post("/api/answers")
+async def check_answers(request: Request, answer_reqs: List[AnswerRequest]):
+    """API endpoint to grade many answers in one request"""
+    if len(answer_reqs) > MAX_BATCH_ANSWERS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {MAX_BATCH_ANSWERS} answers per request"
+        )
+    # Each answer in the batch counts against the rate limit
+    await enforce_rate_limit(request, len(answer_reqs))
+    
+    results = []
+    correct = 0
+    for answer_req in answer_reqs:
+        key = get_answer_key(answer_req.question_id)
+        if key is None:
+            results.append({"question_id": answer_req.question_id, "error": "Question not found"})
+            continue
+        result = grade_answer(key, answer_req)
+        result["question_id"] = answer_req.question_id
+        correct += result["correct"]
+        await record_attempt(request.state.session_id, answer_req, result["correct"])
+        results.append(result)
+    
+    return json_response({"total": len(answer_reqs), "correct": correct, "results": results})
+
+@app.get("/api/variants")
+async def get_variant_templates():
+    """Question templates that generate numeric variants, with their topic tags"""
+    return {name: list(template.tags) for name, template in TEMPLATES.items()}
+
+@app.get("/api/variant", response_model=VariantResponse)
+async def get_variant(template: Optional[str] = None, seed: Optional[int] = Query(None, ge=0, lt=2 ** 64)):
+    """Generate a variant of a template (a random one if not given) for a seed (random if not given)"""
+    if template is None:
+        template = random.choice(list(TEMPLATES))
+    elif template not in TEMPLATES:
+        raise HTTPException(status_code=404, detail="Template not found")
+    question = variant(template, seed if seed is not None else secrets.randbelow(2 ** 32))
+    if FAST_JSON:
+        return FastJSONResponse({
+            "id": question.id, "text": question.text, "options": list(question.options), "tags": list(question.tags)
+        })
+    return VariantResponse(id=question.id, text=question.text, options=question.options, tags=question.tags)
+
+@app.post("/api/variant/answer")
+async def check_variant_answer(answer_req: VariantAnswerRequest):
+    """Grade an answer to a generated variant; the variant is regenerated from its id"""
+    parsed = parse_variant_id(answer_req.variant_id)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail="Variant not found")
+    return json_response(grade_answer(variant(*parsed).answer_key(), answer_req))
+
+@app.post("/api/exams", dependencies=[Depends(rate_limit)])
+async def create_exam(request: Request, exam_req: ExamRequest):
+    """Generate an exam balanced across topics, or get the one the same parameters generated before"""
+    try:
+        topics = normalize_tags(exam_req.topics)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Without a seed the session always gets the same exam for the same
+    # parameters, so repeating the request does not add another one
+    seed = exam_req.seed if exam_req.seed is not None else session_seed(request.state.session_id)
+    paper = await exam_store.create(seed, exam_req.length, topics)
+    if paper is None:
+        raise HTTPException(status_code=404, detail="No questions available")
+    return Response(exam_store.payload(paper), media_type="application/json")
+
+@app.get("/api/exams/{exam_id}")
+async def get_exam(exam_id: str):
+    """Get a generated exam by id"""
+    paper = await exam_store.get(exam_id)
+    if paper is None:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    return Response(exam_store.payload(paper), media_type="application/json")
+
+@app.post("/api/exams/{exam_id}/answers")
+async def grade_exam(request: Request, exam_id: str, answer_reqs: List[AnswerRequest]):
+    """Grade every answer to an exam at once, with a per-question and per-topic breakdown"""
+    # Every graded answer is recorded as an attempt, so each one counts
+    # against the rate limit as in /api/answers
+    await enforce_rate_limit(request, len(answer_reqs))
+    paper = await exam_store.get(exam_id)
+    if paper is None:
+        raise HTTPException(status_code=404, detail="Exam not found")
+
+    exam_questions = set(paper.question_ids)
+    answers = {}
+    for answer_req in answer_reqs:
+        if answer_req.question_id not in exam_questions:
+            raise HTTPException(
+                status_code=422, detail=f"Question {answer_req.question_id} is not part of this exam"
+            )
+        if answer_req.question_id in answers:
+            raise HTTPException(
+                status_code=422, detail=f"Question {answer_req.question_id} is answered more than once"
+            )
+        answers[answer_req.question_id] = (answer_req.answer, answer_req.option_index)
+
+    result = exam_store.grade(paper, answers)
+    graded = {item["question_id"]: item["correct"] for item in result["results"]}
+    for answer_req in answer_reqs:
+        if answer_req.question_id in graded:
+            await record_attempt(request.state.session_id, answer_req, graded[answer_req.question_id])
+    return result
+
 @app.get("/api/score")
-async def get_score():
+async def get_score(state: QuizState = Depends(get_quiz_state)):
     """API endpoint to get the current score"""
-    return {"score": user_score}
+    return json_response({"score": state.score})
 
 @app.post("/api/restart")
-async def restart_quiz():
+async def restart_quiz(request: Request, state: QuizState = Depends(get_quiz_state)):
     """API endpoint to restart the quiz"""
-    global user_score
-    user_score = 0
-    return {"message": "Quiz restarted", "score": user_score}
+    state.reset()
+    await session_store.save(request.state.session_id, state)
+    return {"message": "Quiz restarted", "score": state.score}
+
+@app.get("/api/topics")
+async def get_topics():
+    """Topic tags with the number of questions carrying each"""
+    return question_selector.topics()
+
+@app.get("/api/questions/search", response_model=SearchResponse)
+async def search(
+    q: Optional[str] = Query(None, max_length=200),
+    tag: List[str] = Query([]),
+    after: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Search question text and explanations, optionally only questions with every given tag.
+
+    Results are in id order; pass ``next_after`` from a page as ``after`` to
+    get the next one.
+    """
+    if len(tag) > MAX_TAGS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_TAGS} tags can be given")
+    try:
+        tags = normalize_tags(tag)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    page = await search_questions(db, q, tags, after, limit)
+    return SearchResponse(questions=page.questions, next_after=page.next_after)
+
+@app.post("/api/admin/questions/import", dependencies=[Depends(require_admin)])
+async def import_questions(request: Request, format: str = "jsonl", strict: bool = False):
+    """API endpoint to bulk import questions from a JSONL or CSV request body"""
+    if format not in bulk.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(bulk.FORMATS)}")
+
+    # Spool the upload so that large files go to disk instead of memory
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        stream = io.TextIOWrapper(upload, encoding="utf-8", newline="")
+        try:
+            report = await bulk.import_questions(stream, format, strict=strict)
+        except bulk.ImportValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            stream.detach()
+
+    await question_pool.refresh()
+    return report.to_dict()
+
+@app.get("/api/admin/questions/export", dependencies=[Depends(require_admin)])
+async def export_questions(format: str = "jsonl"):
+    """API endpoint to stream every question as JSONL or CSV"""
+    if format not in bulk.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(bulk.FORMATS)}")
+    return StreamingResponse(
+        bulk.export_questions(format),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="questions.{format}"'}
+    )
+
+@app.get("/healthz")
+async def healthz():
+    """Readiness: 200 once startup has finished, 503 while starting or shutting down"""
+    body = {
+        "status": "ready" if startup_profile.is_ready else "stopping" if startup_profile.stopping else "starting",
+        "questions": len(snapshot if snapshot is not None else question_pool),
+        "startup": startup_profile.summary()
+    }
+    return JSONResponse(body, status_code=200 if startup_profile.is_ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose request, database and template metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats/questions")
+async def get_question_stats():
+    """API endpoint to get item statistics of every answered question"""
+    return Response(analytics.payload(), media_type="application/json")
+
+@app.get("/api/stats/questions/{question_id}")
+async def get_question_stats_by_id(question_id: int):
+    """API endpoint to get item statistics of one question"""
+    stats = analytics.question(question_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No attempts for this question")
+    return stats
+
+@app.get("/api/debug/queries", dependencies=[Depends(require_admin)])
+async def get_query_stats():
+    """API endpoint to get SQL statement timings grouped by fingerprint"""
+    return {"queries": query_stats.snapshot()}
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the database on startup"""
-    await init_db()
+    """Initialize the database, load the question pool and warm caches before reporting ready"""
+    global snapshot
+    if SNAPSHOT_PATH:
+        with startup_profile.phase("snapshot"):
+            snapshot = QuestionSnapshot(SNAPSHOT_PATH)
+        startup_profile.ready()
+        return
+    with startup_profile.phase("init_db"):
+        await init_db()
+    with startup_profile.phase("question_pool"):
+        await question_pool.load()
+    if WARM_START:
+        with startup_profile.phase("warm"):
+            # Compile templates and render the per-user fragments of a new
+            # session now, rather than in the first requests
+            precompile_templates(templates.env)
+            page_cache.warm(["quiz.html", "result.html"])
+            score_slots(0)
+            await scheduler.warm()
+    question_pool.start_watcher()
+    scheduler.start()
+    attempt_log.start()
+    analytics.start_watcher()
+    startup_profile.ready()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks on shutdown"""
+    startup_profile.stopping = True
+    await question_pool.stop_watcher()
+    await scheduler.stop()
+    await attempt_log.stop()
+    await analytics.stop_watcher()
+    if snapshot is not None:
+        snapshot.close()
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    import run
+    run.main() 
\ No newline at end of file
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from app import bulk
+from app.database import init_db
+from app.snapshot import export_snapshot
+
+async def import_questions(args):
+    """Import questions from a JSONL or CSV file"""
+    await init_db()
+    fmt = args.format or bulk.detect_format(args.path)
+    started = time.perf_counter()
+    with open(args.path, encoding="utf-8", newline="") as stream:
+        report = await bulk.import_questions(
+            stream,
+            fmt,
+            batch_size=args.batch_size,
+            strict=args.strict
+        )
+    elapsed = time.perf_counter() - started
+    result = report.to_dict()
+    result["seconds"] = round(elapsed, 3)
+    result["rows_per_second"] = round(report.read / elapsed) if elapsed else None
+    print(json.dumps(result, indent=2))
+
+async def export_questions(args):
+    """Export every question to a JSONL or CSV file"""
+    await init_db()
+    fmt = args.format or bulk.detect_format(args.path)
+    if args.path == "-":
+        stream = sys.stdout
+    else:
+        stream = open(args.path, "w", encoding="utf-8", newline="")
+    try:
+        async for chunk in bulk.export_questions(fmt):
+            stream.write(chunk)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+async def export_question_snapshot(args):
+    """Write every question to a memory-mappable snapshot file for QUIZ_SNAPSHOT"""
+    await init_db()
+    started = time.perf_counter()
+    count = await export_snapshot(args.path)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"questions": count, "bytes": os.path.getsize(args.path), "seconds": round(elapsed, 3)}, indent=2))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the AP Physics C Mechanics Quiz database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import-questions", help=import_questions.__doc__)
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=bulk.FORMATS, help="default: from the file extension")
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--strict", action="store_true", help="import nothing if any record is invalid")
+    import_parser.set_defaults(handler=import_questions)
+
+    export_parser = commands.add_parser("export-questions", help=export_questions.__doc__)
+    export_parser.add_argument("path", help="output file, or - for stdout")
+    export_parser.add_argument("--format", choices=bulk.FORMATS, help="default: from the file extension")
+    export_parser.set_defaults(handler=export_questions)
+
+    snapshot_parser = commands.add_parser("export-snapshot", help=export_question_snapshot.__doc__)
+    snapshot_parser.add_argument("path")
+    snapshot_parser.set_defaults(handler=export_question_snapshot)
+
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(args.handler(args))
+    except bulk.ImportValidationError as e:
+        parser.exit(1, f"error: {e}\n")
+
+if __name__ == "__main__":
+    main()
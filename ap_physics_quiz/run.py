@@ -1,4 +1,41 @@
+import argparse
+import os
+
 import uvicorn
 
+def main(argv=None):
+    """Start the quiz server in development or production mode"""
+    parser = argparse.ArgumentParser(description="Run the AP Physics C Mechanics Quiz server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="run several worker processes without auto-reload"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("QUIZ_WORKERS", os.cpu_count() or 1)),
+        help="number of worker processes in production mode (default: CPU count)"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.production:
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    if args.workers > 1:
+        # Session state has to live in the shared database once requests from
+        # one browser can land on different processes
+        os.environ.setdefault("QUIZ_SESSION_BACKEND", "sqlite")
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        access_log=False
+    )
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    main()
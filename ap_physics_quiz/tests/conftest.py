@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+import pytest
+
+# Tests get a database of their own, quiet logs and no rate limit (tests of
+# the limiter install their own); set before app modules are imported
+os.environ.setdefault("QUIZ_DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/quiz_test.db")
+os.environ.setdefault("QUIZ_SQL_LOG", "off")
+os.environ.setdefault("QUIZ_RATE_LIMIT", "0")
+
+@pytest.fixture(scope="session")
+def client():
+    """The app, started once against the seeded test database"""
+    from fastapi.testclient import TestClient
+
+    # Templates and static files are found relative to the app directory
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        import main
+
+        with TestClient(main.app) as client:
+            yield client
+    finally:
+        os.chdir(cwd)
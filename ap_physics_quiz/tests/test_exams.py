@@ -0,0 +1,72 @@
+import pytest
+
+import main
+from app.question_pool import question_pool
+from app.rate_limit import MemoryRateLimitBackend, RateLimiter
+
+SESSION = {"X-Quiz-Session": "exam-tests-session-0001"}
+
+def create(client, **params):
+    response = client.post("/api/exams", json=params, headers=SESSION)
+    assert response.status_code == 200
+    return response.json()
+
+def correct_answers(exam):
+    answers = []
+    for question in exam["questions"]:
+        record = question_pool.get(question["id"])
+        if record.correct_index is not None:
+            answers.append({"question_id": record.id, "option_index": record.correct_index})
+        else:
+            answers.append({"question_id": record.id, "answer": record.correct_answer})
+    return answers
+
+def test_same_parameters_give_the_same_exam(client):
+    exam = create(client, length=5, seed=7)
+    assert len(exam["questions"]) == 5
+    assert len({question["id"] for question in exam["questions"]}) == 5
+    assert create(client, length=5, seed=7) == exam
+    assert client.get(f"/api/exams/{exam['exam_id']}").json() == exam
+    assert create(client, length=5, seed=8)["exam_id"] != exam["exam_id"]
+
+def test_exam_without_seed_is_stable_per_session(client):
+    assert create(client, length=4) == create(client, length=4)
+
+def test_topics_are_balanced(client):
+    exam = create(client, length=4, seed=1, topics=["kinematics", "energy"])
+    topics = [question["topic"] for question in exam["questions"]]
+    assert topics.count("kinematics") == 2
+    assert topics.count("energy") == 2
+    for question in exam["questions"]:
+        assert question["topic"] in question_pool.get(question["id"]).tags
+
+def test_grading_counts_correct_and_unanswered(client):
+    exam = create(client, length=6, seed=3)
+    answers = correct_answers(exam)[:4]
+    result = client.post(f"/api/exams/{exam['exam_id']}/answers", json=answers, headers=SESSION).json()
+    assert result["total"] == 6
+    assert result["correct"] == 4
+    assert sum(totals["total"] for totals in result["by_topic"].values()) == 6
+    assert [item["answered"] for item in result["results"]] == [True] * 4 + [False] * 2
+
+def test_answers_outside_the_exam_are_rejected(client):
+    exam = create(client, length=3, seed=4)
+    first = exam["questions"][0]["id"]
+    outside = next(record.id for record in question_pool._records
+                   if record.id not in {question["id"] for question in exam["questions"]})
+    url = f"/api/exams/{exam['exam_id']}/answers"
+    assert client.post(url, json=[{"question_id": outside, "option_index": 0}]).status_code == 422
+    duplicate = [{"question_id": first, "option_index": 0}] * 2
+    assert client.post(url, json=duplicate).status_code == 422
+    assert client.post("/api/exams/0000000000000000/answers", json=[]).status_code == 404
+
+def test_exam_answers_count_against_the_rate_limit(client, monkeypatch):
+    limiter = RateLimiter(MemoryRateLimitBackend(), rate=5, burst=20, new_session_rate=0)
+    monkeypatch.setattr(main, "rate_limiter", limiter)
+    exam = create(client, length=20, seed=5)
+    url = f"/api/exams/{exam['exam_id']}/answers"
+    answers = correct_answers(exam)
+    assert client.post(url, json=answers, headers=SESSION).status_code == 200
+    response = client.post(url, json=answers, headers=SESSION)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,62 @@
+import pytest
+
+from app.grading import compile_answer, parse_quantity, parse_unit
+
+def test_parse_unit_combines_prefixes_powers_and_division():
+    assert parse_unit("kg·m/s²") == (1.0, (1, 1, -2, 0))
+    assert parse_unit("N*m") == (1.0, (2, 1, -2, 0))
+    factor, dims = parse_unit("km/h")
+    assert factor == pytest.approx(1000 / 3600)
+    assert dims == (1, 0, -1, 0)
+    assert parse_unit("cm^3") == (pytest.approx(1e-6), (3, 0, 0, 0))
+    assert parse_unit("apples") is None
+
+def test_parse_quantity_reads_scientific_notation_and_expressions():
+    assert parse_quantity("6.67e-11 N·m²/kg²") == (6.67e-11, pytest.approx(6.67e-11), (3, -1, -2, 0))
+    assert parse_quantity("3E8 m/s") == (3e8, 3e8, (1, 0, -1, 0))
+    number, si_value, dims = parse_quantity("0.4π rad")
+    assert number == pytest.approx(0.4 * 3.14159265)
+    assert dims == (0, 0, 0, 1)
+    assert parse_quantity("12") == (12.0, None, None)
+
+@pytest.mark.parametrize("answer", ["9.8 m/s", "9.80 m/s", "980 cm/s", "9.7 m/s", "9.8", "9.8e0 m/s"])
+def test_quantity_matches_within_tolerance(answer):
+    assert compile_answer("9.8 m/s").matches(answer)
+
+@pytest.mark.parametrize("answer", ["9.5 m/s", "9.8 m", "9.8 kg", "fast", ""])
+def test_quantity_rejects_other_values_and_dimensions(answer):
+    assert not compile_answer("9.8 m/s").matches(answer)
+
+def test_scientific_notation_answers():
+    key = compile_answer("6.67 × 10^-11 N·m²/kg²")
+    assert key.matches("6.67e-11 N·m²/kg²")
+    assert key.matches("6.7E-11 N·m²/kg²")
+    assert not key.matches("6.67e-10 N·m²/kg²")
+
+def test_answer_closer_to_a_distractor_is_wrong():
+    correct, distractor = compile_answer("4.9 m/s²"), compile_answer("5 m/s²")
+    assert correct.matches("4.9 m/s²", [distractor])
+    assert not correct.matches("5 m/s²", [distractor])
+    # Within the tolerance of both but closer to the correct answer
+    assert correct.matches("4.92 m/s²", [distractor])
+
+def test_symbolic_answers_compare_by_value():
+    assert compile_answer("(1/3)ML²").matches("ML²/3")
+    assert compile_answer("GmM/4R²").matches("G*m*M/(4*R^2)")
+    assert not compile_answer("GmM/4R²").matches("GmM/2R²")
+    assert compile_answer("ω = τt/I").matches("ω = tτ/I")
+    assert compile_answer("ω = τt/I").matches("τt/I")
+
+@pytest.mark.parametrize("answer", ["(" * 50 + "1" + ")" * 50, "1+" * 300 + "1", "√" * 100 + "4", "9^999^999"])
+def test_unparseable_or_huge_expressions_are_not_errors(answer):
+    assert not compile_answer("5 m/s").matches(answer)
+    assert not compile_answer("g/9").matches(answer)
+
+@pytest.mark.parametrize("answer", ["9 kJ^999", "9 km^200", "9 m^-999", "9 s^" + "9" * 5000])
+def test_oversized_unit_exponent_is_not_a_unit(answer):
+    assert parse_quantity(answer) is None
+    assert not compile_answer("5 m/s").matches(answer)
+
+def test_unit_exponent_up_to_the_limit():
+    assert parse_unit("m^4/s^4") == (1.0, (4, 0, -4, 0))
+    assert parse_unit("m^5") is None
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.question_pool import QuestionRecord
+from app.snapshot import QuestionSnapshot, SnapshotError, _SnapshotWriter
+
+RECORDS = [
+    QuestionRecord(2, "Speed?", ("1 m/s", "2 m/s"), "2 m/s", 1, "v = d/t", ("kinematics",)),
+    QuestionRecord(5, "Work?", ("3 J", "4 J", "5 J"), "4 J", 1, "W = Fd", ("energy", "dynamics")),
+    QuestionRecord(9, "Period?", None, "2π s", None, "T = 2π/ω", ("shm",)),
+    QuestionRecord(12, "Range?", ("10 m", "20 m"), "20 m", 1, "R = v²sin2θ/g", ("kinematics",)),
+]
+
+@pytest.fixture
+def snapshot(tmp_path):
+    writer = _SnapshotWriter()
+    for record in RECORDS:
+        writer.add(record)
+    path = str(tmp_path / "questions.snap")
+    writer.write(path)
+    snapshot = QuestionSnapshot(path)
+    yield snapshot
+    snapshot.close()
+
+def test_records_round_trip(snapshot):
+    assert len(snapshot) == len(RECORDS)
+    for record in RECORDS:
+        position = snapshot.position(record.id)
+        assert snapshot.record(position) == record
+        assert json.loads(snapshot.question_json(position)) == {
+            "id": record.id, "text": record.text, "options": list(record.options) if record.options else None
+        }
+    assert snapshot.position(3) is None
+    assert snapshot.answer_key(5).is_correct(option_index=1)
+    assert snapshot.answer_key(3) is None
+
+def test_topic_picks_only_return_tagged_questions(snapshot):
+    for _ in range(50):
+        assert "kinematics" in snapshot.record(snapshot.pick("kinematics")).tags
+    assert snapshot.record(snapshot.pick("dynamics")).id == 5
+    assert {snapshot.record(snapshot.pick()).id for _ in range(200)} == {2, 5, 9, 12}
+
+def test_picks_skip_excluded_questions(snapshot):
+    for _ in range(50):
+        assert snapshot.record(snapshot.pick("kinematics", exclude={2})).id == 12
+    assert snapshot.pick("kinematics", exclude={2, 12}) is None
+    assert snapshot.pick(exclude={2, 5, 9, 12}) is None
+
+def test_unknown_topics_are_empty_and_not_cached(snapshot):
+    assert snapshot.pick("astrology") is None
+    assert len(snapshot.topic_positions("astrology")) == 0
+    # Option and answer strings are interned too, but are not topics
+    assert snapshot.pick("2 m/s") is None
+    assert "astrology" not in snapshot._topics
+
+def test_rejects_files_that_are_not_snapshots(tmp_path):
+    path = tmp_path / "other.snap"
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    with pytest.raises(SnapshotError):
+        QuestionSnapshot(str(path))
@@ -1,28 +1,220 @@
+"""Build the static GitHub Pages version of the quiz into static_site/.
+
+The build is incremental. Every output is recorded with its content hash in
+static_site/.build-manifest.json and only rewritten when it changed. The
+question bank is read from the quiz database (created and seeded if
+missing) and published as JSON shards of consecutive question ids that the
+quiz page fetches lazily. Shards are only regenerated when the
+question_changes log shows an edit to one of their questions.
+
+Usage:
+
+    python build_static.py [--database ap_physics_quiz/quiz.db] [--full]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
 import os
-import shutil
+import sys
+import time
 from pathlib import Path
 
-def build_static_site():
-    # Create static_site directory
-    static_dir = Path("static_site")
-    if static_dir.exists():
-        shutil.rmtree(static_dir)
-    static_dir.mkdir()
+from jinja2 import Environment
+
+ROOT = Path(__file__).resolve().parent
+APP_DIR = ROOT / "ap_physics_quiz"
+DEFAULT_DATABASE = APP_DIR / "quiz.db"
+DEFAULT_OUTPUT = ROOT / "static_site"
+MANIFEST_NAME = ".build-manifest.json"
+# Bump when the layout of the outputs changes, to force a full rebuild
+BUILD_FORMAT = 1
+# Questions per shard; shard n holds ids n * SHARD_SIZE .. (n + 1) * SHARD_SIZE - 1
+SHARD_SIZE = 1000
+SHARD_FIELDS = ["id", "text", "options", "correct_index", "correct_answer", "explanation"]
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def hashed_name(name: str, digest: str) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+def compact_json(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+class OutputWriter:
+    """Writes build outputs, skipping files whose content is unchanged"""
+
+    def __init__(self, output: Path, previous: dict):
+        self.output = output
+        self.previous = previous
+        self.outputs = {}
+        self.written = 0
+        self.unchanged = 0
+
+    def write(self, name: str, data: bytes):
+        digest = content_hash(data)
+        path = self.output / name
+        if self.previous.get(name) == digest and path.exists():
+            self.unchanged += 1
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            self.written += 1
+        self.outputs[name] = digest
+
+    def keep(self, name: str):
+        """Carry over an output that this build did not need to regenerate"""
+        self.outputs[name] = self.previous[name]
+        self.unchanged += 1
+
+    def remove_stale(self) -> int:
+        """Delete outputs of the previous build that this build did not produce"""
+        removed = 0
+        for name in self.previous.keys() - self.outputs.keys():
+            path = self.output / name
+            if path.exists():
+                path.unlink()
+                removed += 1
+        return removed
+
+async def open_database(database: Path):
+    """Point the app at the database and bring its schema up to date"""
+    os.environ["QUIZ_DATABASE_URL"] = f"sqlite+aiosqlite:///{database}"
+    sys.path.insert(0, str(APP_DIR))
+    from app.database import init_db
+
+    # Creates and seeds the database when it does not exist, e.g. in CI
+    await init_db()
+
+async def close_database():
+    from app.database import engine, read_engine
+
+    await engine.dispose()
+    await read_engine.dispose()
+
+async def read_shards(shards, shard_size: int) -> dict:
+    """Read the questions of the given shards, as shard -> rows"""
+    from sqlalchemy.future import select
+
+    from app.database import Question, read_session
+
+    columns = [getattr(Question, field) for field in SHARD_FIELDS]
+    rows = {shard: [] for shard in shards}
+    async with read_session() as db:
+        for shard in sorted(shards):
+            result = await db.execute(
+                select(*columns)
+                .where(Question.id >= shard * shard_size, Question.id < (shard + 1) * shard_size)
+                .order_by(Question.id)
+            )
+            rows[shard] = [list(row) for row in result]
+    return rows
+
+async def dirty_shards(manifest: dict, shard_size: int):
+    """Get the questions version and the shards that must be regenerated"""
+    from sqlalchemy.future import select
+
+    from app.database import Question, get_question_changes, get_questions_version, read_session
+
+    async with read_session() as db:
+        since = manifest.get("questions_version")
+        if since is not None and manifest.get("shards") is not None:
+            version, changed_ids = await get_question_changes(db, since, limit=100000)
+            if changed_ids is not None:
+                return version, {question_id // shard_size for question_id in changed_ids}
+        version = await get_questions_version(db)
+        result = await db.execute(select((Question.id // shard_size).label("shard")).distinct())
+        shards = {int(shard) for shard in result.scalars()}
+    # Shards that disappeared must be dropped as well
+    shards.update(int(shard) for shard in manifest.get("shards") or {})
+    return version, shards
+
+def load_manifest(output: Path, shard_size: int, full: bool) -> dict:
+    path = output / MANIFEST_NAME
+    if full or not path.exists():
+        return {}
+    manifest = json.loads(path.read_text())
+    if manifest.get("format") != BUILD_FORMAT or manifest.get("shard_size") != shard_size:
+        return {}
+    return manifest
 
-    # Copy static files
-    shutil.copytree("ap_physics_quiz/static", static_dir / "static")
-    shutil.copytree("ap_physics_quiz/templates", static_dir / "templates")
+async def build(database: Path, output: Path, shard_size: int, full: bool):
+    started = time.perf_counter()
+    output.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output, shard_size, full)
+    writer = OutputWriter(output, manifest.get("outputs", {}))
 
-    # Create index.html
-    with open(static_dir / "index.html", "w") as f:
-        f.write("""<!DOCTYPE html>
+    # Static assets, fingerprinted like the app serves them
+    asset_urls = {}
+    for path in sorted((APP_DIR / "static").rglob("*")):
+        if path.is_file():
+            name = path.relative_to(APP_DIR / "static").as_posix()
+            data = path.read_bytes()
+            asset_urls[name] = f"static/{hashed_name(name, content_hash(data))}"
+            writer.write(asset_urls[name], data)
+
+    # Question shards
+    opened = time.perf_counter()
+    await open_database(database)
+    opened = time.perf_counter() - opened
+    version, dirty = await dirty_shards(manifest, shard_size)
+    shards = {int(shard): entry for shard, entry in (manifest.get("shards") or {}).items()}
+    dirty.update(shard for shard, entry in shards.items() if not (output / entry["file"]).exists())
+    shard_rows = await read_shards(dirty, shard_size)
+    await close_database()
+    for shard, rows in shard_rows.items():
+        if not rows:
+            shards.pop(shard, None)
+            continue
+        data = compact_json({"fields": SHARD_FIELDS, "rows": rows})
+        name = f"questions/{hashed_name(f'{shard}.json', content_hash(data))}"
+        writer.write(name, data)
+        shards[shard] = {"file": name, "count": len(rows)}
+    for shard, entry in shards.items():
+        if entry["file"] not in writer.outputs:
+            writer.keep(entry["file"])
+
+    index = {
+        "total": sum(entry["count"] for entry in shards.values()),
+        "shards": [[shards[shard]["file"], shards[shard]["count"]] for shard in sorted(shards)],
+    }
+    data = compact_json(index)
+    index_url = f"questions/{hashed_name('index.json', content_hash(data))}"
+    writer.write(index_url, data)
+
+    # Pages
+    env = Environment(autoescape=True)
+    for name, source in (("index.html", INDEX_PAGE), ("quiz.html", QUIZ_PAGE)):
+        page = env.from_string(source).render(styles_url=asset_urls["styles.css"], index_url=index_url)
+        writer.write(name, page.encode())
+
+    removed = writer.remove_stale()
+    (output / MANIFEST_NAME).write_text(json.dumps({
+        "format": BUILD_FORMAT,
+        "shard_size": shard_size,
+        "questions_version": version,
+        "shards": {str(shard): entry for shard, entry in sorted(shards.items())},
+        "outputs": writer.outputs,
+    }, indent=1, sort_keys=True))
+    print(
+        f"{index['total']} questions in {len(shards)} shards; "
+        f"{writer.written} files written, {writer.unchanged} unchanged, {removed} removed "
+        f"in {time.perf_counter() - started - opened:.3f} s (+ {opened:.3f} s opening the database)"
+    )
+
+def build_static_site(database=DEFAULT_DATABASE, output=DEFAULT_OUTPUT, shard_size=SHARD_SIZE, full=False):
+    asyncio.run(build(Path(database).resolve(), Path(output), shard_size, full))
+
+PAGE_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>AP Physics C Mechanics Quiz</title>
     <script src="https://cdn.tailwindcss.com"></script>
-    <link rel="stylesheet" href="./static/styles.css">
+    <link rel="stylesheet" href="./{{ styles_url }}">
     <style>
         body {
             min-height: 100vh;
@@ -34,7 +226,17 @@ def build_static_site():
         }
     </style>
 </head>
-<body>
+"""
+
+PAGE_FOOTER = """
+    <footer class="p-4 mt-auto">
+        <div class="container mx-auto text-center">
+            <p>&copy; 2025 AP Physics C Mechanics Quiz 🌳</p>
+        </div>
+    </footer>
+"""
+
+INDEX_PAGE = PAGE_HEAD + """<body>
     <div class="forest-decoration"></div>
     <header class="p-4">
         <div class="container mx-auto flex justify-between items-center">
@@ -47,14 +249,14 @@ def build_static_site():
             <div class="kawaii-element" style="top: 10%; left: 5%;">🌿</div>
             <div class="kawaii-element" style="top: 20%; right: 5%;">🌸</div>
             <div class="kawaii-element" style="bottom: 10%; left: 10%;">🍄</div>
-            
+
             <div class="text-center">
                 <h2 class="text-3xl font-bold text-forest-green mb-4">Welcome to the AP Physics C Mechanics Quiz!</h2>
                 <p class="text-lg text-gray-700 mb-6">
-                    Test your knowledge of AP Physics C Mechanics with random questions. 
+                    Test your knowledge of AP Physics C Mechanics with random questions.
                     Try to answer correctly to increase your score!
                 </p>
-                
+
                 <div class="mt-8">
                     <a href="./quiz.html" class="submit-button">
                         Start Quiz 🌱
@@ -63,37 +265,10 @@ def build_static_site():
             </div>
         </div>
     </main>
+""" + PAGE_FOOTER + """</body>
+</html>"""
 
-    <footer class="p-4 mt-auto">
-        <div class="container mx-auto text-center">
-            <p>&copy; 2025 AP Physics C Mechanics Quiz 🌳</p>
-        </div>
-    </footer>
-</body>
-</html>""")
-
-    # Create quiz.html
-    with open(static_dir / "quiz.html", "w") as f:
-        f.write("""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>AP Physics C Mechanics Quiz</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <link rel="stylesheet" href="./static/styles.css">
-    <style>
-        body {
-            min-height: 100vh;
-            display: flex;
-            flex-direction: column;
-        }
-        main {
-            flex: 1;
-        }
-    </style>
-</head>
-<body>
+QUIZ_PAGE = PAGE_HEAD + """<body>
     <div class="forest-decoration"></div>
     <header class="p-4">
         <div class="container mx-auto flex justify-between items-center">
@@ -112,118 +287,164 @@ def build_static_site():
             <div class="kawaii-element" style="top: 10%; left: 5%;">🌿</div>
             <div class="kawaii-element" style="top: 20%; right: 5%;">🌸</div>
             <div class="kawaii-element" style="bottom: 10%; left: 10%;">🍄</div>
-            
+
             <div id="question-container">
                 <h2 class="text-2xl font-bold text-forest-green mb-4">Question:</h2>
-                <p class="text-lg text-gray-700 mb-6" id="question-text"></p>
+                <p class="text-lg text-gray-700 mb-6" id="question-text">Loading question...</p>
 
                 <div id="options-container" class="space-y-3 mb-6"></div>
-                
+
                 <div class="mt-8 flex justify-center">
                     <button type="button" class="submit-button" id="submit-answer">
                         Submit Answer 🌱
                     </button>
                 </div>
             </div>
+            <div id="result-container"></div>
         </div>
     </main>
+""" + PAGE_FOOTER + """
+    <script>
+        // Questions are published as shards listed in the index; a shard is
+        // only downloaded when a question from it is picked
+        const INDEX_URL = {{ index_url|tojson }};
+        let indexRequest = null;
+        const shardRequests = new Map();
 
-    <footer class="p-4 mt-auto">
-        <div class="container mx-auto text-center">
-            <p>&copy; 2025 AP Physics C Mechanics Quiz 🌳</p>
-        </div>
-    </footer>
+        function loadIndex() {
+            if (!indexRequest) {
+                indexRequest = fetch('./' + INDEX_URL).then(response => response.json());
+            }
+            return indexRequest;
+        }
 
-    <script>
-        // Sample questions (you can replace this with your actual questions)
-        const questions = [
-            {
-                text: "A block of mass 2 kg is sliding on a frictionless surface with a velocity of 3 m/s. What is its kinetic energy?",
-                options: ["3 J", "6 J", "9 J", "18 J"],
-                correct: "9 J",
-                explanation: "Kinetic energy is calculated using the formula KE = (1/2)mv². For a 2 kg block moving at 3 m/s, KE = 0.5 × 2 × 3² = 9 J."
-            },
-            {
-                text: "A 5 kg object accelerates from rest to 10 m/s in 5 seconds. What is the magnitude of the net force acting on it?",
-                options: ["5 N", "10 N", "15 N", "20 N"],
-                correct: "10 N",
-                explanation: "Using Newton's Second Law, F = ma. The acceleration is (change in velocity)/(time) = 10/5 = 2 m/s². Therefore, F = 5 kg × 2 m/s² = 10 N."
+        function loadShard(file) {
+            if (!shardRequests.has(file)) {
+                shardRequests.set(file, fetch('./' + file).then(response => response.json()));
             }
-        ];
+            return shardRequests.get(file);
+        }
 
-        let currentQuestion = 0;
+        async function randomQuestion() {
+            const index = await loadIndex();
+            let pick = Math.floor(Math.random() * index.total);
+            for (const [file, count] of index.shards) {
+                if (pick < count) {
+                    const shard = await loadShard(file);
+                    const question = {};
+                    shard.fields.forEach((field, i) => { question[field] = shard.rows[pick][i]; });
+                    return question;
+                }
+                pick -= count;
+            }
+            return null;
+        }
+
+        let question = null;
         let score = 0;
 
-        function displayQuestion() {
-            const question = questions[currentQuestion];
-            document.getElementById('question-text').textContent = question.text;
-            
+        async function displayQuestion() {
+            let next = await randomQuestion();
+            if (next && question && next.id === question.id) {
+                next = await randomQuestion();
+            }
+            question = next;
+            document.getElementById('result-container').replaceChildren();
+            document.getElementById('submit-answer').disabled = false;
             const optionsContainer = document.getElementById('options-container');
-            optionsContainer.innerHTML = '';
-            
-            question.options.forEach(option => {
-                const label = document.createElement('label');
-                label.className = 'answer-option flex items-start';
-                label.innerHTML = `
-                    <input type="radio" name="answer" value="${option}" class="mt-1 mr-3" required>
-                    <span>${option}</span>
-                    <span class="ml-auto">👉</span>
-                `;
-                optionsContainer.appendChild(label);
-            });
+            optionsContainer.replaceChildren();
+            if (!question) {
+                document.getElementById('question-text').textContent = 'No questions available.';
+                return;
+            }
+            document.getElementById('question-text').textContent = question.text;
+
+            if (question.options) {
+                question.options.forEach((option, i) => {
+                    const label = document.createElement('label');
+                    label.className = 'answer-option flex items-start';
+                    const input = document.createElement('input');
+                    Object.assign(input, { type: 'radio', name: 'answer', value: i, className: 'mt-1 mr-3', required: true });
+                    const text = document.createElement('span');
+                    text.textContent = option;
+                    const pointer = document.createElement('span');
+                    pointer.className = 'ml-auto';
+                    pointer.textContent = '👉';
+                    label.append(input, text, pointer);
+                    optionsContainer.appendChild(label);
+                });
+            } else {
+                const input = document.createElement('input');
+                Object.assign(input, { type: 'text', id: 'answer', required: true });
+                input.className = 'w-full px-4 py-2 border-2 border-tan rounded-lg focus:outline-none focus:ring-2 focus:ring-leaf-green';
+                optionsContainer.appendChild(input);
+            }
         }
 
-        function checkAnswer() {
-            const selectedAnswer = document.querySelector('input[name="answer"]:checked');
-            if (!selectedAnswer) return;
+        function paragraph(className, text) {
+            const p = document.createElement('p');
+            p.className = className;
+            p.textContent = text;
+            return p;
+        }
 
-            const question = questions[currentQuestion];
-            const isCorrect = selectedAnswer.value === question.correct;
+        function checkAnswer() {
+            if (!question) return;
+            let answer, isCorrect;
+            if (question.options) {
+                const selected = document.querySelector('input[name="answer"]:checked');
+                if (!selected) return;
+                answer = question.options[selected.value];
+                isCorrect = Number(selected.value) === question.correct_index;
+            } else {
+                answer = document.getElementById('answer').value;
+                if (!answer.trim()) return;
+                isCorrect = answer.trim().toLowerCase() === question.correct_answer.trim().toLowerCase();
+            }
 
             if (isCorrect) {
                 score++;
                 document.getElementById('score').textContent = score;
-                document.getElementById('progress').style.width = `${(score/questions.length)*100}%`;
+                document.getElementById('progress').style.width = `${Math.min(score / 10, 1) * 100}%`;
             }
 
             // Show result
             const resultDiv = document.createElement('div');
             resultDiv.className = isCorrect ? 'bg-leaf-green text-white p-4 mb-6 rounded-lg border-2 border-tan' : 'bg-red-500 text-white p-4 mb-6 rounded-lg border-2 border-tan';
-            resultDiv.innerHTML = `
-                <div class="flex items-center">
-                    <span class="text-2xl mr-3">${isCorrect ? '🎉' : '💫'}</span>
-                    <p class="text-xl font-bold">${isCorrect ? 'Correct!' : 'Incorrect'}</p>
-                </div>
-                <p class="mt-2">${isCorrect ? `Your answer "${selectedAnswer.value}" is correct. +1 point! 🌟` : `Your answer "${selectedAnswer.value}" is not correct.`}</p>
-                ${!isCorrect ? `
-                <div class="mt-4 bg-light-green p-4 rounded-lg">
-                    <p class="font-bold">The correct answer is: ${question.correct}</p>
-                    <p class="mt-2">${question.explanation}</p>
-                </div>
-                ` : ''}
-            `;
-
-            document.getElementById('question-container').appendChild(resultDiv);
+            resultDiv.append(
+                paragraph('text-xl font-bold', isCorrect ? '🎉 Correct!' : '💫 Incorrect'),
+                paragraph('mt-2', isCorrect ? `Your answer "${answer}" is correct. +1 point! 🌟` : `Your answer "${answer}" is not correct.`)
+            );
+            if (!isCorrect) {
+                const details = document.createElement('div');
+                details.className = 'mt-4 bg-light-green p-4 rounded-lg';
+                details.append(
+                    paragraph('font-bold', `The correct answer is: ${question.correct_answer}`),
+                    paragraph('mt-2', question.explanation)
+                );
+                resultDiv.appendChild(details);
+            }
 
             // Disable submit button and show next question button
             document.getElementById('submit-answer').disabled = true;
             const nextButton = document.createElement('button');
             nextButton.className = 'submit-button mt-4';
             nextButton.textContent = 'Next Question 🌱';
-            nextButton.onclick = () => {
-                currentQuestion = (currentQuestion + 1) % questions.length;
-                document.getElementById('question-container').innerHTML = '';
-                displayQuestion();
-                document.getElementById('submit-answer').disabled = false;
-            };
-            document.getElementById('question-container').appendChild(nextButton);
+            nextButton.onclick = displayQuestion;
+            document.getElementById('result-container').append(resultDiv, nextButton);
         }
 
         document.getElementById('submit-answer').onclick = checkAnswer;
         displayQuestion();
     </script>
 </body>
-</html>""")
+</html>"""
 
 if __name__ == "__main__":
-    build_static_site() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the static site into static_site/")
+    parser.add_argument("--database", default=str(DEFAULT_DATABASE), help="quiz database file")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rebuild everything")
+    args = parser.parse_args()
+    build_static_site(args.database, args.output, args.shard_size, args.full)